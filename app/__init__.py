@@ -49,9 +49,19 @@ def create_app(config_name='default'):
     from .controllers.weather_controller import weather_bp
     app.register_blueprint(weather_bp, url_prefix='/ai-cabinet/api/weather')
     
+    # 注册本地存储蓝图（local和memory存储后端的对象下载和直传）
+    from .controllers.storage_controller import storage_bp
+    app.register_blueprint(storage_bp, url_prefix='/ai-cabinet/storage')
+    
     # 注册全局错误处理
     register_error_handlers(app)
     
+    # 服务进程收到请求时启动AI识别后台线程，处理重启前遗留的任务；
+    # flask命令行和迁移脚本只创建应用不处理请求，不会启动线程（测试环境在第一次提交任务时才启动）
+    if app.config.get('RECOGNITION_AUTOSTART') and not app.testing:
+        from .services.recognition_queue import recognition_queue
+        app.before_request(lambda: recognition_queue.start(app))
+    
     return app
 
 def register_jwt_handlers(jwt):
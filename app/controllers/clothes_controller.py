@@ -4,9 +4,11 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from werkzeug.utils import secure_filename
+from app.models.clothes import Clothes
 from app.services.clothes_service import ClothesService
 from config import Config
 from app.utils.response import success_response, error_response
+from app.utils.file_helper import get_file_size
 
 # 从配置中导入上传文件大小限制
 MAX_CONTENT_LENGTH = Config.MAX_CONTENT_LENGTH
@@ -17,6 +19,22 @@ clothes_bp = Blueprint('clothes', __name__, url_prefix='/api/clothes')
 # 创建服务实例
 clothes_service = ClothesService()
 
+# 衣物列表和详情支持的附加关联数据（include参数）
+LIST_INCLUDES = ('tags', 'ai_info')
+
+# 标签名称最大长度
+TAG_NAME_MAX_LENGTH = 50
+
+def _parse_include():
+    """
+    解析include查询参数
+    :return: (附加关联数据列表或None, 不支持的名称列表)
+    """
+    if not request.args.get('include'):
+        return None, []
+    include = [name.strip() for name in request.args.get('include').split(',') if name.strip()]
+    return include, [name for name in include if name not in LIST_INCLUDES]
+
 @clothes_bp.route('/upload', methods=['POST'])
 @jwt_required()
 def upload_clothes_images():
@@ -33,12 +51,8 @@ def upload_clothes_images():
     # 获取上传的文件列表
     files = request.files.getlist('files[]')
     
-    # 检查文件大小总和
-    total_size = sum(len(file.read()) for file in files)
-    
-    # 重置文件指针
-    for file in files:
-        file.seek(0)
+    # 检查文件大小总和（通过seek/tell获取，不读取文件内容）
+    total_size = sum(get_file_size(file) for file in files)
     
     # 检查文件大小是否超过限制
     if total_size > MAX_CONTENT_LENGTH:
@@ -52,11 +66,164 @@ def upload_clothes_images():
     else:
         return error_response(result['message'], status_code=200)
 
+@clothes_bp.route('/upload/presign', methods=['POST'])
+@jwt_required()
+def presign_clothes_uploads():
+    """
+    获取直传OSS的签名上传URL（文件内容不经过应用服务器）
+    请求体：{"files": [{"filename": "shirt.jpg", "content_type": "image/jpeg"}, ...]}
+    """
+    # 获取当前用户的account_id
+    account_id = get_jwt_identity()
+    
+    # 获取请求数据
+    data = request.get_json(silent=True) or {}
+    files = data.get('files')
+    
+    if not isinstance(files, list) or not files:
+        return error_response('files不能为空', status_code=200)
+    if not all(isinstance(file, dict) and isinstance(file.get('filename'), str) for file in files):
+        return error_response('每一项必须包含文件名filename', status_code=200)
+    
+    result = clothes_service.presign_uploads(account_id, files)
+    
+    if result['success']:
+        return success_response(result['result'], 200)
+    else:
+        return error_response(result['message'], status_code=200)
+
+@clothes_bp.route('/upload/commit', methods=['POST'])
+@jwt_required()
+def commit_clothes_uploads():
+    """
+    提交已直传到OSS的文件，创建衣物记录并开始AI识别
+    请求体：{"object_keys": ["clothes/<account_id>/20230601/abc123.jpg", ...]}
+    """
+    # 获取当前用户的account_id
+    account_id = get_jwt_identity()
+    
+    # 获取请求数据
+    data = request.get_json(silent=True) or {}
+    object_keys = data.get('object_keys')
+    
+    if not isinstance(object_keys, list) or not object_keys:
+        return error_response('object_keys不能为空', status_code=200)
+    if not all(isinstance(object_key, str) for object_key in object_keys):
+        return error_response('对象键名必须为字符串', status_code=200)
+    
+    result = clothes_service.commit_uploads(account_id, object_keys)
+    
+    if result['success']:
+        return success_response(result['items'], 200)
+    else:
+        return error_response(result['message'], status_code=200)
+
+@clothes_bp.route('/jobs/<int:job_id>', methods=['GET'])
+@jwt_required()
+def get_recognition_job(job_id):
+    """
+    查询AI识别任务进度
+    """
+    # 获取当前用户的account_id
+    account_id = get_jwt_identity()
+    
+    # 查询任务
+    job = clothes_service.get_recognition_job(account_id, job_id)
+    
+    if job:
+        return success_response(job, 200)
+    else:
+        return error_response('任务不存在', status_code=200)
+
+@clothes_bp.route('/ai-cache/stats', methods=['GET'])
+@jwt_required()
+def get_ai_cache_stats():
+    """
+    查询AI识别缓存命中统计（全局运维数据，只允许Config.AI_CACHE_STATS_ACCOUNTS中的管理员账号查询）
+    """
+    if get_jwt_identity() not in Config.AI_CACHE_STATS_ACCOUNTS:
+        return error_response('无权访问', status_code=403)
+    
+    return success_response(clothes_service.get_ai_cache_stats(), 200)
+
+@clothes_bp.route('/tags', methods=['POST'])
+@jwt_required()
+def set_clothes_tags():
+    """
+    批量设置多件衣物的标签（一个事务）
+    请求体：{"items": [{"clothes_id": 1, "tags": ["通勤", "百搭"]}, ...]}，tags为空列表时清空该衣物的标签
+    """
+    # 获取当前用户的account_id
+    account_id = get_jwt_identity()
+    
+    # 获取请求数据
+    data = request.get_json(silent=True) or {}
+    items = data.get('items')
+    
+    if not isinstance(items, list) or not items:
+        return error_response('items不能为空', status_code=200)
+    
+    tags_by_clothes = {}
+    for item in items:
+        clothes_id = item.get('clothes_id') if isinstance(item, dict) else None
+        tags = item.get('tags') if isinstance(item, dict) else None
+        if not isinstance(clothes_id, int) or not isinstance(tags, list):
+            return error_response('每一项必须包含整数clothes_id和标签名称列表tags', status_code=200)
+        if clothes_id in tags_by_clothes:
+            return error_response(f'衣物ID重复: {clothes_id}', status_code=200)
+        
+        names = []
+        for name in tags:
+            if not isinstance(name, str) or not name.strip():
+                return error_response('标签名称不能为空', status_code=200)
+            if len(name.strip()) > TAG_NAME_MAX_LENGTH:
+                return error_response(f'标签名称不能超过{TAG_NAME_MAX_LENGTH}个字符', status_code=200)
+            if name.strip() not in names:
+                names.append(name.strip())
+        tags_by_clothes[clothes_id] = names
+    
+    result = clothes_service.set_clothes_tags(account_id, tags_by_clothes)
+    
+    if result['success']:
+        return success_response(result['result'], 200)
+    else:
+        return error_response(result['message'], status_code=200)
+
+@clothes_bp.route('/reanalyze', methods=['POST'])
+@jwt_required()
+def reanalyze_clothes_batch():
+    """
+    批量重新AI识别衣物（后台任务，可通过返回的job_id查询进度）
+    请求体：{"clothes_ids": [1, 2, 3]} 或 {"clothes_ids": "all"}
+    """
+    # 获取当前用户的account_id
+    account_id = get_jwt_identity()
+    
+    # 获取请求数据
+    data = request.get_json(silent=True) or {}
+    clothes_ids = data.get('clothes_ids')
+    
+    if clothes_ids != 'all':
+        if not isinstance(clothes_ids, list) or not clothes_ids:
+            return error_response('clothes_ids必须为衣物ID列表或"all"', status_code=200)
+        if not all(isinstance(clothes_id, int) for clothes_id in clothes_ids):
+            return error_response('衣物ID必须为整数', status_code=200)
+    
+    result = clothes_service.reanalyze_clothes_batch(account_id, clothes_ids)
+    
+    if result['success']:
+        return success_response(result['result'], 200)
+    else:
+        return error_response(result['message'], status_code=200)
+
 @clothes_bp.route('/', methods=['GET'])
 @jwt_required()
 def get_clothes_list():
     """
-    获取衣物列表
+    获取衣物列表（游标分页）
+    查询参数：category、status、season，
+    cursor（上一页返回的next_cursor）、page_size（每页数量）、fields（逗号分隔的返回字段）、
+    include（逗号分隔的附加关联数据：tags、ai_info）
     """
     # 获取当前用户的account_id
     account_id = get_jwt_identity()
@@ -65,32 +232,53 @@ def get_clothes_list():
     category = request.args.get('category')
     status = request.args.get('status')
     season = request.args.get('season')
+    cursor = request.args.get('cursor')
     
-    # 查询衣物列表
-    clothes_list = clothes_service.get_clothes_list(account_id, category, status, season)
+    page_size = request.args.get('page_size', type=int)
+    if page_size is not None and page_size <= 0:
+        return error_response('page_size必须为正整数', status_code=200)
+    
+    fields = None
+    if request.args.get('fields'):
+        fields = [field.strip() for field in request.args.get('fields').split(',') if field.strip()]
+        invalid_fields = [field for field in fields if field not in Clothes.DICT_FIELDS]
+        if invalid_fields:
+            return error_response(f"不支持的字段: {','.join(invalid_fields)}", status_code=200)
     
-    # 转换为字典列表
-    items = [clothes.to_dict() for clothes in clothes_list]
+    include, invalid_includes = _parse_include()
+    if invalid_includes:
+        return error_response(f"不支持的include: {','.join(invalid_includes)}", status_code=200)
     
-    return success_response({
-        'total': len(items),
-        'items': items
-    }, 200)
+    # 查询衣物列表
+    try:
+        result = clothes_service.get_clothes_list(
+            account_id, category, status, season,
+            cursor=cursor, page_size=page_size, fields=fields, include=include
+        )
+    except ValueError as e:
+        return error_response(str(e), status_code=200)
+    
+    return success_response(result, 200)
 
 @clothes_bp.route('/<int:clothes_id>', methods=['GET'])
 @jwt_required()
 def get_clothes_by_id(clothes_id):
     """
     通过ID获取衣物
+    查询参数：include（逗号分隔的附加关联数据：tags、ai_info）
     """
     # 获取当前用户的account_id
     account_id = get_jwt_identity()
     
+    include, invalid_includes = _parse_include()
+    if invalid_includes:
+        return error_response(f"不支持的include: {','.join(invalid_includes)}", status_code=200)
+    
     # 查询衣物
-    clothes = clothes_service.get_clothes_by_id(account_id, clothes_id)
+    clothes = clothes_service.get_clothes_detail(account_id, clothes_id, include=include)
     
     if clothes:
-        return success_response(clothes.to_dict(), 200)
+        return success_response(clothes, 200)
     else:
         return error_response('衣物不存在', status_code=200)
 
@@ -1,21 +1,23 @@
-from flask import Blueprint, request
+from flask import Blueprint, Response, request, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from marshmallow import ValidationError
 
 from app.services.outfit_service import OutfitService
 from app.services.outfit_ai_service import OutfitAIService
 from app.schemas.outfit import OutfitSchema, OutfitResponseSchema, OutfitFilterSchema, OutfitAIRequestSchema
-from app.utils.response import success_response, error_response
+from app.utils.response import success_response, error_response, sse_event
 
 # 创建蓝图
 outfit_bp = Blueprint('outfit', __name__)
 
 # 实例化Schema
 outfit_schema = OutfitSchema()
-outfit_response_schema = OutfitResponseSchema()
 outfit_filter_schema = OutfitFilterSchema()
 outfit_ai_schema = OutfitAIRequestSchema()
 
+# 创建服务实例（复用进程内共享的大模型客户端）
+outfit_ai_service = OutfitAIService()
+
 @outfit_bp.route('', methods=['POST'])
 @jwt_required()
 def create_outfit():
@@ -45,7 +47,8 @@ def create_outfit():
     )
     
     # 序列化响应数据
-    result = outfit_response_schema.dump(outfit)
+    clothes_map = OutfitService.get_clothes_map(account_id, [outfit])
+    result = OutfitResponseSchema(context={'clothes_map': clothes_map}).dump(outfit)
     
     return success_response(result)
 
@@ -71,12 +74,9 @@ def generate_ai_outfit():
     except ValidationError as err:
         return error_response("验证错误", err.messages, 200)
     
-    # 实例化AI服务
-    ai_service = OutfitAIService()
-    
     # 生成穿搭推荐
     # 注意：如果未提供季节、天气或温度参数，服务将自动从天气数据库获取
-    result = ai_service.generate_outfit(
+    result = outfit_ai_service.generate_outfit(
         account_id=account_id,
         occasion=data.get('occasion'),
         season=data.get('season'),
@@ -89,20 +89,76 @@ def generate_ai_outfit():
     if not result.get('success', False):
         return error_response(result.get('message', 'AI穿搭推荐失败'), status_code=200)
     
-    # 序列化响应数据
+    # 序列化响应数据（衣物详情来自生成推荐时已加载的衣橱快照）
     outfit = result.get('outfit')
-    outfit_data = outfit_response_schema.dump(outfit)
+    clothes_map = OutfitService.get_clothes_map(account_id, [outfit])
+    outfit_data = OutfitResponseSchema(context={'clothes_map': clothes_map}).dump(outfit)
     
     # 获取衣物详情
-    clothes_detail = [cloth.to_dict() for cloth in outfit.get_clothes()]
+    clothes_detail = list(clothes_map.values())
     
     response_data = {
         'outfit': outfit_data,
-        'clothes_detail': clothes_detail
+        'clothes_detail': clothes_detail,
+        'source': result.get('source', 'ai')
     }
     
     return success_response(response_data)
 
+@outfit_bp.route('/ai/stream', methods=['POST'])
+@jwt_required()
+def generate_ai_outfit_stream():
+    """
+    AI穿搭推荐流式接口（Server-Sent Events）
+    
+    请求参数与 /ai 接口相同，依次推送以下事件：
+    - candidates：候选衣物筛选完成
+    - prompt：提示词已发送给模型
+    - token：模型输出的文本片段
+    - outfit：模型返回的JSON闭合后立即推送校验通过的穿搭及衣物详情
+    - fallback：大模型调用失败，随后的outfit事件为本地规则引擎的推荐
+    - error：生成失败
+    - done：推送结束
+    
+    :return: text/event-stream响应
+    """
+    # 获取当前用户的account_id
+    account_id = get_jwt_identity()
+    
+    # 验证请求数据
+    try:
+        data = outfit_ai_schema.load(request.get_json() or {})
+    except ValidationError as err:
+        return error_response("验证错误", err.messages, 200)
+    
+    def generate():
+        events = outfit_ai_service.generate_outfit_stream(
+            account_id=account_id,
+            occasion=data.get('occasion'),
+            season=data.get('season'),
+            style_preference=data.get('style_preference'),
+            weather=data.get('weather'),
+            temperature=data.get('temperature'),
+            exclude_clothes_ids=data.get('exclude_clothes_ids')
+        )
+        
+        for event, payload in events:
+            if event == 'outfit':
+                clothes_map = OutfitService.get_clothes_map(account_id, [payload])
+                payload = {
+                    'outfit': OutfitResponseSchema(context={'clothes_map': clothes_map}).dump(payload),
+                    'clothes_detail': list(clothes_map.values())
+                }
+            yield sse_event(event, payload)
+        
+        yield sse_event('done')
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @outfit_bp.route('', methods=['GET'])
 @jwt_required()
 def get_outfit_list():
@@ -115,7 +171,7 @@ def get_outfit_list():
     
     # 验证过滤参数
     filters = {}
-    for key in ['style', 'season', 'occasion']:
+    for key in ['style', 'season', 'occasion', 'clothes_id']:
         if key in request.args:
             filters[key] = request.args.get(key)
     
@@ -129,11 +185,15 @@ def get_outfit_list():
         account_id=account_id,
         style=filters.get('style'),
         season=filters.get('season'),
-        occasion=filters.get('occasion')
+        occasion=filters.get('occasion'),
+        clothes_id=filters.get('clothes_id')
     )
     
+    # 从衣橱快照获取列表中所有穿搭的衣物，序列化时在内存中拼接衣物详情
+    clothes_map = OutfitService.get_clothes_map(account_id, outfits)
+    
     # 序列化响应数据
-    result = [outfit_response_schema.dump(outfit) for outfit in outfits]
+    result = OutfitResponseSchema(many=True, context={'clothes_map': clothes_map}).dump(outfits)
     
     return success_response(result)
 
@@ -155,7 +215,8 @@ def get_outfit(outfit_id):
         return error_response("穿搭不存在", status_code=200)
     
     # 序列化响应数据
-    result = outfit_response_schema.dump(outfit)
+    clothes_map = OutfitService.get_clothes_map(account_id, [outfit])
+    result = OutfitResponseSchema(context={'clothes_map': clothes_map}).dump(outfit)
     
     return success_response(result)
 
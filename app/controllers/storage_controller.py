@@ -0,0 +1,55 @@
+"""
+本地存储控制器
+使用local或memory存储后端时，由应用提供对象的下载和签名直传，与OSS的公共URL和签名PUT URL用法相同；
+使用oss后端时所有请求返回资源不存在
+"""
+from flask import Blueprint, Response, request
+from app.utils.oss_helper import OSSHelper
+from app.utils.response import success_response, error_response
+from app.utils.storage_backend import AppServedBackend
+
+# 创建蓝图
+storage_bp = Blueprint('storage', __name__)
+
+
+def _get_helper():
+    """
+    获取由应用提供访问的存储
+    :return: OSSHelper对象，当前存储后端不由应用提供访问时返回None
+    """
+    helper = OSSHelper()
+    return helper if isinstance(helper.backend, AppServedBackend) else None
+
+
+@storage_bp.route('/<path:object_key>', methods=['GET'])
+def get_object(object_key):
+    """
+    下载对象
+    """
+    helper = _get_helper()
+    meta = helper.get_object_meta(object_key) if helper else None
+    data = helper.get_object(object_key) if meta else None
+    if data is None:
+        return error_response('资源不存在', status_code=404)
+
+    return Response(data, mimetype=meta["content_type"] or 'application/octet-stream',
+                    headers={"ETag": meta["etag"]})
+
+
+@storage_bp.route('/<path:object_key>', methods=['PUT'])
+def put_object(object_key):
+    """
+    使用签名PUT URL直传对象（请求体为文件内容）
+    """
+    helper = _get_helper()
+    if not helper:
+        return error_response('资源不存在', status_code=404)
+
+    content_type = request.headers.get('Content-Type')
+    if not helper.backend.verify_put(object_key, request.args.get('expires'),
+                                     request.args.get('signature'), content_type):
+        return error_response('签名无效或已过期', status_code=403)
+
+    if not helper.put_stream(object_key, request.stream, content_type):
+        return error_response('保存文件失败', status_code=500)
+    return success_response({"object_key": object_key}, 200)
@@ -7,6 +7,7 @@ from app.services.user_body_service import UserBodyService
 from app.services.user_service import UserService
 from app.schemas.user_body import UserBodyInfoSchema, UserBodyInfoResponseSchema
 from app.utils.response import success_response, error_response
+from app.utils.file_helper import get_file_size
 from config import Config
 
 # 从配置中导入上传文件大小限制
@@ -120,10 +121,8 @@ def upload_avatar():
     if avatar_file.filename == '':
         return error_response("未选择文件", status_code=200)
     
-    # 检查文件大小
-    avatar_file.seek(0, 2)  # 移动到文件末尾
-    file_size = avatar_file.tell()  # 获取文件大小
-    avatar_file.seek(0)  # 重置文件指针
+    # 检查文件大小（通过seek/tell获取，不读取文件内容）
+    file_size = get_file_size(avatar_file)
     
     if file_size > MAX_CONTENT_LENGTH:
         return error_response(f"文件大小不能超过{MAX_CONTENT_LENGTH / 1024 / 1024}MB", status_code=200)
@@ -4,8 +4,12 @@ from app.models.clothes import Clothes
 from app.models.tag import Tag
 from app.models.clothes_tag import ClothesTag
 from app.models.outfit import Outfit
+from app.models.outfit_item import OutfitItem
 from app.models.recommendation import Recommendation
 from app.models.weather_log import WeatherLog
 from app.models.clothes_ai_info import ClothesAiInfo
 from app.models.shared_wardrobe import SharedWardrobe
-from app.models.user_body_info import UserBodyInfo 
\ No newline at end of file
+from app.models.user_body_info import UserBodyInfo
+from app.models.recognition_job import RecognitionJob
+from app.models.ai_recognition_cache import AiRecognitionCache
+from app.models.wardrobe_version import WardrobeVersion
@@ -0,0 +1,50 @@
+from datetime import datetime
+import json
+from app import db
+from sqlalchemy import UniqueConstraint
+
+class AiRecognitionCache(db.Model):
+    """AI识别结果缓存模型（按图片内容哈希去重）"""
+    __tablename__ = 'ai_recognition_cache'
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True, comment='缓存记录ID')
+    image_hash = db.Column(db.String(64), nullable=False, comment='图片内容SHA-256')
+    prompt_hash = db.Column(db.String(64), nullable=False, comment='模型和提示词指纹')
+    result = db.Column(db.Text, nullable=False, comment='识别结果，JSON格式')
+    hit_count = db.Column(db.Integer, nullable=False, default=0, comment='命中次数')
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True, comment='创建时间')
+    last_hit_at = db.Column(db.DateTime, default=datetime.utcnow, index=True, comment='最近命中时间')
+    
+    __table_args__ = (
+        UniqueConstraint('image_hash', 'prompt_hash', name='uix_ai_cache_image_prompt'),
+    )
+
+    def __init__(self, image_hash, prompt_hash, result):
+        self.image_hash = image_hash
+        self.prompt_hash = prompt_hash
+        self.set_result(result)
+        self.hit_count = 0
+    
+    def get_result(self):
+        """
+        获取缓存的识别结果
+        :return: 识别结果字典
+        """
+        return json.loads(self.result)
+    
+    def set_result(self, result):
+        """
+        设置识别结果
+        :param result: 识别结果字典
+        """
+        self.result = json.dumps(result, ensure_ascii=False)
+    
+    @classmethod
+    def get_by_hash(cls, image_hash, prompt_hash):
+        """
+        通过图片哈希和提示词指纹获取缓存
+        :param image_hash: 图片内容哈希
+        :param prompt_hash: 模型和提示词指纹
+        :return: 缓存对象或None
+        """
+        return cls.query.filter_by(image_hash=image_hash, prompt_hash=prompt_hash).first()
@@ -1,60 +1,216 @@
 from datetime import datetime
 import json
+import re
+from sqlalchemy import insert
 from app import db
+from config import Config
 
 class Clothes(db.Model):
     """衣物模型"""
     __tablename__ = 'clothes'
     
     id = db.Column(db.Integer, primary_key=True, autoincrement=True, comment='衣物ID')
-    account_id = db.Column(db.String(64), nullable=False, index=True, comment='所属账号ID')
+    account_id = db.Column(db.String(64), nullable=False, comment='所属账号ID')
     name = db.Column(db.String(100), nullable=True, comment='衣物名称')
     category = db.Column(db.String(50), nullable=True, comment='分类，如上衣、裤子')
     color = db.Column(db.String(30), nullable=True, comment='主色调')
-    season = db.Column(db.String(50), nullable=True, comment='适合季节，SET类型：spring,summer,autumn,winter')
+    season_mask = db.Column(db.Integer, nullable=False, default=0, comment='适合季节位掩码：spring=1, summer=2, autumn=4, winter=8')
     style = db.Column(db.String(50), nullable=True, comment='风格')
     status = db.Column(db.Enum('available', 'dirty', 'laundry', 'lost', 'discarded'), 
                      default='available', comment='状态')
     image_url = db.Column(db.String(255), nullable=True, comment='衣物图片URL')
+    image_hash = db.Column(db.String(64), nullable=True, comment='图片内容SHA-256')
+    image_variants = db.Column(db.Text, nullable=True, comment='缩略图URL，JSON格式：{"128": url, "256": url}，NULL表示尚未生成')
+    recognition_status = db.Column(db.Enum('pending', 'completed', 'failed'),
+                                   default='completed', comment='AI识别状态')
     created_at = db.Column(db.DateTime, default=datetime.utcnow, comment='创建时间')
+    
+    # 添加索引：衣物列表按(created_at, id)游标分页；按状态和季节筛选；按分类筛选
+    __table_args__ = (
+        db.Index('idx_clothes_account_created', 'account_id', 'created_at', 'id'),
+        db.Index('idx_clothes_account_status_season', 'account_id', 'status', 'season_mask'),
+        db.Index('idx_clothes_account_category', 'account_id', 'category'),
+    )
+
+    # to_dict可返回的字段及其依赖的数据库列
+    DICT_FIELDS = {
+        'id': ['id'],
+        'account_id': ['account_id'],
+        'name': ['name'],
+        'category': ['category'],
+        'color': ['color'],
+        'season': ['season_mask'],
+        'style': ['style'],
+        'status': ['status'],
+        'image_url': ['image_url'],
+        'thumbnail_url': ['image_url', 'image_variants'],
+        'image_variants': ['image_variants'],
+        'recognition_status': ['recognition_status'],
+        'created_at': ['created_at'],
+    }
 
     def __init__(self, account_id, name=None, category=None, color=None, 
-                 season=None, style=None, status='available', image_url=None):
+                 season=None, style=None, status='available', image_url=None,
+                 recognition_status='completed', image_hash=None, image_variants=None):
         self.account_id = account_id
         self.name = name
         self.category = category
         self.color = color
-        self.season = season  # MySQL SET类型，存储为逗号分隔的字符串，如 "spring,summer"
+        self.season = season  # 逗号分隔的字符串，如 "spring,summer"，保存为season_mask
         self.style = style
         self.status = status
         self.image_url = image_url
+        self.recognition_status = recognition_status
+        self.image_hash = image_hash
+        if image_variants is not None:
+            self.set_image_variants(image_variants)
+
+    # 季节的合法取值、位掩码及中文别名
+    SEASONS = ['spring', 'summer', 'autumn', 'winter']
+    SEASON_BITS = {'spring': 1, 'summer': 2, 'autumn': 4, 'winter': 8}
+    SEASON_ALIASES = {
+        '春': 'spring', '春季': 'spring', '春天': 'spring',
+        '夏': 'summer', '夏季': 'summer', '夏天': 'summer',
+        '秋': 'autumn', '秋季': 'autumn', '秋天': 'autumn', 'fall': 'autumn',
+        '冬': 'winter', '冬季': 'winter', '冬天': 'winter',
+    }
+
+    @classmethod
+    def normalize_season(cls, season):
+        """
+        将季节名称统一为英文取值
+        :param season: 季节名称，如 spring、春季
+        :return: spring/summer/autumn/winter，无法识别时返回None
+        """
+        if not season:
+            return None
+        season = season.strip().lower()
+        if season in cls.SEASONS:
+            return season
+        return cls.SEASON_ALIASES.get(season)
 
+    @classmethod
+    def season_to_mask(cls, seasons):
+        """
+        将季节列表转换为位掩码，无法识别的季节会被忽略
+        :param seasons: 季节列表，如['spring', '夏季']
+        :return: 位掩码整数
+        """
+        mask = 0
+        for season in seasons or []:
+            season = cls.normalize_season(season)
+            if season:
+                mask |= cls.SEASON_BITS[season]
+        return mask
+    
+    @classmethod
+    def season_filter(cls, season):
+        """
+        构造按季节筛选的条件
+        枚举包含该季节的全部位掩码（共8个），使用IN而不是位运算，可以利用(account_id, status, season_mask)索引
+        :param season: 季节名称
+        :return: SQLAlchemy过滤条件，无法识别的季节返回None
+        """
+        season = cls.normalize_season(season)
+        if not season:
+            return None
+        bit = cls.SEASON_BITS[season]
+        return cls.season_mask.in_([mask for mask in range(16) if mask & bit])
+    
     @property
     def season_list(self):
         """
-        获取季节列表
+        获取季节列表（由season_mask派生）
         :return: 季节列表
         """
-        if not self.season:
-            return []
-        return self.season.split(',')
+        mask = self.season_mask or 0
+        return [season for season in self.SEASONS if mask & self.SEASON_BITS[season]]
     
     @season_list.setter
     def season_list(self, seasons):
         """
         设置季节列表
-        :param seasons: 季节列表，可选值：spring, summer, autumn, winter
-        """
-        valid_seasons = ['spring', 'summer', 'autumn', 'winter']
-        if not seasons:
-            self.season = None
-        else:
-            # 过滤无效的季节值
-            valid_input = [s for s in seasons if s in valid_seasons]
-            if valid_input:
-                self.season = ','.join(valid_input)
-            else:
-                self.season = None
+        :param seasons: 季节列表，可选值：spring, summer, autumn, winter（也支持春季等中文名称）
+        """
+        self.season_mask = self.season_to_mask(seasons)
+    
+    @property
+    def season(self):
+        """
+        获取逗号分隔的季节字符串
+        :return: 如"spring,summer"，没有季节时返回None
+        """
+        return ','.join(self.season_list) or None
+    
+    @season.setter
+    def season(self, season):
+        """
+        通过逗号分隔的字符串设置季节
+        :param season: 如"spring,summer"或"春季、夏季"
+        """
+        self.season_list = re.split(r'[,，、\s]+', season) if season else []
+    
+    def get_image_variants(self):
+        """
+        获取缩略图URL
+        :return: 最长边像素（字符串）到URL的字典，尚未生成时返回空字典
+        """
+        if not self.image_variants:
+            return {}
+        return json.loads(self.image_variants)
+    
+    def set_image_variants(self, variants):
+        """
+        设置缩略图URL
+        :param variants: 最长边像素到URL的字典，空字典表示无法生成（不再重试）
+        """
+        self.image_variants = self.dump_image_variants(variants)
+    
+    @staticmethod
+    def dump_image_variants(variants):
+        """
+        序列化缩略图URL，用于保存到image_variants列
+        :param variants: 最长边像素到URL的字典
+        :return: JSON字符串，按尺寸从小到大排列
+        """
+        return json.dumps({str(size): variants[size] for size in sorted(variants, key=int)})
+    
+    @property
+    def thumbnail_url(self):
+        """
+        列表展示用的缩略图URL：不小于Config.IMAGE_THUMBNAIL_SIZE的最小缩略图，都小于该尺寸时取最大的缩略图
+        :return: 缩略图URL，没有缩略图时返回原图URL
+        """
+        variants = self.get_image_variants()
+        if not variants:
+            return self.image_url
+        sizes = sorted(variants, key=int)
+        size = next((size for size in sizes if int(size) >= Config.IMAGE_THUMBNAIL_SIZE), sizes[-1])
+        return variants[size]
+    
+    @property
+    def needs_image_variants(self):
+        """是否需要补生成缩略图（有图片但从未生成过缩略图）"""
+        return bool(self.image_url) and self.image_variants is None
+    
+    @classmethod
+    def save_image_variants(cls, account_id, clothes_id, image_url, variants):
+        """
+        保存补生成的缩略图URL（不提交事务）
+        只更新图片未变化且尚未生成缩略图的记录，多个进程同时生成时只保存一次
+        :param account_id: 账号ID
+        :param clothes_id: 衣物ID
+        :param image_url: 生成缩略图时使用的原图URL
+        :param variants: 最长边像素到URL的字典
+        :return: 布尔值，表示是否更新了记录
+        """
+        count = cls.query.filter(
+            cls.account_id == account_id,
+            cls.id == clothes_id,
+            cls.image_url == image_url,
+            cls.image_variants.is_(None)
+        ).update({cls.image_variants: cls.dump_image_variants(variants)}, synchronize_session=False)
+        return count > 0
     
     def get_ai_info(self):
         """
@@ -70,18 +226,9 @@ class Clothes(db.Model):
         :return: 标签列表
         """
         from app.models.clothes_tag import ClothesTag
-        from app.models.tag import Tag
         
-        # 获取所有关联记录
-        clothes_tags = ClothesTag.query.filter_by(account_id=self.account_id, clothes_id=self.id).all()
-        
-        # 获取标签ID列表
-        tag_ids = [ct.tag_id for ct in clothes_tags]
-        
-        # 查询标签
-        if tag_ids:
-            return Tag.query.filter(Tag.id.in_(tag_ids)).all()
-        return []
+        # 关联记录和标签一次联表查询
+        return ClothesTag.get_tags_map(self.account_id, [self.id])[self.id]
     
     def add_tag(self, tag):
         """
@@ -136,6 +283,54 @@ class Clothes(db.Model):
         """
         return cls.query.filter_by(account_id=account_id, id=clothes_id).first()
     
+    @classmethod
+    def filter_ids(cls, account_id, clothes_ids, status=None):
+        """
+        过滤出属于该账号的衣物ID（一次按主键的IN查询，用于写操作前的校验，不使用衣橱快照缓存）
+        :param account_id: 账号ID
+        :param clothes_ids: 衣物ID列表
+        :param status: 只保留该状态的衣物
+        :return: 有效的衣物ID列表，保持原顺序并去重
+        """
+        clothes_ids = list(dict.fromkeys(clothes_ids or []))
+        if not clothes_ids:
+            return []
+        
+        query = db.session.query(cls.id).filter(cls.account_id == account_id, cls.id.in_(clothes_ids))
+        if status:
+            query = query.filter(cls.status == status)
+        existing = {row[0] for row in query}
+        return [clothes_id for clothes_id in clothes_ids if clothes_id in existing]
+    
+    @classmethod
+    def bulk_create(cls, account_id, rows):
+        """
+        批量创建衣物（不提交事务）
+        支持INSERT ... RETURNING的数据库（SQLite、MariaDB等）用一条INSERT语句写入并直接返回新记录，按image_url对应回各行，因此每行的image_url必须唯一；
+        MySQL不支持RETURNING，在同一事务中逐行插入并取自增主键，再按主键一次查询回新记录，
+        不按image_url查询，因此不会误取到账号中已有的相同图片的记录
+        :param account_id: 账号ID
+        :param rows: 字典列表，键为衣物的列名（如image_url、image_hash、recognition_status）
+        :return: 衣物对象列表，顺序与rows一致
+        """
+        values = [dict(row, account_id=account_id) for row in rows]
+        if not values:
+            return []
+        
+        if db.session.get_bind().dialect.insert_executemany_returning:
+            clothes_list = db.session.scalars(insert(cls).returning(cls), values).all()
+            created = {clothes.image_url: clothes for clothes in clothes_list}
+            return [created[row['image_url']] for row in values]
+        
+        clothes_ids = [db.session.execute(insert(cls).values(row)).inserted_primary_key[0] for row in values]
+        created = {clothes.id: clothes for clothes in cls.query.filter(
+            cls.account_id == account_id,
+            cls.id.in_(clothes_ids)
+        ).all()}
+        if len(created) != len(values):
+            raise RuntimeError(f"批量创建衣物记录数量不符: 期望{len(values)}条，实际{len(created)}条")
+        return [created[clothes_id] for clothes_id in clothes_ids]
+    
     @classmethod
     def get_by_category(cls, account_id, category):
         """
@@ -164,25 +359,41 @@ class Clothes(db.Model):
         :param season: 季节
         :return: 衣物列表
         """
-        return cls.query.filter(
-            cls.account_id == account_id,
-            cls.season.like(f'%{season}%')
-        ).all()
+        condition = cls.season_filter(season)
+        if condition is None:
+            return []
+        return cls.query.filter(cls.account_id == account_id, condition).all()
     
-    def to_dict(self):
+    @classmethod
+    def get_field_columns(cls, fields):
+        """
+        获取返回指定字段所需的数据库列（总是包含分页用的id和created_at）
+        :param fields: 字段名列表
+        :return: 列属性列表
+        """
+        names = ['id', 'created_at']
+        for field in fields:
+            names.extend(name for name in cls.DICT_FIELDS[field] if name not in names)
+        return [getattr(cls, name) for name in names]
+    
+    def to_dict(self, fields=None):
         """
         将衣物对象转换为字典
+        :param fields: 只返回指定的字段，默认返回全部字段（只访问所需的属性，可配合load_only使用）
         :return: 衣物信息字典
         """
-        return {
-            'id': self.id,
-            'account_id': self.account_id,
-            'name': self.name,
-            'category': self.category,
-            'color': self.color,
-            'season': self.season_list,
-            'style': self.style,
-            'status': self.status,
-            'image_url': self.image_url,
-            'created_at': self.created_at.isoformat()
-        } 
\ No newline at end of file
+        return {field: self._get_field_value(field) for field in (fields or self.DICT_FIELDS)}
+    
+    def _get_field_value(self, field):
+        """
+        获取字段的序列化值
+        :param field: 字段名
+        :return: 字段值
+        """
+        if field == 'season':
+            return self.season_list
+        if field == 'created_at':
+            return self.created_at.isoformat()
+        if field == 'image_variants':
+            return self.get_image_variants()
+        return getattr(self, field) 
\ No newline at end of file
@@ -1,13 +1,15 @@
 from datetime import datetime
 from app import db
-from sqlalchemy import UniqueConstraint
+from sqlalchemy import UniqueConstraint, func
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
 class ClothesAiInfo(db.Model):
     """衣物AI识别信息模型"""
     __tablename__ = 'clothes_ai_info'
     
     id = db.Column(db.Integer, primary_key=True, autoincrement=True, comment='识别记录ID')
-    account_id = db.Column(db.String(64), nullable=False, index=True, comment='所属账号')
+    account_id = db.Column(db.String(64), nullable=False, comment='所属账号')
     clothes_id = db.Column(db.Integer, nullable=False, comment='衣物ID')
     detected_category = db.Column(db.String(50), nullable=True, comment='AI识别分类')
     detected_color = db.Column(db.String(30), nullable=True, comment='AI识别颜色')
@@ -47,6 +49,91 @@ class ClothesAiInfo(db.Model):
         """
         return cls.query.filter_by(account_id=account_id, clothes_id=clothes_id).first()
     
+    @classmethod
+    def get_ai_info_map(cls, account_id, clothes_ids):
+        """
+        一次IN查询获取多件衣物的AI识别信息
+        :param account_id: 账号ID
+        :param clothes_ids: 衣物ID列表
+        :return: 衣物ID到AI识别信息对象的字典（没有识别信息的衣物为None）
+        """
+        ai_info_map = {clothes_id: None for clothes_id in clothes_ids}
+        if not ai_info_map:
+            return ai_info_map
+        
+        for ai_info in cls.query.filter(
+            cls.account_id == account_id,
+            cls.clothes_id.in_(list(ai_info_map))
+        ).all():
+            ai_info_map[ai_info.clothes_id] = ai_info
+        return ai_info_map
+    
+    @classmethod
+    def bulk_upsert(cls, account_id, rows):
+        """
+        按(account_id, clothes_id)唯一键批量写入AI识别信息（不提交事务）
+        MySQL使用INSERT ... ON DUPLICATE KEY UPDATE，SQLite使用INSERT ... ON CONFLICT DO UPDATE，
+        一条语句完成全部衣物的新增和更新；其他数据库先查询已有记录再分别更新和插入；
+        可选字段（纹理、置信度）为空时保留已有记录中的值
+        :param account_id: 账号ID
+        :param rows: 字典列表，包含clothes_id和要写入的识别字段，同一件衣物出现多次时以最后一条为准
+        :return: 写入的记录数
+        """
+        now = datetime.utcnow()
+        values = {}
+        for row in rows:
+            values[row['clothes_id']] = {
+                'account_id': account_id,
+                'clothes_id': row['clothes_id'],
+                'detected_category': row.get('detected_category'),
+                'detected_color': row.get('detected_color'),
+                'detected_texture': row.get('detected_texture'),
+                'ai_confidence': row.get('ai_confidence'),
+                'updated_at': now,
+            }
+        if not values:
+            return 0
+        
+        values = list(values.values())
+        update_columns = ['detected_category', 'detected_color', 'detected_texture', 'ai_confidence', 'updated_at']
+        optional_columns = {'detected_texture', 'ai_confidence'}
+        dialect = db.session.get_bind().dialect.name
+        
+        def update_value(new_values, column):
+            if column in optional_columns:
+                return func.coalesce(new_values[column], cls.__table__.c[column])
+            return new_values[column]
+        
+        if dialect == 'mysql':
+            stmt = mysql_insert(cls).values(values)
+            stmt = stmt.on_duplicate_key_update({column: update_value(stmt.inserted, column)
+                                                 for column in update_columns})
+            db.session.execute(stmt)
+        elif dialect == 'sqlite':
+            stmt = sqlite_insert(cls).values(values)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['account_id', 'clothes_id'],
+                set_={column: update_value(stmt.excluded, column) for column in update_columns}
+            )
+            db.session.execute(stmt)
+        else:
+            existing = cls.get_ai_info_map(account_id, [row['clothes_id'] for row in values])
+            for row in values:
+                ai_info = existing[row['clothes_id']]
+                if ai_info is None:
+                    db.session.add(cls(**{key: row[key] for key in row if key != 'updated_at'}))
+                else:
+                    for column in update_columns:
+                        if row[column] is not None or column not in optional_columns:
+                            setattr(ai_info, column, row[column])
+        
+        # 语句直接写入数据库，使会话中已加载的对应对象在下次访问时重新读取
+        clothes_ids = {row['clothes_id'] for row in values}
+        for obj in list(db.session.identity_map.values()):
+            if isinstance(obj, cls) and obj.account_id == account_id and obj.clothes_id in clothes_ids:
+                db.session.expire(obj)
+        return len(values)
+    
     @classmethod
     def get_or_create(cls, account_id, clothes_id):
         """
@@ -1,6 +1,6 @@
 from datetime import datetime
 from app import db
-from sqlalchemy import UniqueConstraint
+from sqlalchemy import UniqueConstraint, insert
 
 class ClothesTag(db.Model):
     """衣物标签关联模型"""
@@ -16,6 +16,7 @@ class ClothesTag(db.Model):
     __table_args__ = (
         db.Index('idx_clothes_tag_unique', 'account_id', 'clothes_id', 'tag_id', unique=True),
         UniqueConstraint('clothes_id', 'tag_id', name='uix_clothes_tag'),
+        db.Index('idx_clothes_tag_tag', 'account_id', 'tag_id'),
     )
 
     def __init__(self, account_id, clothes_id, tag_id):
@@ -59,6 +60,63 @@ class ClothesTag(db.Model):
         """
         return cls.query.filter_by(account_id=account_id, tag_id=tag_id).all()
     
+    @classmethod
+    def get_tags_map(cls, account_id, clothes_ids):
+        """
+        一次联表查询获取多件衣物的标签
+        :param account_id: 账号ID
+        :param clothes_ids: 衣物ID列表
+        :return: 衣物ID到标签对象列表的字典（按标签名称排序，没有标签的衣物为空列表）
+        """
+        from app.models.tag import Tag
+        
+        tags_map = {clothes_id: [] for clothes_id in clothes_ids}
+        if not tags_map:
+            return tags_map
+        
+        rows = db.session.query(cls.clothes_id, Tag).join(
+            Tag, Tag.id == cls.tag_id
+        ).filter(
+            cls.account_id == account_id,
+            cls.clothes_id.in_(list(tags_map))
+        ).order_by(cls.clothes_id, Tag.name).all()
+        
+        for clothes_id, tag in rows:
+            tags_map[clothes_id].append(tag)
+        return tags_map
+    
+    @classmethod
+    def set_tags(cls, account_id, tag_ids_by_clothes):
+        """
+        批量设置多件衣物的标签（不提交事务）
+        只删除不再需要的关联、添加缺少的关联，已有的关联保持不变
+        :param account_id: 账号ID
+        :param tag_ids_by_clothes: 衣物ID到标签ID列表的字典，空列表表示清空该衣物的标签
+        :return: (添加的关联数, 删除的关联数)
+        """
+        if not tag_ids_by_clothes:
+            return 0, 0
+        
+        existing = db.session.query(cls.id, cls.clothes_id, cls.tag_id).filter(
+            cls.account_id == account_id,
+            cls.clothes_id.in_(list(tag_ids_by_clothes))
+        ).all()
+        current = {(clothes_id, tag_id): row_id for row_id, clothes_id, tag_id in existing}
+        wanted = {(clothes_id, tag_id) for clothes_id, tag_ids in tag_ids_by_clothes.items() for tag_id in tag_ids}
+        
+        stale_ids = [row_id for key, row_id in current.items() if key not in wanted]
+        if stale_ids:
+            cls.query.filter(cls.id.in_(stale_ids)).delete(synchronize_session=False)
+        
+        # 不需要回读主键，使用executemany一次写入
+        added = [
+            {"account_id": account_id, "clothes_id": clothes_id, "tag_id": tag_id}
+            for clothes_id, tag_id in sorted(wanted) if (clothes_id, tag_id) not in current
+        ]
+        if added:
+            db.session.execute(insert(cls), added)
+        return len(added), len(stale_ids)
+    
     @classmethod
     def delete_by_clothes(cls, account_id, clothes_id):
         """
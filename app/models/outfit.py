@@ -1,21 +1,35 @@
 from datetime import datetime
-import json
+from sqlalchemy.orm import foreign
 from app import db
+from app.models.outfit_item import OutfitItem
 
 class Outfit(db.Model):
     """穿搭模型"""
     __tablename__ = 'outfits'
     
     id = db.Column(db.Integer, primary_key=True, autoincrement=True, comment='穿搭ID')
-    account_id = db.Column(db.String(64), nullable=False, index=True, comment='所属账号ID')
+    account_id = db.Column(db.String(64), nullable=False, comment='所属账号ID')
     name = db.Column(db.String(100), nullable=True, comment='穿搭名称')
     description = db.Column(db.Text, nullable=True, comment='穿搭描述')
     style = db.Column(db.String(50), nullable=True, comment='风格')
     season = db.Column(db.String(50), nullable=True, comment='适合季节')
     occasion = db.Column(db.String(50), nullable=True, comment='适合场合')
-    clothes_items = db.Column(db.Text, nullable=True, comment='包含的衣物ID列表，JSON格式')
     image_url = db.Column(db.String(255), nullable=True, comment='穿搭图片URL')
     created_at = db.Column(db.DateTime, default=datetime.utcnow, comment='创建时间')
+    
+    # 添加索引：穿搭列表按创建时间倒序
+    __table_args__ = (
+        db.Index('idx_outfit_account_created', 'account_id', 'created_at'),
+    )
+    
+    # 包含的衣物（outfit_items表，按position排序；表之间不建外键，通过foreign()标注关联列）
+    items = db.relationship(
+        OutfitItem,
+        primaryjoin=lambda: Outfit.id == foreign(OutfitItem.outfit_id),
+        order_by=OutfitItem.position,
+        cascade='all, delete-orphan',
+        lazy='select'
+    )
 
     def __init__(self, account_id, name=None, clothes_items=None, image_url=None, description=None, style=None, season=None, occasion=None):
         self.account_id = account_id
@@ -32,26 +46,30 @@ class Outfit(db.Model):
         获取穿搭包含的衣物ID列表
         :return: 衣物ID列表
         """
-        if not self.clothes_items:
-            return []
-        return json.loads(self.clothes_items)
+        return [item.clothes_id for item in self.items]
     
     def set_clothes_items(self, clothes_ids):
         """
-        设置穿搭包含的衣物ID列表
+        设置穿搭包含的衣物ID列表（重复的ID只保留一次）
+        仍在列表中的衣物复用原有的关联记录并更新顺序，避免先插入新记录时与待删除的旧记录违反唯一约束
         :param clothes_ids: 衣物ID列表
         """
-        self.clothes_items = json.dumps(clothes_ids)
+        existing = {item.clothes_id: item for item in self.items}
+        items = []
+        for position, clothes_id in enumerate(dict.fromkeys(clothes_ids)):
+            item = existing.get(clothes_id) or OutfitItem(account_id=self.account_id, clothes_id=clothes_id)
+            item.position = position
+            items.append(item)
+        self.items = items
     
     def add_clothes(self, clothes_id):
         """
         添加衣物到穿搭
         :param clothes_id: 衣物ID
         """
-        clothes_ids = self.get_clothes_items()
-        if clothes_id not in clothes_ids:
-            clothes_ids.append(clothes_id)
-            self.set_clothes_items(clothes_ids)
+        if clothes_id not in self.get_clothes_items():
+            position = self.items[-1].position + 1 if self.items else 0
+            self.items.append(OutfitItem(account_id=self.account_id, clothes_id=clothes_id, position=position))
             db.session.commit()
     
     def remove_clothes(self, clothes_id):
@@ -59,22 +77,37 @@ class Outfit(db.Model):
         从穿搭中移除衣物
         :param clothes_id: 衣物ID
         """
-        clothes_ids = self.get_clothes_items()
-        if clothes_id in clothes_ids:
-            clothes_ids.remove(clothes_id)
-            self.set_clothes_items(clothes_ids)
-            db.session.commit()
+        for item in self.items:
+            if item.clothes_id == clothes_id:
+                self.items.remove(item)
+                db.session.commit()
+                break
     
     def get_clothes(self):
         """
         获取穿搭包含的衣物对象列表
         :return: 衣物对象列表
         """
+        clothes_map = Outfit.get_clothes_map(self.account_id, [self])
+        return [clothes_map[clothes_id] for clothes_id in self.get_clothes_items() if clothes_id in clothes_map]
+    
+    @staticmethod
+    def get_clothes_map(account_id, outfits):
+        """
+        一次查询获取多个穿搭包含的全部衣物
+        :param account_id: 账号ID
+        :param outfits: 穿搭对象列表
+        :return: 衣物ID到衣物对象的字典
+        """
         from app.models.clothes import Clothes
-        clothes_ids = self.get_clothes_items()
+        clothes_ids = {clothes_id for outfit in outfits for clothes_id in outfit.get_clothes_items()}
         if not clothes_ids:
-            return []
-        return Clothes.query.filter(Clothes.id.in_(clothes_ids)).all()
+            return {}
+        clothes_list = Clothes.query.filter(
+            Clothes.account_id == account_id,
+            Clothes.id.in_(clothes_ids)
+        ).all()
+        return {clothes.id: clothes for clothes in clothes_list}
     
     @classmethod
     def get_by_id(cls, account_id, outfit_id):
@@ -86,6 +119,21 @@ class Outfit(db.Model):
         """
         return cls.query.filter_by(account_id=account_id, id=outfit_id).first()
     
+    @classmethod
+    def get_by_clothes(cls, account_id, clothes_id):
+        """
+        获取使用了某件衣物的所有穿搭（通过outfit_items索引查询）
+        :param account_id: 账号ID
+        :param clothes_id: 衣物ID
+        :return: 穿搭列表
+        """
+        return cls.query.join(
+            OutfitItem, OutfitItem.outfit_id == cls.id
+        ).filter(
+            OutfitItem.account_id == account_id,
+            OutfitItem.clothes_id == clothes_id
+        ).order_by(cls.created_at.desc()).all()
+    
     @classmethod
     def get_all_by_account(cls, account_id):
         """
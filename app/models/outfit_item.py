@@ -0,0 +1,46 @@
+from app import db
+from sqlalchemy import UniqueConstraint
+
+class OutfitItem(db.Model):
+    """穿搭与衣物的关联模型"""
+    __tablename__ = 'outfit_items'
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True, comment='关联ID')
+    account_id = db.Column(db.String(64), nullable=False, comment='所属账号ID')
+    outfit_id = db.Column(db.Integer, nullable=False, comment='穿搭ID')
+    clothes_id = db.Column(db.Integer, nullable=False, comment='衣物ID')
+    position = db.Column(db.Integer, nullable=False, default=0, comment='衣物在穿搭中的顺序')
+    
+    # 添加索引：按穿搭读取衣物、按衣物反查穿搭
+    __table_args__ = (
+        UniqueConstraint('outfit_id', 'clothes_id', name='uix_outfit_clothes'),
+        db.Index('idx_outfit_item_position', 'outfit_id', 'position'),
+        db.Index('idx_outfit_item_clothes', 'account_id', 'clothes_id'),
+    )
+
+    def __init__(self, account_id, clothes_id, position=0, outfit_id=None):
+        self.account_id = account_id
+        self.outfit_id = outfit_id
+        self.clothes_id = clothes_id
+        self.position = position
+    
+    @classmethod
+    def get_outfit_ids_by_clothes(cls, account_id, clothes_id):
+        """
+        获取使用了某件衣物的所有穿搭ID
+        :param account_id: 账号ID
+        :param clothes_id: 衣物ID
+        :return: 穿搭ID列表
+        """
+        rows = db.session.query(cls.outfit_id).filter_by(account_id=account_id, clothes_id=clothes_id).all()
+        return [row[0] for row in rows]
+    
+    @classmethod
+    def delete_by_clothes(cls, account_id, clothes_id):
+        """
+        从所有穿搭中移除某件衣物（不提交事务）
+        :param account_id: 账号ID
+        :param clothes_id: 衣物ID
+        :return: 删除的记录数
+        """
+        return cls.query.filter_by(account_id=account_id, clothes_id=clothes_id).delete(synchronize_session=False)
@@ -0,0 +1,131 @@
+from datetime import datetime, timedelta
+import json
+from app import db
+
+class RecognitionJob(db.Model):
+    """AI识别任务模型（基于数据库的任务队列）"""
+    __tablename__ = 'recognition_jobs'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True, comment='任务ID')
+    account_id = db.Column(db.String(64), nullable=False, index=True, comment='所属账号ID')
+    job_type = db.Column(db.String(20), nullable=False, default='upload', comment='任务类型')
+    status = db.Column(db.Enum('pending', 'running', 'completed', 'failed'),
+                       nullable=False, default='pending', comment='任务状态')
+    clothes_items = db.Column(db.Text, nullable=True, comment='待识别的衣物ID列表，JSON格式')
+    total_count = db.Column(db.Integer, nullable=False, default=0, comment='衣物总数')
+    processed_count = db.Column(db.Integer, nullable=False, default=0, comment='已处理数量')
+    success_count = db.Column(db.Integer, nullable=False, default=0, comment='识别成功数量')
+    failed_count = db.Column(db.Integer, nullable=False, default=0, comment='识别失败数量')
+    message = db.Column(db.String(255), nullable=True, comment='错误信息')
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, comment='创建时间')
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, comment='更新时间')
+
+    # 添加索引：后台线程按状态领取待处理任务、回收超时的运行中任务
+    __table_args__ = (
+        db.Index('idx_recognition_job_status_updated', 'status', 'updated_at'),
+    )
+
+    def __init__(self, account_id, clothes_items=None, job_type='upload'):
+        self.account_id = account_id
+        self.job_type = job_type
+        self.status = 'pending'
+        self.set_clothes_items(clothes_items or [])
+        self.total_count = len(clothes_items or [])
+        self.processed_count = 0
+        self.success_count = 0
+        self.failed_count = 0
+
+    def get_clothes_items(self):
+        """
+        获取任务包含的衣物ID列表
+        :return: 衣物ID列表
+        """
+        if not self.clothes_items:
+            return []
+        return json.loads(self.clothes_items)
+
+    def set_clothes_items(self, clothes_ids):
+        """
+        设置任务包含的衣物ID列表
+        :param clothes_ids: 衣物ID列表
+        """
+        self.clothes_items = json.dumps(clothes_ids)
+
+    def record_result(self, success):
+        """
+        记录一件衣物的处理结果
+        :param success: 是否识别成功
+        """
+        self.processed_count += 1
+        if success:
+            self.success_count += 1
+        else:
+            self.failed_count += 1
+
+    @classmethod
+    def get_by_id(cls, account_id, job_id):
+        """
+        通过ID获取任务
+        :param account_id: 账号ID
+        :param job_id: 任务ID
+        :return: 任务对象或None
+        """
+        return cls.query.filter_by(account_id=account_id, id=job_id).first()
+
+    @classmethod
+    def claim(cls, job_id):
+        """
+        原子地将待处理任务标记为运行中，多个进程同时领取时只有一个会成功
+        :param job_id: 任务ID
+        :return: 布尔值，表示是否领取成功
+        """
+        claimed = cls.query.filter_by(id=job_id, status='pending').update(
+            {'status': 'running', 'updated_at': datetime.utcnow()},
+            synchronize_session=False
+        )
+        db.session.commit()
+        return claimed == 1
+
+    @classmethod
+    def get_next_pending_id(cls):
+        """
+        获取最早的待处理任务ID
+        :return: 任务ID或None
+        """
+        row = db.session.query(cls.id).filter_by(status='pending').order_by(cls.id).first()
+        return row[0] if row else None
+
+    @classmethod
+    def requeue_stale(cls, timeout_seconds):
+        """
+        将长时间未更新的运行中任务重新放回队列（进程异常退出时遗留的任务）
+        :param timeout_seconds: 超时时间（秒）
+        :return: 重新入队的任务数量
+        """
+        deadline = datetime.utcnow() - timedelta(seconds=timeout_seconds)
+        count = cls.query.filter(
+            cls.status == 'running',
+            cls.updated_at < deadline
+        ).update({'status': 'pending'}, synchronize_session=False)
+        db.session.commit()
+        return count
+
+    def to_dict(self):
+        """
+        将任务对象转换为字典
+        :return: 任务信息字典
+        """
+        return {
+            'id': self.id,
+            'job_type': self.job_type,
+            'status': self.status,
+            'clothes_items': self.get_clothes_items(),
+            'total': self.total_count,
+            'processed': self.processed_count,
+            'success_count': self.success_count,
+            'failed_count': self.failed_count,
+            'progress': round(self.processed_count * 100.0 / self.total_count, 1) if self.total_count else 100.0,
+            'message': self.message,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
@@ -6,7 +6,7 @@ class Recommendation(db.Model):
     __tablename__ = 'recommendations'
     
     id = db.Column(db.Integer, primary_key=True, autoincrement=True, comment='推荐ID')
-    account_id = db.Column(db.String(64), nullable=False, index=True, comment='所属账号ID')
+    account_id = db.Column(db.String(64), nullable=False, comment='所属账号ID')
     outfit_id = db.Column(db.Integer, nullable=True, comment='推荐的穿搭ID')
     reason = db.Column(db.String(255), nullable=True, comment='推荐理由')
     recommendation_type = db.Column(db.String(50), nullable=True, comment='推荐类型')
@@ -15,6 +15,11 @@ class Recommendation(db.Model):
     is_viewed = db.Column(db.Boolean, default=False, comment='是否已查看')
     is_liked = db.Column(db.Boolean, default=False, comment='是否喜欢')
     created_at = db.Column(db.DateTime, default=datetime.utcnow, comment='创建时间')
+
+    # 添加索引：按穿搭查询推荐记录
+    __table_args__ = (
+        db.Index('idx_recommendation_account_outfit', 'account_id', 'outfit_id'),
+    )
     
     def __init__(self, account_id, date, outfit_id=None, feedback='neutral', generated_by_ai=True):
         self.account_id = account_id
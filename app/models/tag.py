@@ -1,6 +1,6 @@
 from datetime import datetime
 from app import db
-from sqlalchemy import UniqueConstraint
+from sqlalchemy import UniqueConstraint, insert
 
 class Tag(db.Model):
     """标签模型"""
@@ -77,6 +77,27 @@ class Tag(db.Model):
             db.session.commit()
         return tag
     
+    @classmethod
+    def get_or_create_many(cls, account_id, names):
+        """
+        批量获取或创建标签（不提交事务）
+        缺少的标签用executemany一次写入后再查询一次获取ID，查询次数与标签数量无关
+        :param account_id: 账号ID
+        :param names: 标签名称列表
+        :return: 标签名称到标签对象的字典
+        """
+        names = list(dict.fromkeys(name for name in names if name))
+        if not names:
+            return {}
+        
+        query = cls.query.filter(cls.account_id == account_id, cls.name.in_(names))
+        tags = {tag.name: tag for tag in query.all()}
+        missing = [{"account_id": account_id, "name": name} for name in names if name not in tags]
+        if missing:
+            db.session.execute(insert(cls), missing)
+            tags = {tag.name: tag for tag in query.all()}
+        return tags
+    
     @classmethod
     def get_all_by_account(cls, account_id):
         """
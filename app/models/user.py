@@ -10,7 +10,7 @@ class User(db.Model):
     
     id = db.Column(db.Integer, primary_key=True, autoincrement=True, comment='系统主键')
     account_id = db.Column(db.String(64), unique=True, nullable=False, comment='全局唯一账号ID（逻辑主键）')
-    username = db.Column(db.String(50), nullable=False, comment='用户名')
+    username = db.Column(db.String(50), nullable=False, index=True, comment='用户名')
     email = db.Column(db.String(100), unique=True, nullable=True, comment='邮箱')
     password_hash = db.Column(db.String(255), nullable=False, comment='加密后的密码')
     gender = db.Column(db.Enum('male', 'female', 'other'), nullable=True, comment='性别')
@@ -0,0 +1,63 @@
+from datetime import datetime
+from app import db
+from sqlalchemy import select
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+
+class WardrobeVersion(db.Model):
+    """衣橱版本号模型（每个账号的衣物写入次数，用于多进程间判断进程内的衣橱快照是否过期）"""
+    __tablename__ = 'wardrobe_versions'
+
+    account_id = db.Column(db.String(64), primary_key=True, comment='账号ID')
+    version = db.Column(db.Integer, nullable=False, default=0, comment='版本号，衣物每次写入后加1')
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, comment='更新时间')
+
+    @classmethod
+    def get_version(cls, account_id):
+        """
+        获取账号当前的衣橱版本号（按主键查询一行）
+        :param account_id: 账号ID
+        :return: 版本号，从未写入过时返回0
+        """
+        version = db.session.execute(
+            select(cls.version).where(cls.account_id == account_id)
+        ).scalar()
+        return version or 0
+
+    @classmethod
+    def bump(cls, account_id):
+        """
+        将账号的衣橱版本号加1
+        使用独立的连接和事务提交，不会提交或回滚调用方会话中的修改；
+        MySQL使用INSERT ... ON DUPLICATE KEY UPDATE，SQLite使用INSERT ... ON CONFLICT DO UPDATE，其他数据库先更新再插入
+        :param account_id: 账号ID
+        """
+        table = cls.__table__
+        now = datetime.utcnow()
+        values = {'account_id': account_id, 'version': 1, 'updated_at': now}
+
+        with db.engine.begin() as conn:
+            dialect = conn.dialect.name
+            if dialect == 'mysql':
+                stmt = mysql_insert(table).values(values)
+                conn.execute(stmt.on_duplicate_key_update(version=table.c.version + 1, updated_at=now))
+            elif dialect == 'sqlite':
+                stmt = sqlite_insert(table).values(values)
+                conn.execute(stmt.on_conflict_do_update(
+                    index_elements=['account_id'],
+                    set_={'version': table.c.version + 1, 'updated_at': now}
+                ))
+            else:
+                result = conn.execute(table.update().where(table.c.account_id == account_id).values(
+                    version=table.c.version + 1, updated_at=now
+                ))
+                if result.rowcount == 0:
+                    try:
+                        with conn.begin_nested():
+                            conn.execute(table.insert().values(values))
+                    except IntegrityError:
+                        # 并发写入时另一个事务已插入
+                        conn.execute(table.update().where(table.c.account_id == account_id).values(
+                            version=table.c.version + 1, updated_at=now
+                        ))
@@ -6,7 +6,7 @@ class WeatherLog(db.Model):
     __tablename__ = 'weather_logs'
     
     id = db.Column(db.Integer, primary_key=True, autoincrement=True, comment='记录ID')
-    account_id = db.Column(db.String(64), nullable=False, index=True, comment='所属账号ID')
+    account_id = db.Column(db.String(64), nullable=False, comment='所属账号ID')
     date = db.Column(db.Date, nullable=False, comment='日期')
     location = db.Column(db.String(100), nullable=True, comment='位置')
     temperature = db.Column(db.Numeric(4, 1), nullable=True, comment='温度 °C')
@@ -15,6 +15,12 @@ class WeatherLog(db.Model):
     wind_speed = db.Column(db.Numeric(5, 2), nullable=True, comment='风速')
     created_at = db.Column(db.DateTime, default=datetime.utcnow, comment='创建时间')
 
+    # 添加索引：按日期（及日期范围）和位置查询天气记录
+    __table_args__ = (
+        db.Index('idx_weather_account_date', 'account_id', 'date'),
+        db.Index('idx_weather_account_location', 'account_id', 'location'),
+    )
+
     def __init__(self, account_id, date, location=None, temperature=None, weather_condition=None, 
                  humidity=None, wind_speed=None):
         self.account_id = account_id
@@ -35,15 +35,21 @@ class OutfitResponseSchema(Schema):
         return obj.get_clothes_items()
     
     def get_clothes_details(self, obj):
-        """获取衣物详细信息列表"""
-        clothes_list = obj.get_clothes()
-        return [clothes.to_dict() for clothes in clothes_list]
+        """
+        获取衣物详细信息列表，可通过context传入OutfitService.get_clothes_map()的结果（衣物ID到衣物字典）；
+        clothes_map已包含快照之后新增的衣物，不在其中的只有已删除的衣物
+        """
+        clothes_map = self.context.get('clothes_map')
+        if clothes_map is None:
+            return [clothes.to_dict() for clothes in obj.get_clothes()]
+        return [clothes_map[clothes_id] for clothes_id in obj.get_clothes_items() if clothes_id in clothes_map]
 
 class OutfitFilterSchema(Schema):
     """穿搭过滤的schema"""
     style = fields.Str(allow_none=True)
     season = fields.Str(allow_none=True)
     occasion = fields.Str(allow_none=True)
+    clothes_id = fields.Int(allow_none=True)
 
 class OutfitAIRequestSchema(Schema):
     """AI穿搭请求的schema"""
@@ -0,0 +1,223 @@
+"""
+AI识别结果缓存服务
+按图片内容哈希和提示词指纹缓存识别结果，相同图片再次识别时不再调用大模型；
+命中次数和最近命中时间先在进程内累积再批量写入，容量淘汰每写入AI_CACHE_EVICT_INTERVAL条执行一次，
+因此读写缓存时不会每次都提交事务或统计全表；
+缓存的读写使用独立的数据库连接和事务，不会提交或回滚调用方会话中尚未提交的修改
+"""
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import bindparam, delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models.ai_recognition_cache import AiRecognitionCache
+from config import Config
+
+# 进程内命中统计
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+# 尚未写入数据库的命中记录：缓存ID -> [命中次数, 最近命中时间]，以及上次淘汰后写入的缓存条数
+_pending_lock = threading.Lock()
+_pending_hits = {}
+_puts_since_evict = 0
+
+
+class AICacheService:
+    """AI识别结果缓存服务类"""
+
+    @staticmethod
+    def get(image_hash, prompt_hash):
+        """
+        查询缓存的识别结果，过期的缓存视为未命中并删除
+        :param image_hash: 图片内容哈希
+        :param prompt_hash: 模型和提示词指纹
+        :return: 识别结果字典或None
+        """
+        if not Config.AI_CACHE_ENABLED or not image_hash:
+            return None
+
+        table = AiRecognitionCache.__table__
+        try:
+            with db.engine.begin() as conn:
+                entry = conn.execute(
+                    select(table.c.id, table.c.result, table.c.created_at).where(
+                        table.c.image_hash == image_hash,
+                        table.c.prompt_hash == prompt_hash
+                    )
+                ).first()
+
+                if entry and entry.created_at < datetime.utcnow() - timedelta(seconds=Config.AI_CACHE_TTL):
+                    conn.execute(delete(table).where(table.c.id == entry.id))
+                    entry = None
+
+            if not entry:
+                AICacheService._count("misses")
+                return None
+
+            result = json.loads(entry.result)
+            AICacheService._record_hit(entry.id)
+            AICacheService._count("hits")
+            return result
+        except Exception as e:
+            print(f"查询AI识别缓存失败: {str(e)}")
+            return None
+
+    @staticmethod
+    def put(image_hash, prompt_hash, result):
+        """
+        写入识别结果缓存，超过容量上限时淘汰最久未命中的记录
+        :param image_hash: 图片内容哈希
+        :param prompt_hash: 模型和提示词指纹
+        :param result: 识别结果字典
+        """
+        global _puts_since_evict
+        if not Config.AI_CACHE_ENABLED or not image_hash:
+            return
+
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(insert(AiRecognitionCache.__table__).values(
+                    image_hash=image_hash,
+                    prompt_hash=prompt_hash,
+                    result=json.dumps(result, ensure_ascii=False)
+                ))
+        except IntegrityError:
+            # 并发识别同一张图片时另一个线程已写入
+            return
+        except Exception as e:
+            print(f"写入AI识别缓存失败: {str(e)}")
+            return
+
+        with _pending_lock:
+            _puts_since_evict += 1
+            due = _puts_since_evict >= Config.AI_CACHE_EVICT_INTERVAL
+            if due:
+                _puts_since_evict = 0
+        if due:
+            AICacheService.evict()
+
+    @staticmethod
+    def evict():
+        """
+        淘汰过期缓存，并在数量超过上限时删除最久未命中的记录
+        每次最多删除AI_CACHE_EVICT_BATCH条，超出的部分留给下一次淘汰
+        :return: 删除的记录数
+        """
+        # 先写入累积的命中记录，避免刚被命中的缓存按旧的命中时间被淘汰
+        AICacheService.flush_hits()
+
+        table = AiRecognitionCache.__table__
+        try:
+            with db.engine.begin() as conn:
+                limit = Config.AI_CACHE_EVICT_BATCH
+                deadline = datetime.utcnow() - timedelta(seconds=Config.AI_CACHE_TTL)
+                expired_ids = conn.execute(
+                    select(table.c.id).where(table.c.created_at < deadline).limit(limit)
+                ).scalars().all()
+                removed = AICacheService._delete_ids(conn, expired_ids)
+
+                entries = conn.execute(select(func.count(table.c.id))).scalar()
+                overflow = min(entries - Config.AI_CACHE_MAX_ENTRIES, limit - removed)
+                if overflow > 0:
+                    stale_ids = conn.execute(
+                        select(table.c.id).order_by(table.c.last_hit_at.asc()).limit(overflow)
+                    ).scalars().all()
+                    removed += AICacheService._delete_ids(conn, stale_ids)
+            return removed
+        except Exception as e:
+            print(f"淘汰AI识别缓存失败: {str(e)}")
+            return 0
+
+    @staticmethod
+    def flush_hits():
+        """
+        将进程内累积的命中次数和最近命中时间批量写入数据库（一条UPDATE语句，按缓存ID批量执行）
+        :return: 写入的缓存记录数
+        """
+        with _pending_lock:
+            pending = dict(_pending_hits)
+            _pending_hits.clear()
+        if not pending:
+            return 0
+
+        table = AiRecognitionCache.__table__
+        stmt = update(table).where(table.c.id == bindparam('cache_id')).values(
+            hit_count=table.c.hit_count + bindparam('hits'),
+            last_hit_at=bindparam('hit_at')
+        )
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(stmt, [
+                    {"cache_id": cache_id, "hits": hits, "hit_at": hit_at}
+                    for cache_id, (hits, hit_at) in pending.items()
+                ])
+            return len(pending)
+        except Exception as e:
+            print(f"写入AI识别缓存命中记录失败: {str(e)}")
+            return 0
+
+    @staticmethod
+    def get_stats():
+        """
+        获取缓存统计信息
+        hits/misses/hit_rate只统计处理本次请求的进程（counter_scope为process，process_id为进程ID），
+        多进程部署时每次请求可能由不同进程返回；entries和total_hits为数据库中的全局统计
+        :return: 统计信息字典
+        """
+        with _stats_lock:
+            hits, misses = _stats["hits"], _stats["misses"]
+
+        AICacheService.flush_hits()
+        entries, total_hits = db.session.query(
+            func.count(AiRecognitionCache.id),
+            func.coalesce(func.sum(AiRecognitionCache.hit_count), 0)
+        ).one()
+
+        return {
+            "enabled": Config.AI_CACHE_ENABLED,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+            "counter_scope": "process",
+            "process_id": os.getpid(),
+            "entries": entries,
+            "total_hits": int(total_hits),
+            "max_entries": Config.AI_CACHE_MAX_ENTRIES,
+            "ttl": Config.AI_CACHE_TTL
+        }
+
+    @staticmethod
+    def _record_hit(cache_id):
+        """
+        在进程内记录一次命中，累积到AI_CACHE_HIT_FLUSH_SIZE条缓存记录时批量写入数据库
+        :param cache_id: 缓存记录ID
+        """
+        with _pending_lock:
+            pending = _pending_hits.setdefault(cache_id, [0, None])
+            pending[0] += 1
+            pending[1] = datetime.utcnow()
+            due = len(_pending_hits) >= Config.AI_CACHE_HIT_FLUSH_SIZE
+        if due:
+            AICacheService.flush_hits()
+
+    @staticmethod
+    def _delete_ids(conn, cache_ids):
+        """
+        按ID删除缓存记录（不提交事务）
+        :param conn: 数据库连接
+        :param cache_ids: 缓存记录ID列表
+        :return: 删除的记录数
+        """
+        if not cache_ids:
+            return 0
+        table = AiRecognitionCache.__table__
+        return conn.execute(delete(table).where(table.c.id.in_(cache_ids))).rowcount
+
+    @staticmethod
+    def _count(key):
+        """累加进程内统计计数"""
+        with _stats_lock:
+            _stats[key] += 1
@@ -1,41 +1,220 @@
 """
-AI视觉服务类，用于调用OpenAI API识别服装图片
+AI视觉服务类，用于调用大模型API识别服装图片
 """
 import json
 import time
 import requests
-from openai import OpenAI
 from config import Config
+from app.services.ai_cache_service import AICacheService
+from app.services.llm_provider import get_llm_provider
+from app.utils.hash_helper import sha256_text, sha256_url
+from app.utils.rate_limiter import TokenBucket
+
+# 进程内共享的识别请求限流器，上传识别、单件和批量重新识别的大模型请求都经过它（命中缓存不消耗令牌）
+vision_rate_limiter = TokenBucket(Config.AI_VISION_RATE_LIMIT, Config.AI_VISION_RATE_BURST)
 
 class AIVisionService:
     """AI视觉服务类"""
     
+    # 识别结果必须包含的字段
+    REQUIRED_FIELDS = ["category", "color", "season", "style", "confidence"]
+    
     def __init__(self):
-        """初始化OpenAI客户端"""
-        self.api_key = Config.OPENAI_API_KEY
+        """初始化"""
         self.model = Config.OPENAI_MODEL
         self.max_retries = Config.OPENAI_MAX_RETRIES
         self.system_prompt = Config.AI_VISION_SYSTEM_PROMPT
         self.user_prompt = Config.AI_VISION_USER_PROMPT
+        self.batch_size = Config.AI_VISION_BATCH_SIZE
         
-        # 初始化OpenAI客户端，不使用proxies参数
-        self.client = OpenAI(
-            base_url="https://ark.cn-beijing.volces.com/api/v3",
-            api_key=self.api_key
-        )
+        # 服务提供者、模型和提示词指纹，任一变化后旧的缓存自动失效
+        self.prompt_hash = sha256_text(self.llm.name, self.model, self.system_prompt, self.user_prompt)
+    
+    @property
+    def llm(self):
+        """进程内共享的大模型服务提供者，由Config.LLM_PROVIDER选择"""
+        return get_llm_provider(model=self.model)
+    
+    def _chat(self, **kwargs):
+        """
+        经过限流器调用大模型，令牌不足时等待
+        :return: 大模型返回的文本
+        """
+        vision_rate_limiter.acquire()
+        return self.llm.chat(**kwargs)
         
-    def analyze_clothing_image(self, image_url):
+    def analyze_clothing_image(self, image_url, image_hash=None):
         """
         分析服装图片，识别类别、颜色、季节和风格
+        优先按图片内容哈希查询识别缓存，命中时不调用大模型
+        :param image_url: 图片URL
+        :param image_hash: 图片内容SHA-256，未提供时下载图片计算
+        :return: 识别结果字典，包含image_hash字段
+        """
+        if Config.AI_CACHE_ENABLED and not image_hash:
+            image_hash = sha256_url(image_url)
+        
+        cached = AICacheService.get(image_hash, self.prompt_hash)
+        if cached is not None:
+            return {
+                "success": True,
+                "data": cached,
+                "raw_response": None,
+                "cached": True,
+                "image_hash": image_hash
+            }
+        
+        result = self._request_analysis(image_url)
+        result["image_hash"] = image_hash
+        
+        if result["success"]:
+            AICacheService.put(image_hash, self.prompt_hash, result["data"])
+        
+        return result
+    
+    def analyze_clothing_images(self, image_urls, image_hashes=None):
+        """
+        批量分析服装图片
+        缓存未命中的图片按AI_VISION_BATCH_SIZE分组，每组只发送一次多图请求，
+        返回结果中缺失或校验失败的图片再逐张单独识别
+        :param image_urls: 图片URL列表
+        :param image_hashes: 图片内容SHA-256列表（可选），与image_urls一一对应
+        :return: 识别结果字典列表，顺序与image_urls一致
+        """
+        image_hashes = list(image_hashes or [None] * len(image_urls))
+        results = [None] * len(image_urls)
+        pending = []
+        
+        # 先查询识别缓存
+        for index, image_url in enumerate(image_urls):
+            if Config.AI_CACHE_ENABLED and not image_hashes[index]:
+                image_hashes[index] = sha256_url(image_url)
+            
+            cached = AICacheService.get(image_hashes[index], self.prompt_hash)
+            if cached is not None:
+                results[index] = {
+                    "success": True,
+                    "data": cached,
+                    "raw_response": None,
+                    "cached": True,
+                    "image_hash": image_hashes[index]
+                }
+            else:
+                pending.append(index)
+        
+        # 未命中的图片分组批量识别
+        batch_size = max(1, self.batch_size)
+        for start in range(0, len(pending), batch_size):
+            group = pending[start:start + batch_size]
+            
+            if len(group) > 1:
+                batch_results = self._request_batch_analysis([image_urls[index] for index in group])
+            else:
+                batch_results = [None]
+            
+            for index, result in zip(group, batch_results):
+                # 批量结果缺失或校验失败时回退为单张识别
+                if result is None:
+                    result = self._request_analysis(image_urls[index])
+                
+                result["image_hash"] = image_hashes[index]
+                if result["success"]:
+                    AICacheService.put(image_hashes[index], self.prompt_hash, result["data"])
+                results[index] = result
+        
+        return results
+    
+    def _request_batch_analysis(self, image_urls):
+        """
+        在一次多模态请求中识别多张服装图片
+        :param image_urls: 图片URL列表
+        :return: 识别结果列表，与image_urls一一对应，无法使用的结果为None；
+                 结果数量不符或图片序号无效时全部为None
+        """
+        content = [{"type": "text", "text": self._build_batch_prompt(len(image_urls))}]
+        for index, image_url in enumerate(image_urls):
+            content.append({"type": "text", "text": f"图片{index + 1}:"})
+            content.append({"type": "image_url", "image_url": {"url": image_url}})
+        
+        try:
+            result_text = self._chat(
+                messages=[
+                    {"role": "system", "content": self.system_prompt},
+                    {"role": "user", "content": content}
+                ],
+                max_tokens=4096,
+                response_format={"type": "json_object"},
+                temperature=1,
+                top_p=0.7,
+                frequency_penalty=0,
+            )
+            parsed = json.loads(result_text)
+        except Exception as e:
+            print(f"批量识别失败，回退为单张识别: {str(e)}")
+            return [None] * len(image_urls)
+        
+        # 兼容直接返回数组或包裹在items字段中的结果
+        items = parsed.get("items") if isinstance(parsed, dict) else parsed
+        if not isinstance(items, list) or len(items) != len(image_urls):
+            print(f"批量识别结果数量不符，回退为单张识别: 期望{len(image_urls)}项")
+            return [None] * len(image_urls)
+        
+        # 按每项的图片序号对应到图片，序号缺失、越界或重复时无法确定对应关系，整组回退为单张识别
+        indexed = {}
+        for item in items:
+            index = item.get("index") if isinstance(item, dict) else None
+            if type(index) is not int or not 1 <= index <= len(image_urls) or index in indexed:
+                print("批量识别结果的图片序号无效，回退为单张识别")
+                return [None] * len(image_urls)
+            indexed[index] = {key: value for key, value in item.items() if key != "index"}
+        
+        results = []
+        for index in range(1, len(image_urls) + 1):
+            item = indexed[index]
+            if not self._missing_fields(item):
+                results.append({
+                    "success": True,
+                    "data": item,
+                    "raw_response": result_text
+                })
+            else:
+                results.append(None)
+        return results
+    
+    def _build_batch_prompt(self, count):
+        """
+        构建批量识别提示词
+        :param count: 图片数量
+        :return: 提示词
+        """
+        return (
+            f"{self.user_prompt}\n\n"
+            f"下面共有{count}张服装图片，请逐张分析，"
+            f"以JSON对象返回，格式为 {{\"items\": [...]}}，items数组长度必须为{count}，"
+            f"每个元素包含上述全部字段，并用index字段标明对应的图片序号（1到{count}）。"
+        )
+    
+    def _missing_fields(self, result):
+        """
+        检查识别结果缺少的必要字段
+        :param result: 识别结果字典
+        :return: 缺少的字段列表
+        """
+        if not isinstance(result, dict):
+            return list(self.REQUIRED_FIELDS)
+        return [field for field in self.REQUIRED_FIELDS if field not in result]
+    
+    def _request_analysis(self, image_url):
+        """
+        调用大模型分析服装图片
         :param image_url: 图片URL
         :return: 识别结果字典
         """
         # 重试机制
         for attempt in range(self.max_retries):
             try:
-                # 调用OpenAI API
-                response = self.client.chat.completions.create(
-                    model=self.model,
+                # 调用大模型接口
+                result_text = self._chat(
                     messages=[
                         {"role": "system", "content": self.system_prompt},
                         {"role": "user", "content": [
@@ -51,38 +230,29 @@ class AIVisionService:
                 )
                 
                 # 解析响应
-                if response and response.choices and len(response.choices) > 0:
-                    result_text = response.choices[0].message.content
-                    print(result_text)
-                    try:
-                        result = json.loads(result_text)
-                        # 验证返回的JSON是否包含所需字段
-                        required_fields = ["category", "color", "season", "style", "confidence"]
-                        if all(field in result for field in required_fields):
-                            return {
-                                "success": True,
-                                "data": result,
-                                "raw_response": result_text
-                            }
-                        else:
-                            missing_fields = [field for field in required_fields if field not in result]
-                            return {
-                                "success": False,
-                                "message": f"返回的JSON缺少必要字段: {', '.join(missing_fields)}",
-                                "raw_response": result_text
-                            }
-                    except json.JSONDecodeError:
+                print(result_text)
+                try:
+                    result = json.loads(result_text)
+                    # 验证返回的JSON是否包含所需字段
+                    missing_fields = self._missing_fields(result)
+                    if not missing_fields:
+                        return {
+                            "success": True,
+                            "data": result,
+                            "raw_response": result_text
+                        }
+                    else:
                         return {
                             "success": False,
-                            "message": "无法解析返回的JSON",
+                            "message": f"返回的JSON缺少必要字段: {', '.join(missing_fields)}",
                             "raw_response": result_text
                         }
-                
-                return {
-                    "success": False,
-                    "message": "API返回的响应格式不正确",
-                    "raw_response": str(response)
-                }
+                except json.JSONDecodeError:
+                    return {
+                        "success": False,
+                        "message": "无法解析返回的JSON",
+                        "raw_response": result_text
+                    }
                 
             except Exception as e:
                 # 如果不是最后一次尝试，等待一段时间后重试
@@ -91,7 +261,7 @@ class AIVisionService:
                 else:
                     return {
                         "success": False,
-                        "message": f"调用OpenAI API失败: {str(e)}",
+                        "message": f"调用大模型API失败: {str(e)}",
                         "raw_response": None
                     }
         
@@ -1,13 +1,30 @@
 """
 衣物服务类
 """
+import io
 import random
 from datetime import datetime
+from flask import current_app
+from sqlalchemy import and_, false, func, or_
+from sqlalchemy.orm import load_only
 from app import db
 from app.models.clothes import Clothes
 from app.models.clothes_ai_info import ClothesAiInfo
+from app.models.clothes_tag import ClothesTag
+from app.models.tag import Tag
+from app.models.outfit_item import OutfitItem
+from app.models.recognition_job import RecognitionJob
 from app.utils.oss_helper import OSSHelper
 from app.services.ai_vision_service import AIVisionService
+from app.services.ai_cache_service import AICacheService
+from app.services.recognition_queue import recognition_queue
+from app.services.image_variant_queue import image_variant_queue
+from app.services.wardrobe_cache import wardrobe_cache
+from app.utils.concurrency import run_in_parallel
+from app.utils.hash_helper import sha256_stream
+from app.utils.image_helper import process_image, generate_thumbnails
+from app.utils.pagination import encode_cursor, decode_cursor
+from config import Config
 
 class ClothesService:
     """衣物服务类"""
@@ -20,6 +37,8 @@ class ClothesService:
     def upload_clothes_images(self, account_id, files):
         """
         上传衣物图片
+        文件并发上传到OSS后立即创建"待识别"状态的衣物记录并返回，
+        AI识别由后台任务队列异步完成，可通过任务ID查询进度
         :param account_id: 用户账号ID
         :param files: 文件列表
         :return: 上传结果列表
@@ -27,47 +46,154 @@ class ClothesService:
         if not files or len(files) == 0:
             return {"success": False, "message": "没有上传文件"}
         
-        result = []
+        # 并发上传文件，结果顺序与文件顺序一致
+        processed = run_in_parallel(
+            lambda file: self._upload_file(account_id, file),
+            files,
+            Config.UPLOAD_MAX_WORKERS
+        )
+        
+        return self._create_uploaded_clothes(account_id, processed)
+    
+    def presign_uploads(self, account_id, files):
+        """
+        为客户端直传OSS签发上传URL，文件内容不经过应用服务器
+        客户端用返回的URL和请求头PUT文件后，调用commit_uploads提交对象键名创建衣物并开始识别
+        :param account_id: 用户账号ID
+        :param files: 文件信息列表，每项包含filename和可选的content_type
+        :return: 结果字典，result为每个文件的对象键名和上传URL
+        """
+        if not files:
+            return {"success": False, "message": "没有上传文件"}
+        if len(files) > Config.UPLOAD_MAX_FILES:
+            return {"success": False, "message": f"单次最多上传{Config.UPLOAD_MAX_FILES}个文件"}
         
+        result = []
         for file in files:
-            # 上传文件到OSS
-            object_key = self.oss_helper.upload_file(account_id, file)
-            
-            if not object_key:
-                result.append({
-                    "filename": file.filename,
-                    "success": False,
-                    "message": "文件上传失败"
-                })
+            filename = file.get("filename") or ""
+            if not self.oss_helper.allowed_file(filename):
+                result.append({"filename": filename, "success": False, "message": "不支持的文件类型"})
                 continue
             
-            # 生成图片URL
-            image_url = self.oss_helper.get_public_url(object_key)
+            object_key = self.oss_helper.generate_object_key(account_id, filename)
+            signed = self.oss_helper.get_signed_put_url(object_key, content_type=file.get("content_type"))
+            if not signed:
+                result.append({"filename": filename, "success": False, "message": "生成上传URL失败"})
+                continue
             
-            # 创建衣物记录（使用AI识别数据）
-            clothes = self._create_clothes_with_ai_recognition(account_id, image_url)
+            result.append({
+                "filename": filename,
+                "success": True,
+                "object_key": object_key,
+                "upload_url": signed["url"],
+                "method": signed["method"],
+                "headers": signed["headers"],
+                "expiration": signed["expiration"]
+            })
+        
+        if not any(item["success"] for item in result):
+            return {"success": False, "message": "所有文件签名失败"}
+        
+        return {
+            "success": True,
+            "result": {
+                "max_size": Config.MAX_CONTENT_LENGTH,
+                "items": result
+            }
+        }
+    
+    def commit_uploads(self, account_id, object_keys):
+        """
+        提交客户端已直传到OSS的文件：校验对象属于当前账号且已上传、大小不超过限制后，
+        与表单上传相同，批量创建待识别的衣物记录和识别任务
+        :param account_id: 用户账号ID
+        :param object_keys: presign_uploads返回的对象键名列表
+        :return: 上传结果字典，格式与upload_clothes_images相同
+        """
+        if not object_keys:
+            return {"success": False, "message": "没有上传文件"}
+        if len(object_keys) > Config.UPLOAD_MAX_FILES:
+            return {"success": False, "message": f"单次最多上传{Config.UPLOAD_MAX_FILES}个文件"}
+        
+        # 同一对象只能创建一件衣物
+        image_urls = {object_key: self.oss_helper.get_public_url(object_key) for object_key in object_keys}
+        committed = {
+            row[0] for row in db.session.query(Clothes.image_url).filter(
+                Clothes.account_id == account_id,
+                Clothes.image_url.in_(list(image_urls.values()))
+            ).all()
+        }
+        
+        prefix = f"clothes/{account_id}/"
+        
+        def _check(object_key):
+            item = {"filename": object_key, "object_key": None, "image_url": None, "image_hash": None}
+            if not object_key.startswith(prefix) or not self.oss_helper.allowed_file(object_key):
+                item["message"] = "无效的对象键名"
+            elif image_urls[object_key] in committed:
+                item["message"] = "文件已提交"
+            else:
+                meta = self.oss_helper.get_object_meta(object_key)
+                if not meta:
+                    item["message"] = "文件未上传"
+                elif meta["size"] > Config.MAX_CONTENT_LENGTH:
+                    item["message"] = f"文件大小超过限制，最大允许{Config.MAX_CONTENT_LENGTH // (1024 * 1024)}MB"
+                    self.oss_helper.delete_object(object_key)
+                else:
+                    # 图片内容哈希在识别时按需下载计算
+                    item["object_key"] = object_key
+                    item["image_url"] = image_urls[object_key]
+            return item
+        
+        # 并发查询对象信息，结果顺序与对象键名顺序一致
+        processed = run_in_parallel(_check, list(dict.fromkeys(object_keys)), Config.UPLOAD_MAX_WORKERS)
+        return self._create_uploaded_clothes(account_id, processed)
+    
+    def _create_uploaded_clothes(self, account_id, processed):
+        """
+        为已保存到OSS的文件创建待识别的衣物记录并提交后台识别任务
+        :param account_id: 用户账号ID
+        :param processed: 文件处理结果列表，object_key为空表示该文件失败，失败原因在message中
+        :return: 上传结果字典
+        """
+        uploaded = [item for item in processed if item["object_key"]]
+        created, errors, job = self._save_pending_clothes(account_id, uploaded)
+        
+        # 提交后台识别任务
+        if job:
+            recognition_queue.enqueue(current_app._get_current_object(), job.id)
+        
+        result = []
+        for item in processed:
+            clothes = created.get(item["object_key"]) if item["object_key"] else None
             
             if clothes:
                 result.append({
-                    "filename": file.filename,
+                    "filename": item["filename"],
                     "success": True,
                     "clothes_id": clothes.id,
-                    "image_url": image_url
+                    "image_url": item["image_url"],
+                    "recognition_status": clothes.recognition_status
+                })
+            elif item["object_key"]:
+                result.append({
+                    "filename": item["filename"],
+                    "success": False,
+                    "message": errors.get(item["object_key"], "创建衣物记录失败")
                 })
             else:
                 result.append({
-                    "filename": file.filename,
+                    "filename": item["filename"],
                     "success": False,
-                    "message": "创建衣物记录失败"
+                    "message": item.get("message", "文件上传失败")
                 })
-                # 删除已上传的文件
-                self.oss_helper.delete_object(object_key)
         
         if any(item["success"] for item in result):
             return {
                 "success": True,
                 "items": {
-                    "total": len(files),
+                    "job_id": job.id,
+                    "total": len(processed),
                     "success_count": sum(1 for item in result if item["success"]),
                     "failed_count": sum(1 for item in result if not item["success"]),
                     "items": result
@@ -79,85 +205,443 @@ class ClothesService:
                 "message": "所有文件上传失败"
             }
     
-    def _create_clothes_with_ai_recognition(self, account_id, image_url):
+    def _upload_file(self, account_id, file):
         """
-        使用AI识别创建衣物记录
+        上传单个文件到OSS（在工作线程中执行，不访问数据库会话）
+        启用图片处理时上传规范化后的图片和缩略图，无法处理的文件按原图上传（缩略图在第一次被请求时补生成）
         :param account_id: 用户账号ID
-        :param image_url: 图片URL
-        :return: 衣物对象
+        :param file: 文件对象
+        :return: 处理结果字典
         """
+        item = {
+            "filename": file.filename,
+            "object_key": None,
+            "image_url": None,
+            "image_hash": None,
+            "image_variants": None,
+            "derived_keys": []
+        }
+        
+        # 计算图片内容哈希，用于AI识别缓存
         try:
-            # 调用AI服务识别图片
-            ai_result = self.ai_service.analyze_clothing_image(image_url)
+            item["image_hash"] = sha256_stream(file.stream)
+        except Exception as e:
+            print(f"计算图片哈希失败: {str(e)}")
+        
+        # 规范化图片（解码、按EXIF旋转、去除元数据、限制尺寸）并生成缩略图
+        processed = process_image(file.stream) if self.oss_helper.allowed_file(file.filename or '') else None
+        
+        # 上传文件到OSS
+        if processed:
+            object_key = self._upload_processed_image(account_id, file.filename, processed, item)
+        else:
+            object_key = self.oss_helper.upload_file(account_id, file)
+        if object_key:
+            item["object_key"] = object_key
+            item["image_url"] = self.oss_helper.get_public_url(object_key)
+        
+        return item
+    
+    def _upload_processed_image(self, account_id, filename, processed, item):
+        """
+        上传规范化后的图片，缩略图保存在派生键名下（缩略图上传失败不影响主图）
+        :param account_id: 用户账号ID
+        :param filename: 原始文件名
+        :param processed: ProcessedImage对象
+        :param item: 处理结果字典，上传成功的缩略图键名追加到derived_keys，URL保存到image_variants
+        :return: 主图的对象键名，上传失败返回None
+        """
+        name = filename.rsplit('.', 1)[0]
+        object_key = self.oss_helper.generate_object_key(account_id, f"{name}.{processed.extension}")
+        if not self.oss_helper.put_stream(object_key, io.BytesIO(processed.data), processed.content_type):
+            return None
+        
+        variants = self._upload_thumbnails(object_key, processed.thumbnails, item["derived_keys"])
+        # 部分缩略图上传失败时不保存，第一次被请求时重新生成
+        if len(variants) == len(processed.thumbnails):
+            item["image_variants"] = variants
+        return object_key
+    
+    def _upload_thumbnails(self, object_key, thumbnails, derived_keys=None):
+        """
+        上传缩略图到原图的派生键名下（<原图键名>_w<尺寸>.webp）
+        :param object_key: 原图的对象键名
+        :param thumbnails: 缩略图边长到编码数据的字典
+        :param derived_keys: 可选列表，上传成功的缩略图键名追加到其中
+        :return: 上传成功的缩略图边长到URL的字典
+        """
+        variants = {}
+        for size, data in thumbnails.items():
+            thumbnail_key = self.oss_helper.derive_object_key(object_key, f"w{size}", "webp")
+            if self.oss_helper.put_stream(thumbnail_key, io.BytesIO(data), "image/webp"):
+                variants[size] = self.oss_helper.get_public_url(thumbnail_key)
+                if derived_keys is not None:
+                    derived_keys.append(thumbnail_key)
+        return variants
+    
+    def generate_image_variants(self, account_id, clothes_id):
+        """
+        为没有缩略图的衣物补生成缩略图（由缩略图补生成队列调用）
+        下载原图生成全部尺寸的缩略图并保存URL；原图无法解码时保存空字典，之后不再重试；
+        下载或上传失败时不保存，下次被请求时重试
+        :param account_id: 用户账号ID
+        :param clothes_id: 衣物ID
+        :return: 缩略图边长到URL的字典，未生成时返回None
+        """
+        clothes = Clothes.get_by_id(account_id, clothes_id)
+        if not clothes or not clothes.needs_image_variants:
+            return None
+        image_url = clothes.image_url
+        
+        # 不是本存储中的图片（如外部URL），无法生成缩略图
+        object_key = self.oss_helper.get_object_key(image_url)
+        data = self.oss_helper.get_object(object_key) if object_key else None
+        if object_key and data is None:
+            return None
+        
+        variants = {}
+        if data is not None:
+            try:
+                thumbnails = generate_thumbnails(io.BytesIO(data))
+            except Exception as e:
+                print(f"生成缩略图失败，原图无法解码: {str(e)}")
+                thumbnails = {}
+            if thumbnails is None:
+                return None
             
-            if ai_result["success"]:
-                # 从AI识别结果中提取信息
-                data = ai_result["data"]
-                category = data.get("category", "未分类")
-                color = data.get("color", "未知")
-                season = data.get("season", "")
-                style = data.get("style", "普通")
-                confidence = data.get("confidence", 0)
-                
-                # 创建衣物记录
-                clothes = Clothes(
-                    account_id=account_id,
-                    name=f"{color}{category}",
-                    category=category,
-                    color=color,
-                    season=season,
-                    style=style,
-                    status="available",
-                    image_url=image_url
-                )
-                
-                db.session.add(clothes)
+            variants = self._upload_thumbnails(object_key, thumbnails)
+            if len(variants) != len(thumbnails):
+                return None
+        
+        try:
+            if Clothes.save_image_variants(account_id, clothes_id, image_url, variants):
                 db.session.commit()
-                
-                # 创建AI识别信息记录
-                self._create_ai_info(account_id, clothes.id, data, confidence)
-                
-                return clothes
+                wardrobe_cache.invalidate(account_id)
             else:
-                # AI识别失败，使用默认数据
-                print(f"AI识别失败: {ai_result['message']}")
-                return self._create_clothes_with_default_data(account_id, image_url)
-                
+                db.session.rollback()
+            return variants
         except Exception as e:
             db.session.rollback()
-            print(f"创建衣物记录失败: {str(e)}")
-            return self._create_clothes_with_default_data(account_id, image_url)
+            print(f"保存缩略图失败: {str(e)}")
+            return None
     
-    def _create_ai_info(self, account_id, clothes_id, ai_data, confidence):
+    def _schedule_image_variants(self, account_id, clothes_list, fields=None):
         """
-        创建AI识别信息记录
+        为返回结果中没有缩略图的衣物提交补生成任务（不请求缩略图字段时不处理）
+        在序列化之后调用，只提交到后台队列，读取请求不会下载原图或提交事务
         :param account_id: 用户账号ID
-        :param clothes_id: 衣物ID
-        :param ai_data: AI识别数据
-        :param confidence: 识别置信度
-        :return: AI识别信息对象
+        :param clothes_list: 衣物对象列表
+        :param fields: 返回的字段列表，None表示全部字段
+        """
+        if fields is not None and not {'thumbnail_url', 'image_variants'} & set(fields):
+            return
+        
+        clothes_ids = [clothes.id for clothes in clothes_list if clothes.needs_image_variants]
+        if clothes_ids:
+            image_variant_queue.enqueue(current_app._get_current_object(), account_id, clothes_ids)
+    
+    def _delete_uploaded(self, item):
+        """
+        删除已上传的文件及其缩略图
+        :param item: 文件处理结果字典
+        """
+        for object_key in [item["object_key"]] + item.get("derived_keys", []):
+            self.oss_helper.delete_object(object_key)
+    
+    def _save_pending_clothes(self, account_id, items):
         """
+        在同一个事务中批量创建待识别的衣物记录和对应的识别任务，整个请求只提交一次
+        批量插入失败时回滚，改为每个文件使用一个保存点逐条插入，失败的文件单独回滚并删除已上传的文件；
+        最终提交失败时回滚全部记录并删除所有已上传的文件
+        :param account_id: 用户账号ID
+        :param items: 已上传文件的处理结果列表
+        :return: (对象键名到衣物对象的字典, 对象键名到失败原因的字典, 识别任务对象或None)
+        """
+        if not items:
+            return {}, {}, None
+        
+        rows = [
+            {
+                "status": "available",
+                "image_url": item["image_url"],
+                "recognition_status": "pending",
+                "image_hash": item["image_hash"],
+                "image_variants": Clothes.dump_image_variants(item["image_variants"])
+                if item.get("image_variants") else None
+            }
+            for item in items
+        ]
+        
+        created, errors = {}, {}
+        try:
+            for item, clothes in zip(items, Clothes.bulk_create(account_id, rows)):
+                created[item["object_key"]] = clothes
+        except Exception as e:
+            db.session.rollback()
+            print(f"批量创建衣物记录失败，改为逐条创建: {str(e)}")
+            for item, row in zip(items, rows):
+                try:
+                    with db.session.begin_nested():
+                        created[item["object_key"]] = Clothes.bulk_create(account_id, [row])[0]
+                except Exception as e:
+                    print(f"创建衣物记录失败: {item['filename']}: {str(e)}")
+                    errors[item["object_key"]] = "创建衣物记录失败"
+                    self._delete_uploaded(item)
+        
+        if not created:
+            db.session.rollback()
+            return {}, errors, None
+        
         try:
-            # 创建或更新AI识别信息
-            ai_info = ClothesAiInfo.update_ai_info(
+            job = RecognitionJob(
                 account_id=account_id,
-                clothes_id=clothes_id,
-                detected_category=ai_data.get("category"),
-                detected_color=ai_data.get("color"),
-                detected_texture=ai_data.get("texture", None),  # 纹理可能不存在
-                ai_confidence=float(confidence) / 100.0 if confidence else None  # 转换为0-1范围
+                clothes_items=[clothes.id for clothes in created.values()]
             )
-            return ai_info
+            db.session.add(job)
+            
+            db.session.commit()
+            wardrobe_cache.invalidate(account_id)
+            return created, errors, job
         except Exception as e:
-            print(f"创建AI识别信息失败: {str(e)}")
-            return None
+            db.session.rollback()
+            print(f"创建衣物记录失败: {str(e)}")
+            # 整个事务已回滚，删除本次保存的所有文件
+            for item in items:
+                if item["object_key"] in created:
+                    self._delete_uploaded(item)
+                    errors[item["object_key"]] = "创建衣物记录失败"
+            return {}, errors, None
+    
+    def process_recognition_job(self, job_id):
+        """
+        执行AI识别任务（由后台任务队列调用）
+        将任务中的衣物按批量识别大小分组并发识别，每完成一组即写入结果并更新任务进度：
+        upload任务识别仍处于待识别状态的衣物并写入衣物记录和AI识别信息；
+        reanalyze任务重新识别衣物，只批量更新AI识别信息
+        :param job_id: 任务ID
+        """
+        job = db.session.get(RecognitionJob, job_id)
+        if not job:
+            return
+        
+        query = Clothes.query.filter(
+            Clothes.account_id == job.account_id,
+            Clothes.id.in_(job.get_clothes_items())
+        )
+        if job.job_type == 'reanalyze':
+            # 重新识别任务被重新入队时从头执行，进度清零
+            query = query.filter(Clothes.image_url.isnot(None))
+            job.processed_count = job.success_count = job.failed_count = 0
+        else:
+            query = query.filter(Clothes.recognition_status == 'pending')
+        clothes_list = query.all()
+        
+        # 按批量识别的大小分组，各组之间并发执行
+        batch_size = max(1, Config.AI_VISION_BATCH_SIZE)
+        groups = [clothes_list[i:i + batch_size] for i in range(0, len(clothes_list), batch_size)]
+        targets = [
+            ([clothes.image_url for clothes in group], [clothes.image_hash for clothes in group])
+            for group in groups
+        ]
+        
+        def _on_result(index, ai_results):
+            ai_info_rows = []
+            for clothes, ai_result in zip(groups[index], ai_results):
+                if job.job_type == 'reanalyze':
+                    success = self._apply_reanalysis(clothes, ai_result, ai_info_rows)
+                else:
+                    success = self._apply_recognition(clothes, ai_result, ai_info_rows)
+                job.record_result(success)
+            # 整组衣物的AI识别信息一条语句写入
+            ClothesAiInfo.bulk_upsert(job.account_id, ai_info_rows)
+            db.session.commit()
+            wardrobe_cache.invalidate(job.account_id)
+        
+        try:
+            run_in_parallel(
+                lambda target: self._recognize_images(target[0], target[1]),
+                targets,
+                Config.UPLOAD_MAX_WORKERS,
+                on_result=_on_result
+            )
+            # 任务创建后被删除或失去图片的衣物计为失败
+            for _ in range(job.total_count - job.processed_count):
+                job.record_result(False)
+            job.status = 'completed'
+        except Exception as e:
+            db.session.rollback()
+            print(f"执行AI识别任务失败: {str(e)}")
+            job.status = 'failed'
+            job.message = f"执行AI识别任务失败: {str(e)}"[:255]
+        
+        db.session.commit()
     
-    def _create_clothes_with_default_data(self, account_id, image_url):
+    def reanalyze_clothes_batch(self, account_id, clothes_ids):
         """
-        使用默认数据创建衣物记录（当AI识别失败时使用）
+        批量重新识别衣物：创建reanalyze类型的识别任务，由后台任务队列限流并发识别并批量写入AI识别信息
         :param account_id: 用户账号ID
-        :param image_url: 图片URL
-        :return: 衣物对象
+        :param clothes_ids: 衣物ID列表，"all"表示衣橱中所有有图片的衣物
+        :return: 结果字典，result包含任务ID、衣物数量和被跳过的衣物ID
+        """
+        # 写操作直接查询数据库校验衣物，不使用可能过期的衣橱快照
+        query = db.session.query(Clothes.id, Clothes.image_url).filter(Clothes.account_id == account_id)
+        if clothes_ids == "all":
+            rows = query.order_by(Clothes.created_at.desc(), Clothes.id.desc()).all()
+            clothes_ids = [row.id for row in rows]
+        else:
+            clothes_ids = list(dict.fromkeys(clothes_ids))
+            rows = query.filter(Clothes.id.in_(clothes_ids)).all() if clothes_ids else []
+            found_ids = {row.id for row in rows}
+            missing_ids = [clothes_id for clothes_id in clothes_ids if clothes_id not in found_ids]
+            if missing_ids:
+                return {"success": False, "message": f"衣物不存在: {','.join(str(clothes_id) for clothes_id in missing_ids)}"}
+        
+        # 没有图片的衣物无法识别，跳过
+        image_urls = {row.id: row.image_url for row in rows}
+        skipped_ids = [clothes_id for clothes_id in clothes_ids if not image_urls[clothes_id]]
+        clothes_ids = [clothes_id for clothes_id in clothes_ids if image_urls[clothes_id]]
+        
+        if not clothes_ids:
+            return {"success": False, "message": "没有可以重新识别的衣物"}
+        if len(clothes_ids) > Config.REANALYZE_MAX_ITEMS:
+            return {"success": False, "message": f"单次最多重新识别{Config.REANALYZE_MAX_ITEMS}件衣物"}
+        
+        try:
+            job = RecognitionJob(account_id=account_id, clothes_items=clothes_ids, job_type='reanalyze')
+            db.session.add(job)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"创建重新识别任务失败: {str(e)}")
+            return {"success": False, "message": f"创建重新识别任务失败: {str(e)}"}
+        
+        recognition_queue.enqueue(current_app._get_current_object(), job.id)
+        
+        return {
+            "success": True,
+            "result": {
+                "job_id": job.id,
+                "total": len(clothes_ids),
+                "skipped": skipped_ids
+            }
+        }
+    
+    def get_ai_cache_stats(self):
+        """
+        获取AI识别缓存统计信息
+        :return: 统计信息字典
+        """
+        return AICacheService.get_stats()
+    
+    def get_recognition_job(self, account_id, job_id):
+        """
+        获取AI识别任务进度
+        :param account_id: 用户账号ID
+        :param job_id: 任务ID
+        :return: 任务信息字典或None
+        """
+        job = RecognitionJob.get_by_id(account_id, job_id)
+        if not job:
+            return None
+        
+        clothes_ids = job.get_clothes_items()
+        rows = db.session.query(Clothes.id, Clothes.recognition_status).filter(
+            Clothes.account_id == account_id,
+            Clothes.id.in_(clothes_ids)
+        ).all() if clothes_ids else []
+        statuses = {clothes_id: status for clothes_id, status in rows}
+        
+        result = job.to_dict()
+        result["items"] = [
+            {"clothes_id": clothes_id, "recognition_status": statuses.get(clothes_id)}
+            for clothes_id in clothes_ids
+        ]
+        return result
+    
+    def _recognize_images(self, image_urls, image_hashes=None):
+        """
+        调用AI服务批量识别图片，异常时返回失败结果
+        :param image_urls: 图片URL列表
+        :param image_hashes: 图片内容哈希列表
+        :return: AI识别结果字典列表
+        """
+        try:
+            return self.ai_service.analyze_clothing_images(image_urls, image_hashes=image_hashes)
+        except Exception as e:
+            return [{"success": False, "message": str(e)} for _ in image_urls]
+    
+    def _apply_recognition(self, clothes, ai_result, ai_info_rows):
+        """
+        将AI识别结果写入衣物记录（不提交），识别成功时把AI识别信息追加到ai_info_rows，由调用方批量写入
+        AI识别失败时使用默认数据，并将识别状态标记为失败
+        :param clothes: 衣物对象
+        :param ai_result: AI识别结果字典
+        :param ai_info_rows: 待写入的AI识别信息列表
+        :return: 布尔值，表示是否识别成功
+        """
+        if ai_result and ai_result.get("image_hash") and not clothes.image_hash:
+            clothes.image_hash = ai_result["image_hash"]
+        
+        if ai_result and ai_result["success"]:
+            # 从AI识别结果中提取信息
+            data = ai_result["data"]
+            category = data.get("category", "未分类")
+            color = data.get("color", "未知")
+            
+            clothes.name = f"{color}{category}"
+            clothes.category = category
+            clothes.color = color
+            clothes.season = data.get("season", "")
+            clothes.style = data.get("style", "普通")
+            clothes.recognition_status = "completed"
+            
+            ai_info_rows.append(self._build_ai_info_row(clothes.id, data))
+            return True
+        
+        # AI识别失败，使用默认数据
+        print(f"AI识别失败: {ai_result['message'] if ai_result else '无识别结果'}")
+        self._apply_default_data(clothes)
+        clothes.recognition_status = "failed"
+        return False
+    
+    def _apply_reanalysis(self, clothes, ai_result, ai_info_rows):
+        """
+        处理重新识别的结果（不提交）：只记录图片哈希，识别成功时把AI识别信息追加到ai_info_rows，不修改衣物的分类等信息
+        :param clothes: 衣物对象
+        :param ai_result: AI识别结果字典
+        :param ai_info_rows: 待写入的AI识别信息列表
+        :return: 布尔值，表示是否识别成功
+        """
+        if ai_result and ai_result.get("image_hash") and not clothes.image_hash:
+            clothes.image_hash = ai_result["image_hash"]
+        
+        if ai_result and ai_result["success"]:
+            ai_info_rows.append(self._build_ai_info_row(clothes.id, ai_result["data"]))
+            return True
+        
+        print(f"重新识别衣物失败: {ai_result['message'] if ai_result else '无识别结果'}")
+        return False
+    
+    def _build_ai_info_row(self, clothes_id, ai_data):
+        """
+        将AI识别数据转换为ClothesAiInfo.bulk_upsert的一行
+        :param clothes_id: 衣物ID
+        :param ai_data: AI识别数据
+        :return: AI识别信息字典
+        """
+        confidence = ai_data.get("confidence", 0)
+        return {
+            "clothes_id": clothes_id,
+            "detected_category": ai_data.get("category"),
+            "detected_color": ai_data.get("color"),
+            "detected_texture": ai_data.get("texture", None),  # 纹理可能不存在
+            "ai_confidence": float(confidence) / 100.0 if confidence else None  # 转换为0-1范围
+        }
+    
+    def _apply_default_data(self, clothes):
+        """
+        使用默认数据填充衣物信息（当AI识别失败时使用）
+        :param clothes: 衣物对象
         """
         # 默认数据
         categories = ["上衣", "裤子", "裙子", "外套", "鞋子", "配饰"]
@@ -168,31 +652,12 @@ class ClothesService:
         # 随机选择默认数据
         category = random.choice(categories)
         color = random.choice(colors)
-        season = ",".join(random.sample(seasons, random.randint(1, 3)))
-        style = random.choice(styles)
-        name = f"{color}{category}"
         
-        try:
-            # 创建衣物记录
-            clothes = Clothes(
-                account_id=account_id,
-                name=name,
-                category=category,
-                color=color,
-                season=season,
-                style=style,
-                status="available",
-                image_url=image_url
-            )
-            
-            db.session.add(clothes)
-            db.session.commit()
-            
-            return clothes
-        except Exception as e:
-            db.session.rollback()
-            print(f"创建衣物记录失败: {str(e)}")
-            return None
+        clothes.name = f"{color}{category}"
+        clothes.category = category
+        clothes.color = color
+        clothes.season = ",".join(random.sample(seasons, random.randint(1, 3)))
+        clothes.style = random.choice(styles)
     
     def get_clothes_by_id(self, account_id, clothes_id):
         """
@@ -203,15 +668,39 @@ class ClothesService:
         """
         return Clothes.get_by_id(account_id, clothes_id)
     
-    def get_clothes_list(self, account_id, category=None, status=None, season=None):
+    def get_clothes_detail(self, account_id, clothes_id, include=None):
         """
-        获取衣物列表
+        获取衣物详情
+        :param account_id: 用户账号ID
+        :param clothes_id: 衣物ID
+        :param include: 附加返回的关联数据列表，支持tags、ai_info
+        :return: 衣物字典，衣物不存在时返回None
+        """
+        clothes = self.get_clothes_by_id(account_id, clothes_id)
+        if not clothes:
+            return None
+        
+        item = clothes.to_dict()
+        self._attach_includes(account_id, [item], include)
+        self._schedule_image_variants(account_id, [clothes])
+        return item
+    
+    def get_clothes_list(self, account_id, category=None, status=None, season=None,
+                         cursor=None, page_size=None, fields=None, include=None):
+        """
+        按(created_at, id)游标分页获取衣物列表，按创建时间倒序
         :param account_id: 用户账号ID
         :param category: 分类
         :param status: 状态
         :param season: 季节
-        :return: 衣物列表
+        :param cursor: 上一页返回的next_cursor，为空时返回第一页
+        :param page_size: 每页数量，默认Config.CLOTHES_PAGE_SIZE，最大Config.CLOTHES_MAX_PAGE_SIZE
+        :param fields: 只返回指定的字段（SQL只查询对应的列，总是包含id），默认返回全部字段
+        :param include: 附加返回的关联数据列表，支持tags、ai_info（整页衣物的每种关联数据各一次查询）
+        :return: 包含items、next_cursor、has_more、total的字典；total只在第一页计算，其余页为None
         """
+        page_size = min(page_size or Config.CLOTHES_PAGE_SIZE, Config.CLOTHES_MAX_PAGE_SIZE)
+        
         query = Clothes.query.filter_by(account_id=account_id)
         
         if category:
@@ -221,9 +710,104 @@ class ClothesService:
             query = query.filter_by(status=status)
         
         if season:
-            query = query.filter(Clothes.season.like(f'%{season}%'))
+            # 无法识别的季节不匹配任何衣物
+            condition = Clothes.season_filter(season)
+            query = query.filter(condition if condition is not None else false())
         
-        return query.all()
+        # 总数只在第一页统计，翻页时不再重复计算
+        total = None
+        if not cursor:
+            total = query.with_entities(func.count(Clothes.id)).scalar()
+        
+        if cursor:
+            created_at, last_id = decode_cursor(cursor)
+            query = query.filter(or_(
+                Clothes.created_at < created_at,
+                and_(Clothes.created_at == created_at, Clothes.id < last_id)
+            ))
+        
+        if fields:
+            fields = ['id'] + [field for field in fields if field != 'id']
+            query = query.options(load_only(*Clothes.get_field_columns(fields)))
+        
+        # 多查询一条用于判断是否还有下一页
+        clothes_list = query.order_by(Clothes.created_at.desc(), Clothes.id.desc()).limit(page_size + 1).all()
+        has_more = len(clothes_list) > page_size
+        clothes_list = clothes_list[:page_size]
+        
+        items = [clothes.to_dict(fields) for clothes in clothes_list]
+        self._attach_includes(account_id, items, include)
+        
+        # 旧图片第一次被请求时提交到后台补生成缩略图，本次先返回原图URL
+        self._schedule_image_variants(account_id, clothes_list, fields)
+        
+        return {
+            "total": total,
+            "items": items,
+            "page_size": page_size,
+            "has_more": has_more,
+            "next_cursor": encode_cursor(clothes_list[-1].created_at, clothes_list[-1].id) if has_more else None
+        }
+    
+    def _attach_includes(self, account_id, items, include):
+        """
+        为衣物字典附加关联数据，每种关联数据对全部衣物只执行一次查询
+        :param account_id: 用户账号ID
+        :param items: 衣物字典列表（包含id）
+        :param include: 附加返回的关联数据列表
+        """
+        if not include or not items:
+            return
+        
+        clothes_ids = [item["id"] for item in items]
+        
+        if 'tags' in include:
+            tags_map = ClothesTag.get_tags_map(account_id, clothes_ids)
+            for item in items:
+                item["tags"] = [tag.to_dict() for tag in tags_map[item["id"]]]
+        
+        if 'ai_info' in include:
+            ai_info_map = ClothesAiInfo.get_ai_info_map(account_id, clothes_ids)
+            for item in items:
+                ai_info = ai_info_map[item["id"]]
+                item["ai_info"] = ai_info.to_dict() if ai_info else None
+    
+    def set_clothes_tags(self, account_id, tags_by_clothes):
+        """
+        在一个事务中批量设置多件衣物的标签，不存在的标签按名称自动创建
+        :param account_id: 用户账号ID
+        :param tags_by_clothes: 衣物ID到标签名称列表的字典，空列表表示清空该衣物的标签
+        :return: 结果字典，result为每件衣物设置后的标签列表
+        """
+        if not tags_by_clothes:
+            return {"success": False, "message": "没有需要设置标签的衣物"}
+        
+        # 写操作直接查询数据库校验衣物，不使用可能过期的衣橱快照
+        clothes_ids = Clothes.filter_ids(account_id, list(tags_by_clothes))
+        missing_ids = [clothes_id for clothes_id in tags_by_clothes if clothes_id not in clothes_ids]
+        if missing_ids:
+            return {"success": False, "message": f"衣物不存在: {','.join(str(clothes_id) for clothes_id in missing_ids)}"}
+        
+        try:
+            tags = Tag.get_or_create_many(account_id, [name for names in tags_by_clothes.values() for name in names])
+            ClothesTag.set_tags(account_id, {
+                clothes_id: [tags[name].id for name in names if name in tags]
+                for clothes_id, names in tags_by_clothes.items()
+            })
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"批量设置衣物标签失败: {str(e)}")
+            return {"success": False, "message": f"批量设置衣物标签失败: {str(e)}"}
+        
+        tags_map = ClothesTag.get_tags_map(account_id, clothes_ids)
+        return {
+            "success": True,
+            "result": [
+                {"clothes_id": clothes_id, "tags": [tag.to_dict() for tag in tags_map[clothes_id]]}
+                for clothes_id in clothes_ids
+            ]
+        }
     
     def update_clothes(self, account_id, clothes_id, name=None, category=None, color=None, season=None, style=None):
         """
@@ -258,13 +842,17 @@ class ClothesService:
                 clothes.color = color
             
             if season is not None:
-                clothes.season_list = season.split(',') if isinstance(season, str) else season
+                if isinstance(season, str):
+                    clothes.season = season
+                else:
+                    clothes.season_list = season
             
             if style is not None:
                 clothes.style = style
             
             # 保存更新
             db.session.commit()
+            wardrobe_cache.invalidate(account_id)
             
             return {
                 "success": True,
@@ -304,15 +892,25 @@ class ClothesService:
         
         try:
             # 调用AI服务识别图片
-            ai_result = self.ai_service.analyze_clothing_image(clothes.image_url)
+            ai_result = self.ai_service.analyze_clothing_image(clothes.image_url, image_hash=clothes.image_hash)
+            
+            # 记录图片哈希，下次重新识别时无需再下载图片
+            if ai_result.get("image_hash") and not clothes.image_hash:
+                clothes.image_hash = ai_result["image_hash"]
+                db.session.commit()
+            wardrobe_cache.invalidate(account_id)
             
             if ai_result["success"]:
                 # 从AI识别结果中提取信息
                 data = ai_result["data"]
-                confidence = data.get("confidence", 0)
                 
                 # 更新AI识别信息记录
-                ai_info = self._create_ai_info(account_id, clothes_id, data, confidence)
+                try:
+                    ClothesAiInfo.bulk_upsert(account_id, [self._build_ai_info_row(clothes_id, data)])
+                    db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"创建AI识别信息失败: {str(e)}")
                 
                 # 返回AI识别结果，但不更新clothes表
                 return {
@@ -320,6 +918,7 @@ class ClothesService:
                     "result": {
                         "message": "AI识别成功",
                         "ai_result": data,
+                        "cached": ai_result.get("cached", False),
                         "clothes_id": clothes_id,
                         "image_url": clothes.image_url
                     }
@@ -355,9 +954,11 @@ class ClothesService:
             }
         
         try:
-            # 从数据库中删除衣物
+            # 从数据库中删除衣物，并从所有包含它的穿搭中移除
+            OutfitItem.delete_by_clothes(account_id, clothes_id)
             db.session.delete(clothes)
             db.session.commit()
+            wardrobe_cache.invalidate(account_id)
             
             return {
                 "success": True,
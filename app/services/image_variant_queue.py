@@ -0,0 +1,95 @@
+"""
+缩略图补生成队列
+新上传的图片在上传时生成缩略图；缩略图功能上线前的旧图片和直传的图片在第一次被请求时提交到这里，
+由进程内的后台线程下载原图并生成缩略图，请求本身不等待生成完成（先返回原图URL），也不在请求线程中生成
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from config import Config
+from app.utils.image_helper import is_enabled as image_processing_enabled
+
+
+class ImageVariantQueue:
+    """缩略图补生成队列"""
+
+    def __init__(self):
+        """初始化"""
+        self._executor = None
+        self._pid = None
+        self._pending = set()
+        self._futures = set()
+        self._lock = threading.Lock()
+        self._service = None
+
+    @property
+    def enabled(self):
+        """是否启用补生成（工作线程数为0时不为旧图片补生成缩略图）"""
+        return Config.IMAGE_VARIANT_WORKERS > 0
+
+    def enqueue(self, app, account_id, clothes_ids):
+        """
+        提交需要补生成缩略图的衣物，已在队列中的衣物会被忽略
+        :param app: Flask应用实例
+        :param account_id: 账号ID
+        :param clothes_ids: 衣物ID列表
+        """
+        if not clothes_ids or not self.enabled or not image_processing_enabled():
+            return
+
+        with self._lock:
+            # fork后的子进程不能使用父进程的线程池
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(
+                    max_workers=Config.IMAGE_VARIANT_WORKERS,
+                    thread_name_prefix='image-variant-worker'
+                )
+                self._pid = os.getpid()
+                self._pending = set()
+                self._futures = set()
+
+            for clothes_id in clothes_ids:
+                key = (account_id, clothes_id)
+                if key in self._pending:
+                    continue
+                self._pending.add(key)
+                future = self._executor.submit(self._run, app, account_id, clothes_id)
+                self._futures.add(future)
+                future.add_done_callback(self._futures.discard)
+
+    def wait(self, timeout=None):
+        """
+        等待已提交的补生成任务全部完成（用于进程退出前和测试）
+        :param timeout: 最长等待时间（秒），None表示一直等待
+        :return: 布尔值，表示是否全部完成
+        """
+        with self._lock:
+            futures = set(self._futures)
+        return not wait(futures, timeout=timeout).not_done
+
+    def _run(self, app, account_id, clothes_id):
+        """
+        在工作线程中生成一件衣物的缩略图
+        :param app: Flask应用实例
+        :param account_id: 账号ID
+        :param clothes_id: 衣物ID
+        """
+        try:
+            with app.app_context():
+                self._get_service().generate_image_variants(account_id, clothes_id)
+        except Exception as e:
+            print(f"生成缩略图失败: {str(e)}")
+        finally:
+            with self._lock:
+                self._pending.discard((account_id, clothes_id))
+
+    def _get_service(self):
+        """获取共享的衣物服务实例"""
+        if self._service is None:
+            from app.services.clothes_service import ClothesService
+            self._service = ClothesService()
+        return self._service
+
+
+# 进程内共享的缩略图补生成队列实例
+image_variant_queue = ImageVariantQueue()
@@ -0,0 +1,283 @@
+"""
+大模型服务提供者
+通过Config.LLM_PROVIDER选择实现：
+- openai: 调用OpenAI兼容接口（默认为火山方舟）
+- stub: 本地桩实现，返回符合格式要求的JSON，可配置延迟和错误率，用于离线压测
+服务提供者通过get_llm_provider()在进程内共享，底层HTTP连接池在请求之间复用
+"""
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+import httpx
+from openai import OpenAI
+from config import Config
+
+
+class LLMError(Exception):
+    """大模型调用异常"""
+
+
+class LLMProvider:
+    """大模型服务提供者基类"""
+
+    name = None
+
+    def chat(self, messages, **params):
+        """
+        调用对话补全接口
+        :param messages: 消息列表（OpenAI格式）
+        :param params: 其他请求参数，如max_tokens、temperature、response_format
+        :return: 模型返回的文本内容
+        """
+        raise NotImplementedError
+
+    def chat_stream(self, messages, **params):
+        """
+        以流式方式调用对话补全接口
+        :param messages: 消息列表（OpenAI格式）
+        :param params: 其他请求参数
+        :return: 生成器，逐段产出模型返回的文本
+        """
+        raise NotImplementedError
+
+
+class OpenAIProvider(LLMProvider):
+    """OpenAI兼容接口的服务提供者"""
+
+    name = 'openai'
+
+    def __init__(self, model=None):
+        """初始化OpenAI客户端，使用保持长连接的HTTP连接池"""
+        self.model = model or Config.OPENAI_MODEL
+        self.http_client = httpx.Client(
+            limits=httpx.Limits(
+                max_connections=Config.LLM_POOL_MAX_CONNECTIONS,
+                max_keepalive_connections=Config.LLM_POOL_MAX_KEEPALIVE,
+                keepalive_expiry=Config.LLM_POOL_KEEPALIVE_EXPIRY
+            ),
+            timeout=httpx.Timeout(Config.LLM_TIMEOUT, connect=Config.LLM_CONNECT_TIMEOUT)
+        )
+        self.client = OpenAI(
+            base_url=Config.OPENAI_BASE_URL,
+            api_key=Config.OPENAI_API_KEY,
+            http_client=self.http_client
+        )
+
+    def chat(self, messages, **params):
+        """
+        调用对话补全接口
+        :param messages: 消息列表
+        :param params: 其他请求参数
+        :return: 模型返回的文本内容
+        """
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            **params
+        )
+
+        if not response or not response.choices:
+            raise LLMError(f"API返回的响应格式不正确: {response}")
+
+        return response.choices[0].message.content
+
+    def chat_stream(self, messages, **params):
+        """
+        以流式方式调用对话补全接口
+        :param messages: 消息列表
+        :param params: 其他请求参数
+        :return: 生成器，逐段产出模型返回的文本
+        """
+        stream = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            stream=True,
+            **params
+        )
+
+        try:
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            # 调用方提前结束迭代时关闭连接，将连接归还连接池
+            stream.close()
+
+
+class StubProvider(LLMProvider):
+    """
+    本地桩服务提供者
+    根据请求内容返回确定性的JSON结果：包含图片的请求返回衣物识别结果（多图时返回带图片序号的items数组），
+    纯文本请求从提示词中挑选衣物ID返回穿搭推荐。延迟、错误和超时由固定种子的随机数控制，可重复复现
+    """
+
+    name = 'stub'
+
+    CATEGORIES = ["上衣", "下装", "裙子", "外套", "鞋子", "配饰"]
+    COLORS = ["黑色", "白色", "灰色", "蓝色", "红色", "米色"]
+    SEASONS = ["spring", "summer", "autumn", "winter"]
+    STYLES = ["休闲", "正式", "运动", "简约"]
+
+    # 从穿搭提示词的衣物列表（每行以“ID|”开头）中提取衣物ID
+    CLOTHES_ID_PATTERN = re.compile(r'^(\d+)\|', re.MULTILINE)
+    # 提示词中包含候选搭配方案时选择第一套方案
+    COMBO_PATTERN = re.compile(r'^方案\d+:\s*([\d,]+)', re.MULTILINE)
+
+    # 流式输出时每段文本的长度
+    STREAM_CHUNK_SIZE = 8
+
+    def __init__(self, model=None):
+        """初始化"""
+        self.model = model or 'stub'
+        self.latency = Config.LLM_STUB_LATENCY_MS / 1000.0
+        self.jitter = Config.LLM_STUB_LATENCY_JITTER_MS / 1000.0
+        self.error_rate = Config.LLM_STUB_ERROR_RATE
+        self.timeout_rate = Config.LLM_STUB_TIMEOUT_RATE
+        self._random = random.Random(Config.LLM_STUB_SEED)
+        self._lock = threading.Lock()
+
+    def chat(self, messages, **params):
+        """
+        模拟对话补全接口
+        :param messages: 消息列表
+        :param params: 其他请求参数（忽略）
+        :return: JSON文本
+        """
+        time.sleep(self._simulate_call())
+        return self._render(messages)
+
+    def chat_stream(self, messages, **params):
+        """
+        模拟流式对话补全接口，延迟平均分摊到首段文本和后续各段文本上
+        :param messages: 消息列表
+        :param params: 其他请求参数（忽略）
+        :return: 生成器，逐段产出JSON文本
+        """
+        delay = self._simulate_call()
+        content = self._render(messages)
+        chunks = [content[i:i + self.STREAM_CHUNK_SIZE] for i in range(0, len(content), self.STREAM_CHUNK_SIZE)]
+
+        time.sleep(delay / 2)
+        for chunk in chunks:
+            time.sleep(delay / 2 / len(chunks))
+            yield chunk
+
+    def _render(self, messages):
+        """
+        根据请求内容生成返回的JSON文本
+        :param messages: 消息列表
+        :return: JSON文本
+        """
+        user_content = messages[-1]["content"]
+        if isinstance(user_content, list):
+            image_urls = [part["image_url"]["url"] for part in user_content if part.get("type") == "image_url"]
+            if len(image_urls) > 1:
+                items = [dict(self._clothing_result(url), index=index) for index, url in enumerate(image_urls, 1)]
+                return json.dumps({"items": items}, ensure_ascii=False)
+            return json.dumps(self._clothing_result(image_urls[0] if image_urls else ''), ensure_ascii=False)
+
+        return json.dumps(self._outfit_result(user_content), ensure_ascii=False)
+
+    def _simulate_call(self):
+        """
+        按配置模拟错误和超时
+        :return: 本次请求应模拟的延迟（秒）
+        """
+        with self._lock:
+            delay = max(0.0, self._random.uniform(self.latency - self.jitter, self.latency + self.jitter))
+            roll = self._random.random()
+
+        if roll < self.timeout_rate:
+            time.sleep(Config.LLM_TIMEOUT)
+            raise LLMError("请求超时（模拟）")
+
+        if roll < self.timeout_rate + self.error_rate:
+            time.sleep(delay)
+            raise LLMError("服务暂时不可用（模拟）")
+
+        return delay
+
+    def _clothing_result(self, image_url):
+        """
+        根据图片URL生成确定性的衣物识别结果
+        :param image_url: 图片URL
+        :return: 识别结果字典
+        """
+        seed = int(hashlib.md5(image_url.encode('utf-8')).hexdigest(), 16)
+        rng = random.Random(seed)
+        return {
+            "category": rng.choice(self.CATEGORIES),
+            "color": rng.choice(self.COLORS),
+            "season": ",".join(sorted(rng.sample(self.SEASONS, rng.randint(1, 3)), key=self.SEASONS.index)),
+            "style": rng.choice(self.STYLES),
+            "confidence": rng.randint(60, 99)
+        }
+
+    def _outfit_result(self, prompt):
+        """
+        从提示词中的候选衣物生成穿搭推荐结果
+        :param prompt: 用户提示词
+        :return: 穿搭推荐字典
+        """
+        combo = self.COMBO_PATTERN.search(prompt)
+        if combo:
+            clothes_ids = [int(item_id) for item_id in combo.group(1).split(',')]
+        else:
+            clothes_ids = [int(item_id) for item_id in self.CLOTHES_ID_PATTERN.findall(prompt)][:3]
+        return {
+            "name": "本地测试穿搭",
+            "clothes_ids": clothes_ids,
+            "style": "休闲",
+            "season": "spring",
+            "occasion": "日常",
+            "reasoning": "本地桩服务生成的推荐结果"
+        }
+
+
+PROVIDERS = {
+    OpenAIProvider.name: OpenAIProvider,
+    StubProvider.name: StubProvider,
+}
+
+
+# 进程内共享的服务提供者实例
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def create_llm_provider(name=None, model=None):
+    """
+    按配置创建新的大模型服务提供者（一般应使用get_llm_provider共享实例）
+    :param name: 提供者名称，默认使用Config.LLM_PROVIDER
+    :param model: 模型名称，默认使用Config.OPENAI_MODEL
+    :return: 服务提供者实例
+    """
+    name = (name or Config.LLM_PROVIDER).lower()
+    if name not in PROVIDERS:
+        raise ValueError(f"不支持的大模型服务提供者: {name}")
+    return PROVIDERS[name](model=model)
+
+
+def get_llm_provider(name=None, model=None):
+    """
+    获取进程内共享的大模型服务提供者
+    同一进程的所有服务和请求复用同一个客户端及其连接池；
+    按进程ID区分实例，gunicorn fork出的每个worker会创建自己的连接池
+    :param name: 提供者名称，默认使用Config.LLM_PROVIDER
+    :param model: 模型名称，默认使用Config.OPENAI_MODEL
+    :return: 服务提供者实例
+    """
+    key = ((name or Config.LLM_PROVIDER).lower(), model or Config.OPENAI_MODEL, os.getpid())
+
+    provider = _registry.get(key)
+    if provider is None:
+        with _registry_lock:
+            provider = _registry.get(key)
+            if provider is None:
+                provider = create_llm_provider(name=key[0], model=key[1])
+                _registry[key] = provider
+    return provider
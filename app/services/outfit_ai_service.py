@@ -3,28 +3,50 @@ AI穿搭推荐服务
 """
 import json
 import random
+import re
 from datetime import datetime
-from openai import OpenAI
 from config import Config
 from app import db
 from app.models.clothes import Clothes
 from app.models.outfit import Outfit
 from app.services.weather_service import WeatherService
+from app.services.llm_provider import get_llm_provider
+from app.services.outfit_rule_engine import OutfitRuleEngine, OCCASION_STYLES
+from app.services.wardrobe_cache import wardrobe_cache
+from app.utils.json_stream import JsonObjectScanner
+
+# 季节在衣物列表中的简写
+SEASON_CODES = {'spring': 'sp', 'summer': 'su', 'autumn': 'au', 'winter': 'wi'}
+
+# 中日韩文字按每字约1个token估算，其余字符按约4个字符1个token估算
+CJK_PATTERN = re.compile(r'[\u2e80-\u9fff\uac00-\ud7af\uff00-\uffef]')
+
+
+def estimate_tokens(text):
+    """
+    粗略估算文本的token数（不依赖具体模型的分词器）
+    :param text: 文本
+    :return: 估算的token数
+    """
+    if not text:
+        return 0
+    cjk_count = len(CJK_PATTERN.findall(text))
+    return cjk_count + (len(text) - cjk_count + 3) // 4
+
 
 class OutfitAIService:
     """AI穿搭推荐服务类"""
     
     def __init__(self):
-        """初始化OpenAI客户端"""
-        self.api_key = Config.OPENAI_API_KEY
+        """初始化"""
         self.model = Config.OPENAI_MODEL
         self.max_retries = Config.OPENAI_MAX_RETRIES
-        
-        # 初始化OpenAI客户端
-        self.client = OpenAI(
-            base_url="https://ark.cn-beijing.volces.com/api/v3",
-            api_key=self.api_key
-        )
+        self.rule_engine = OutfitRuleEngine()
+    
+    @property
+    def llm(self):
+        """进程内共享的大模型服务提供者，由Config.LLM_PROVIDER选择"""
+        return get_llm_provider(model=self.model)
     
     def generate_outfit(self, account_id, occasion=None, season=None, style_preference=None, 
                         weather=None, temperature=None, exclude_clothes_ids=None):
@@ -39,6 +61,118 @@ class OutfitAIService:
         :param exclude_clothes_ids: 排除的衣物ID列表
         :return: 生成的穿搭对象或错误信息
         """
+        # 查询衣物并构建提示词
+        prepared = self._prepare_request(
+            account_id, occasion, season, style_preference, weather, temperature, exclude_clothes_ids
+        )
+        
+        if not prepared.get("success", False):
+            return prepared
+        
+        # 调用OpenAI API
+        response = self._call_openai_api(prepared["system_prompt"], prepared["user_prompt"])
+        
+        if not response.get("success", False):
+            # 大模型不可用时使用本地规则引擎的最优方案
+            if prepared["combos"] and Config.OUTFIT_RULE_FALLBACK:
+                return self._build_fallback_outfit(account_id, prepared, occasion, style_preference)
+            return response
+        
+        # 解析响应结果并创建穿搭
+        return self._build_outfit(
+            account_id, response.get("data", {}), occasion, prepared["season"], style_preference
+        )
+    
+    def generate_outfit_stream(self, account_id, occasion=None, season=None, style_preference=None,
+                               weather=None, temperature=None, exclude_clothes_ids=None):
+        """
+        以流式方式生成穿搭推荐
+        依次产出进度事件，模型返回的JSON一闭合就立即解析、校验并产出穿搭结果
+        :param account_id: 用户账号ID
+        :param occasion: 场合
+        :param season: 季节
+        :param style_preference: 风格偏好
+        :param weather: 天气
+        :param temperature: 温度
+        :param exclude_clothes_ids: 排除的衣物ID列表
+        :return: 生成器，产出(事件名, 数据)元组，事件依次为candidates、prompt、token、outfit，失败时为error
+        """
+        prepared = self._prepare_request(
+            account_id, occasion, season, style_preference, weather, temperature, exclude_clothes_ids
+        )
+        
+        if not prepared.get("success", False):
+            yield "error", {"message": prepared.get("message")}
+            return
+        
+        yield "candidates", {
+            "available_count": prepared["available_count"],
+            "candidate_count": prepared["candidate_count"],
+            "combo_count": len(prepared["combos"]),
+            "season": prepared["season"],
+            "weather": prepared["weather"],
+            "temperature": prepared["temperature"]
+        }
+        
+        messages = [
+            {"role": "system", "content": prepared["system_prompt"]},
+            {"role": "user", "content": prepared["user_prompt"]}
+        ]
+        yield "prompt", {
+            "prompt_length": len(prepared["system_prompt"]) + len(prepared["user_prompt"]),
+            "prompt_tokens": prepared["prompt_tokens"]
+        }
+        
+        scanner = JsonObjectScanner()
+        content = None
+        try:
+            for delta in self.llm.chat_stream(
+                messages=messages,
+                max_tokens=2048,
+                response_format={"type": "json_object"},
+                temperature=0.7,
+                top_p=1.0
+            ):
+                content = scanner.feed(delta)
+                yield "token", {"delta": delta, "received": scanner.length}
+                if content is not None:
+                    # JSON已闭合，无需等待剩余输出
+                    break
+        except Exception as e:
+            message = f"调用大模型API失败: {str(e)}"
+            if prepared["combos"] and Config.OUTFIT_RULE_FALLBACK:
+                result = self._build_fallback_outfit(account_id, prepared, occasion, style_preference)
+                if result.get("success", False):
+                    yield "fallback", {"message": message}
+                    yield "outfit", result["outfit"]
+                    return
+            yield "error", {"message": message}
+            return
+        
+        if content is None:
+            yield "error", {"message": "API返回的结果不是有效的JSON格式"}
+            return
+        
+        try:
+            data = json.loads(content)
+        except json.JSONDecodeError:
+            yield "error", {"message": "API返回的结果不是有效的JSON格式"}
+            return
+        
+        result = self._build_outfit(account_id, data, occasion, prepared["season"], style_preference)
+        
+        if not result.get("success", False):
+            yield "error", {"message": result.get("message")}
+            return
+        
+        yield "outfit", result["outfit"]
+    
+    def _prepare_request(self, account_id, occasion=None, season=None, style_preference=None,
+                         weather=None, temperature=None, exclude_clothes_ids=None):
+        """
+        补全天气信息、筛选候选衣物并构建提示词
+        :return: 包含提示词和候选信息的字典，或错误信息
+        """
         # 从天气数据库获取当前天气和季节信息
         weather_info = WeatherService.get_current_weather(account_id)
         
@@ -60,29 +194,53 @@ class OutfitAIService:
         if not available_clothes:
             return {"success": False, "message": "没有可用的衣物进行搭配"}
         
-        # 根据过滤条件筛选衣物
-        filtered_clothes = self._filter_clothes(available_clothes, season, style_preference)
+        # 本地规则引擎枚举上衣/下装/外套/鞋子组合，只把得分最高的方案交给大模型挑选
+        clothes_data = self._format_clothes_data(available_clothes)
+        combos = self.rule_engine.recommend(
+            clothes_data, occasion, season, style_preference, weather, temperature
+        )
         
-        if not filtered_clothes:
+        if combos:
+            combo_ids = {clothes_id for combo in combos for clothes_id in combo["clothes_ids"]}
+            clothes_data = [clothes for clothes in clothes_data if clothes["id"] in combo_ids]
+        else:
+            # 无法组成完整搭配时，根据过滤条件筛选衣物
+            filtered_clothes = self._filter_clothes(available_clothes, season, style_preference)
+            
             # 如果过滤后没有衣物，则使用所有可用衣物
-            filtered_clothes = available_clothes
-        
-        # 格式化衣物数据
-        clothes_data = self._format_clothes_data(filtered_clothes)
+            if filtered_clothes:
+                clothes_data = self._format_clothes_data(filtered_clothes)
         
         # 构建提示词
         system_prompt, user_prompt = self._build_prompts(
-            clothes_data, occasion, season, style_preference, weather, temperature
+            clothes_data, occasion, season, style_preference, weather, temperature, combos
         )
         
-        # 调用OpenAI API
-        response = self._call_openai_api(system_prompt, user_prompt)
-        
-        if not response.get("success", False):
-            return response
-        
+        return {
+            "success": True,
+            "season": season,
+            "weather": weather,
+            "temperature": temperature,
+            "available_count": len(available_clothes),
+            "candidate_count": len(clothes_data),
+            "combos": combos,
+            "prompt_tokens": estimate_tokens(system_prompt) + estimate_tokens(user_prompt),
+            "system_prompt": system_prompt,
+            "user_prompt": user_prompt
+        }
+    
+    def _build_outfit(self, account_id, response_data, occasion=None, season=None, style_preference=None):
+        """
+        解析模型返回的数据，校验衣物ID并创建穿搭对象（不保存）
+        :param account_id: 用户账号ID
+        :param response_data: 模型返回的JSON数据
+        :param occasion: 场合
+        :param season: 季节
+        :param style_preference: 风格偏好
+        :return: 包含穿搭对象的结果字典或错误信息
+        """
         # 解析响应结果
-        result = self._parse_response(response.get("data", {}))
+        result = self._parse_response(response_data)
         
         if not result.get("success", False):
             return result
@@ -111,62 +269,86 @@ class OutfitAIService:
         # db.session.add(outfit)
         # db.session.commit()
         
-        return {"success": True, "outfit": outfit}
+        return {"success": True, "outfit": outfit, "source": "ai"}
+    
+    def _build_fallback_outfit(self, account_id, prepared, occasion=None, style_preference=None):
+        """
+        使用本地规则引擎得分最高的方案创建穿搭（大模型不可用时的离线推荐）
+        :param account_id: 用户账号ID
+        :param prepared: _prepare_request的返回结果
+        :param occasion: 场合
+        :param style_preference: 风格偏好
+        :return: 包含穿搭对象的结果字典或错误信息
+        """
+        conditions = [text for text in (
+            prepared["season"],
+            prepared["weather"],
+            f"{prepared['temperature']}℃" if prepared["temperature"] is not None else None
+        ) if text]
+        reasoning = "根据" + "、".join(conditions) + "，" if conditions else ""
+        reasoning += "按季节、温度、风格和颜色协调度从衣橱中选出的得分最高的搭配"
+        
+        result = self._build_outfit(account_id, {
+            "name": "本地推荐穿搭",
+            "clothes_ids": prepared["combos"][0]["clothes_ids"],
+            "reasoning": reasoning
+        }, occasion, prepared["season"], style_preference)
+        
+        if result.get("success", False):
+            result["source"] = "rule"
+        return result
     
     def _get_available_clothes(self, account_id, exclude_clothes_ids=None):
         """
-        获取用户可用的衣物
+        获取用户可用的衣物（从衣橱快照读取）
         :param account_id: 用户账号ID
         :param exclude_clothes_ids: 排除的衣物ID列表
-        :return: 可用衣物列表
+        :return: 可用衣物字典列表
         """
-        query = Clothes.query.filter_by(account_id=account_id, status='available')
-        
-        if exclude_clothes_ids:
-            query = query.filter(~Clothes.id.in_(exclude_clothes_ids))
-        
-        return query.all()
+        return wardrobe_cache.get_snapshot(account_id).get_available(exclude_clothes_ids)
     
     def _filter_clothes(self, clothes_list, season=None, style=None):
         """
         根据条件筛选衣物
-        :param clothes_list: 衣物列表
+        :param clothes_list: 衣物字典列表
         :param season: 季节
         :param style: 风格
-        :return: 筛选后的衣物列表
+        :return: 筛选后的衣物字典列表
         """
         result = clothes_list
         
-        # 按季节筛选
+        # 按季节筛选（天气服务返回的是中文季节名称，统一后比较）
+        season = Clothes.normalize_season(season)
         if season:
-            result = [c for c in result if c.season and season in c.season_list]
+            result = [c for c in result if season in c['season']]
         
         # 按风格筛选
         if style:
-            result = [c for c in result if c.style and style.lower() in c.style.lower()]
+            result = [c for c in result if c['style'] and style.lower() in c['style'].lower()]
         
         return result
     
     def _format_clothes_data(self, clothes_list):
         """
         格式化衣物数据
-        :param clothes_list: 衣物列表
+        :param clothes_list: 衣物字典列表
         :return: 格式化后的衣物数据列表
         """
         result = []
         for clothes in clothes_list:
             result.append({
-                "id": clothes.id,
-                "name": clothes.name or f"{clothes.color or ''} {clothes.category or ''}".strip(),
-                "category": clothes.category,
-                "color": clothes.color,
-                "season": clothes.season_list if clothes.season else [],
-                "style": clothes.style
+                "id": clothes['id'],
+                "name": clothes['name'] or f"{clothes['color'] or ''} {clothes['category'] or ''}".strip(),
+                "category": clothes['category'],
+                "color": clothes['color'],
+                "season": clothes['season'],
+                "season_mask": Clothes.season_to_mask(clothes['season']),
+                "style": clothes['style']
             })
         return result
     
     def _build_prompts(self, clothes_data, occasion=None, season=None, 
-                     style_preference=None, weather=None, temperature=None):
+                     style_preference=None, weather=None, temperature=None, combos=None):
         """
         构建提示词
         :param clothes_data: 格式化后的衣物数据
@@ -175,6 +357,7 @@ class OutfitAIService:
         :param style_preference: 风格偏好
         :param weather: 天气
         :param temperature: 温度
+        :param combos: 本地规则引擎生成的候选搭配方案
         :return: 系统提示词和用户提示词
         """
         system_prompt = """你是一个专业的穿搭顾问AI，擅长根据用户的衣物和需求提供合适的穿搭建议。
@@ -196,23 +379,20 @@ class OutfitAIService:
         if temperature is not None:
             user_prompt += f"温度：{temperature}℃\n"
         
-        user_prompt += "\n我的衣橱中可用的衣物：\n"
+        # 添加衣物信息（编码后的紧凑表格，总长度受token预算限制）
+        user_prompt += "\n" + self._encode_wardrobe(
+            clothes_data, occasion, season, style_preference, weather, temperature
+        )
         
-        # 添加衣物信息
-        for i, clothes in enumerate(clothes_data):
-            category_text = f"类别：{clothes['category']}" if clothes['category'] else ""
-            color_text = f"颜色：{clothes['color']}" if clothes['color'] else ""
-            season_text = f"适合季节：{','.join(clothes['season'])}" if clothes['season'] else ""
-            style_text = f"风格：{clothes['style']}" if clothes['style'] else ""
-            
-            details = [d for d in [category_text, color_text, season_text, style_text] if d]
-            detail_text = "（" + "，".join(details) + "）" if details else ""
-            
-            user_prompt += f"{i+1}. ID: {clothes['id']} - {clothes['name']} {detail_text}\n"
+        if combos:
+            user_prompt += "\n候选搭配方案（已按季节、温度、风格和颜色协调度评分，从高到低排列）：\n"
+            for i, combo in enumerate(combos):
+                user_prompt += f"方案{i+1}: {','.join(str(clothes_id) for clothes_id in combo['clothes_ids'])}\n"
+            user_prompt += "请从候选方案中选择最合适的一套，必要时可以用衣物列表中的其他衣物替换个别单品。\n"
         
         user_prompt += "\n请以JSON格式返回结果，包含以下字段：\n"
         user_prompt += "1. name: 穿搭名称\n"
-        user_prompt += "2. clothes_ids: 选择的衣物ID数组\n"
+        user_prompt += "2. clothes_ids: 选择的衣物ID数组（使用衣物列表每行开头的ID）\n"
         user_prompt += "3. style: 穿搭风格\n"
         user_prompt += "4. season: 适合季节\n"
         user_prompt += "5. occasion: 适合场合\n"
@@ -221,6 +401,142 @@ class OutfitAIService:
         
         return system_prompt, user_prompt
     
+    def _encode_wardrobe(self, clothes_data, occasion=None, season=None,
+                         style_preference=None, weather=None, temperature=None):
+        """
+        将衣物列表编码为紧凑的表格文本
+        类别、颜色、风格使用字典编码（如C1、K2、S3），图例只包含实际出现的取值；
+        衣物总量超出Config.OUTFIT_PROMPT_TOKEN_BUDGET时，按与场合、季节、天气的相关性排序后截断
+        :param clothes_data: 格式化后的衣物数据
+        :param occasion: 场合
+        :param season: 季节
+        :param style_preference: 风格偏好
+        :param weather: 天气
+        :param temperature: 温度
+        :return: 衣物列表文本
+        """
+        header = "衣物列表（每行格式：ID|类别|颜色|季节|风格|名称，代码含义见图例，sp/su/au/wi分别表示春/夏/秋/冬）：\n"
+        budget = Config.OUTFIT_PROMPT_TOKEN_BUDGET - estimate_tokens(header)
+        
+        if self._estimate_wardrobe_tokens(clothes_data) > budget:
+            clothes_data = self._rank_clothes(
+                clothes_data, occasion, season, style_preference, weather, temperature
+            )
+        
+        codes = {"C": {}, "K": {}, "S": {}}
+        rows = []
+        used_tokens = 0
+        for clothes in clothes_data:
+            new_codes = []
+            fields = []
+            for prefix, value in (("C", clothes['category']), ("K", clothes['color']), ("S", clothes['style'])):
+                if not value:
+                    fields.append("")
+                    continue
+                code = codes[prefix].get(value)
+                if code is None:
+                    code = f"{prefix}{len(codes[prefix]) + 1}"
+                    new_codes.append((prefix, value, code))
+                fields.append(code)
+            
+            row = self._encode_row(clothes, fields)
+            cost = estimate_tokens(row) + sum(estimate_tokens(f" {code}={value}") for _, value, code in new_codes)
+            if rows and used_tokens + cost > budget:
+                break
+            
+            for prefix, value, code in new_codes:
+                codes[prefix][value] = code
+            rows.append(row)
+            used_tokens += cost
+        
+        legend = []
+        for prefix, label in (("C", "类别"), ("K", "颜色"), ("S", "风格")):
+            if codes[prefix]:
+                legend.append(label + " " + " ".join(f"{code}={value}" for value, code in codes[prefix].items()))
+        
+        text = header
+        if legend:
+            text += "图例：" + "；".join(legend) + "\n"
+        text += "\n".join(rows) + "\n"
+        if len(rows) < len(clothes_data):
+            text += f"（衣橱共{len(clothes_data)}件，已按相关性列出{len(rows)}件）\n"
+        return text
+    
+    def _encode_row(self, clothes, fields):
+        """
+        编码单件衣物
+        名称仅在与颜色、类别不同时保留，避免重复
+        :param clothes: 格式化后的衣物数据
+        :param fields: 类别、颜色、风格的代码
+        :return: 一行文本
+        """
+        seasons = ",".join(SEASON_CODES.get(s, s) for s in clothes['season'])
+        name = clothes['name'] or ""
+        if name.replace(" ", "") == f"{clothes['color'] or ''}{clothes['category'] or ''}":
+            name = ""
+        return f"{clothes['id']}|" + "|".join([fields[0], fields[1], seasons, fields[2], name[:20]]).rstrip("|")
+    
+    def _estimate_wardrobe_tokens(self, clothes_data):
+        """
+        估算不截断时衣物列表的token数（以未编码的取值近似图例的长度）
+        :param clothes_data: 格式化后的衣物数据
+        :return: 估算的token数
+        """
+        values = set()
+        total = 0
+        for clothes in clothes_data:
+            total += estimate_tokens(self._encode_row(clothes, ["C00", "K00", "S00"]))
+            values.update(v for v in (clothes['category'], clothes['color'], clothes['style']) if v)
+        return total + sum(estimate_tokens(f" C00={value}") for value in values)
+    
+    def _rank_clothes(self, clothes_data, occasion=None, season=None,
+                      style_preference=None, weather=None, temperature=None):
+        """
+        按与场合、季节、天气的相关性对衣物排序
+        每个类别内部按得分降序，类别之间轮流取用，保证截断后仍有完整的搭配可选
+        :param clothes_data: 格式化后的衣物数据
+        :return: 排序后的衣物数据
+        """
+        season = Clothes.normalize_season(season)
+        occasion_styles = [style for keyword, styles in OCCASION_STYLES.items()
+                           if occasion and keyword in occasion for style in styles]
+        
+        def score(clothes):
+            value = 0
+            seasons = clothes['season']
+            style = (clothes['style'] or "").lower()
+            
+            if season:
+                value += 3 if season in seasons else (1 if not seasons else 0)
+            if style_preference and style and style_preference.lower() in style:
+                value += 2
+            if style and any(s in style for s in occasion_styles):
+                value += 2
+            
+            if temperature is not None:
+                if clothes['category'] == '外套':
+                    value += 2 if temperature <= 15 else (-3 if temperature >= 25 else 0)
+                if temperature >= 28 and seasons and 'summer' not in seasons:
+                    value -= 2
+                if temperature <= 5 and seasons and 'winter' not in seasons and 'autumn' not in seasons:
+                    value -= 2
+            
+            if weather and '雨' in weather and clothes['category'] == '外套':
+                value += 1
+            return value
+        
+        groups = {}
+        for clothes in sorted(clothes_data, key=score, reverse=True):
+            groups.setdefault(clothes['category'] or '其他', []).append(clothes)
+        
+        ranked = []
+        queues = list(groups.values())
+        while queues:
+            for queue in queues:
+                ranked.append(queue.pop(0))
+            queues = [queue for queue in queues if queue]
+        return ranked
+    
     def _call_openai_api(self, system_prompt, user_prompt):
         """
         调用OpenAI API
@@ -229,8 +545,7 @@ class OutfitAIService:
         :return: 响应结果
         """
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
+            content = self.llm.chat(
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": user_prompt}
@@ -242,7 +557,6 @@ class OutfitAIService:
             )
             
             # 解析响应内容
-            content = response.choices[0].message.content
             try:
                 data = json.loads(content)
                 return {"success": True, "data": data}
@@ -250,7 +564,7 @@ class OutfitAIService:
                 return {"success": False, "message": "API返回的结果不是有效的JSON格式"}
             
         except Exception as e:
-            return {"success": False, "message": f"调用OpenAI API失败: {str(e)}"}
+            return {"success": False, "message": f"调用大模型API失败: {str(e)}"}
     
     def _parse_response(self, response_data):
         """
@@ -295,11 +609,5 @@ class OutfitAIService:
         if not clothes_ids:
             return []
         
-        # 查询用户拥有的衣物
-        valid_clothes = Clothes.query.filter(
-            Clothes.id.in_(clothes_ids),
-            Clothes.account_id == account_id,
-            Clothes.status == 'available'
-        ).all()
-        
-        return [clothes.id for clothes in valid_clothes] 
\ No newline at end of file
+        # 推荐结果会保存为穿搭，直接查询数据库校验衣物属于该用户且可用，不使用可能过期的衣橱快照
+        return Clothes.filter_ids(account_id, clothes_ids, status='available')
\ No newline at end of file
@@ -0,0 +1,122 @@
+"""
+本地穿搭规则引擎
+在调用大模型之前按衣物类别组合上衣/下装/外套/鞋子，
+按温度、季节、风格和颜色协调度打分（向量化评分见outfit_scoring），只把得分最高的若干套方案交给大模型挑选；
+大模型不可用时也可以直接使用得分最高的方案作为离线推荐结果
+"""
+from config import Config
+from app.models.clothes import Clothes
+from app.services.outfit_scoring import WardrobeFeatures, OutfitScorer
+
+# 类别到搭配位置的映射，未列出的类别（配饰、包包等）不参与组合
+SLOT_CATEGORIES = {
+    'top': ['上衣', 'T恤', '衬衫', '毛衣', '卫衣'],
+    'bottom': ['下装', '裤子', '裙子', '短裤', '半身裙'],
+    'outerwear': ['外套', '夹克', '大衣', '羽绒服', '风衣'],
+    'shoes': ['鞋子', '鞋'],
+}
+
+# 场合对应的适合风格
+OCCASION_STYLES = {
+    '上班': ['正式', '商务', '简约', '通勤'],
+    '工作': ['正式', '商务', '简约', '通勤'],
+    '通勤': ['正式', '商务', '简约', '通勤'],
+    '面试': ['正式', '商务', '简约'],
+    '会议': ['正式', '商务'],
+    '约会': ['时尚', '甜美', '优雅', '复古'],
+    '聚会': ['时尚', '街头', '个性'],
+    '运动': ['运动'],
+    '健身': ['运动'],
+    '旅行': ['休闲', '运动'],
+    '日常': ['休闲', '简约'],
+    '居家': ['休闲'],
+}
+
+
+class OutfitRuleEngine:
+    """本地穿搭规则引擎"""
+
+    def __init__(self, top_k=None, beam_width=None):
+        """
+        初始化
+        :param top_k: 返回的搭配方案数量
+        :param beam_width: 逐个搭配位置扩展组合时保留的部分组合数量
+        """
+        self.top_k = top_k or Config.OUTFIT_RULE_TOP_K
+        self.beam_width = beam_width or Config.OUTFIT_RULE_BEAM_WIDTH
+
+    @staticmethod
+    def get_slot(category):
+        """
+        获取类别对应的搭配位置
+        :param category: 衣物类别
+        :return: top/bottom/outerwear/shoes，不参与组合时返回None
+        """
+        if not category:
+            return None
+        for slot, categories in SLOT_CATEGORIES.items():
+            if category in categories:
+                return slot
+        return None
+
+    def recommend(self, clothes_data, occasion=None, season=None, style_preference=None,
+                  weather=None, temperature=None):
+        """
+        生成得分最高的搭配方案
+        :param clothes_data: 格式化后的衣物数据（包含id、category、color、season、style）
+        :param occasion: 场合
+        :param season: 季节
+        :param style_preference: 风格偏好
+        :param weather: 天气
+        :param temperature: 温度
+        :return: 搭配方案列表，按得分降序，每项包含clothes_ids和score；无法组成上衣+下装时返回空列表
+        """
+        if not clothes_data:
+            return []
+
+        season = Clothes.normalize_season(season)
+        features = WardrobeFeatures(clothes_data, SLOT_CATEGORIES)
+        scorer = OutfitScorer(features)
+
+        occasion_keywords = [style for keyword, styles in OCCASION_STYLES.items()
+                             if occasion and keyword in occasion for style in styles]
+        item_scores = scorer.item_scores(
+            season=season,
+            temperature=temperature,
+            preferred_styles=features.style_ids_matching([style_preference]),
+            occasion_styles=features.style_ids_matching(occasion_keywords),
+            rainy=bool(weather and '雨' in weather)
+        )
+
+        # 有鞋子时必须搭配鞋子，外套根据温度和季节决定
+        required = ['top', 'bottom']
+        optional = []
+        if len(features.slot_indices('shoes')):
+            required.append('shoes')
+        outerwear = self._outerwear_policy(season, temperature)
+        if outerwear == 'required' and len(features.slot_indices('outerwear')):
+            required.append('outerwear')
+        elif outerwear == 'optional':
+            optional.append('outerwear')
+
+        combos = scorer.rank(item_scores, required, optional, beam_width=self.beam_width, top_k=self.top_k)
+        return [{"clothes_ids": ids, "score": round(score, 2)} for score, ids in combos]
+
+    @staticmethod
+    def _outerwear_policy(season, temperature):
+        """
+        根据温度和季节决定外套是否必须
+        :param season: 季节
+        :param temperature: 温度
+        :return: required（必须）、optional（可选）或excluded（不需要）
+        """
+        if temperature is not None:
+            if temperature >= 25:
+                return 'excluded'
+            if temperature <= 15:
+                return 'required'
+        elif season == 'summer':
+            return 'excluded'
+        elif season == 'winter':
+            return 'required'
+        return 'optional'
@@ -0,0 +1,285 @@
+"""
+穿搭向量化评分
+把衣橱编码为NumPy特征数组（类别one-hot、颜色向量、季节位掩码、风格ID），
+单品得分和两两搭配得分都通过数组运算一次算出，组合时按搭配位置逐步扩展并用束搜索保留最优的部分组合，
+上千件衣物、数万种组合也只需要几毫秒
+"""
+import math
+import numpy as np
+from app.models.clothes import Clothes
+
+# 季节位掩码（与Clothes.season_mask一致）
+SEASON_BITS = Clothes.SEASON_BITS
+
+# 各季节衣物适合的大致温度（℃）
+SEASON_TEMPERATURES = {'spring': 18, 'summer': 28, 'autumn': 16, 'winter': 5}
+
+# 中性色与任何颜色都容易搭配
+NEUTRAL_COLORS = ['黑', '白', '灰', '米', '卡其', '藏青', '驼', '棕', '咖', '杏']
+
+# 彩色在色相环上的角度（度），色相相近的颜色视为同色系
+COLOR_HUES = {
+    '红': 0, '粉': 340, '酒红': 345, '橙': 30, '黄': 55, '绿': 120,
+    '青': 180, '蓝': 220, '紫': 280,
+}
+
+# 两两搭配得分
+NEUTRAL_HARMONY = 1.0  # 至少一件为中性色
+SAME_HUE_HARMONY = 0.5  # 同色系
+CLASH_HARMONY = -1.0  # 不同色系的两种彩色
+SAME_STYLE_BONUS = 1.0  # 风格相同
+MIXED_STYLE_PENALTY = -0.5  # 风格不同
+
+
+def season_mask(seasons):
+    """
+    将季节列表转换为位掩码
+    :param seasons: 季节列表，如['spring', 'autumn']
+    :return: 位掩码整数
+    """
+    mask = 0
+    for season in seasons or []:
+        mask |= SEASON_BITS.get(season, 0)
+    return mask
+
+
+def color_vector(color):
+    """
+    将颜色名称编码为向量 [是否中性色, 是否已知彩色, cos(色相), sin(色相)]
+    无法识别的颜色编码为全0，不参与颜色协调度计算
+    :param color: 颜色名称
+    :return: 长度为4的列表
+    """
+    if not color:
+        return [0.0, 0.0, 0.0, 0.0]
+    if any(neutral in color for neutral in NEUTRAL_COLORS):
+        return [1.0, 0.0, 0.0, 0.0]
+    # 优先匹配更长的关键字，如“酒红”优先于“红”
+    for keyword in sorted(COLOR_HUES, key=len, reverse=True):
+        if keyword in color:
+            hue = math.radians(COLOR_HUES[keyword])
+            return [0.0, 1.0, math.cos(hue), math.sin(hue)]
+    return [0.0, 0.0, 0.0, 0.0]
+
+
+# 每种季节位掩码对应的平均适合温度，无季节信息时为NaN
+_MASK_TEMPERATURES = np.array([
+    np.mean([t for s, t in SEASON_TEMPERATURES.items() if mask & SEASON_BITS[s]]) if mask else np.nan
+    for mask in range(16)
+])
+
+
+class WardrobeFeatures:
+    """衣橱的特征数组"""
+
+    def __init__(self, clothes_data, slots):
+        """
+        编码衣物特征
+        :param clothes_data: 格式化后的衣物数据（包含id、category、color、season、style）
+        :param slots: 类别到搭配位置的映射，如{'top': ['上衣'], ...}
+        """
+        self.slot_names = list(slots)
+        self.categories = sorted({c['category'] for c in clothes_data if c['category']})
+        self.styles = sorted({c['style'] for c in clothes_data if c['style']})
+        category_index = {category: i for i, category in enumerate(self.categories)}
+        style_index = {style: i for i, style in enumerate(self.styles)}
+
+        count = len(clothes_data)
+        self.ids = np.array([c['id'] for c in clothes_data], dtype=np.int64)
+
+        # 类别one-hot，乘以类别-位置映射矩阵得到每件衣物所属的搭配位置
+        self.category_onehot = np.zeros((count, len(self.categories)), dtype=np.float32)
+        for i, clothes in enumerate(clothes_data):
+            if clothes['category']:
+                self.category_onehot[i, category_index[clothes['category']]] = 1.0
+        category_slots = np.array([
+            [1.0 if category in slots[slot] else 0.0 for slot in self.slot_names]
+            for category in self.categories
+        ], dtype=np.float32).reshape(len(self.categories), len(self.slot_names))
+        self.slot_matrix = (self.category_onehot @ category_slots) > 0
+
+        self.colors = np.array([color_vector(c['color']) for c in clothes_data],
+                               dtype=np.float32).reshape(count, 4)
+        self.seasons = np.array([c['season_mask'] if 'season_mask' in c else season_mask(c['season'])
+                                 for c in clothes_data], dtype=np.int64)
+        self.style_ids = np.array([style_index[c['style']] if c['style'] else -1 for c in clothes_data],
+                                  dtype=np.int64)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def slot_indices(self, slot):
+        """
+        获取属于某个搭配位置的衣物下标
+        :param slot: 搭配位置
+        :return: 下标数组
+        """
+        return np.flatnonzero(self.slot_matrix[:, self.slot_names.index(slot)])
+
+    def style_ids_matching(self, keywords):
+        """
+        获取名称包含任一关键字的风格ID
+        :param keywords: 关键字列表
+        :return: 风格ID列表
+        """
+        keywords = [keyword.lower() for keyword in keywords if keyword]
+        return [i for i, style in enumerate(self.styles) if any(k in style.lower() for k in keywords)]
+
+
+class OutfitScorer:
+    """向量化的穿搭评分器"""
+
+    def __init__(self, features):
+        """
+        初始化
+        :param features: WardrobeFeatures对象
+        """
+        self.features = features
+
+    def item_scores(self, season=None, temperature=None, preferred_styles=None,
+                    occasion_styles=None, rainy=False):
+        """
+        计算所有单品与季节、温度、风格、场合的匹配得分
+        :param season: 季节（spring/summer/autumn/winter）
+        :param temperature: 温度
+        :param preferred_styles: 符合风格偏好的风格ID列表
+        :param occasion_styles: 适合场合的风格ID列表
+        :param rainy: 是否下雨
+        :return: 长度为衣物数量的得分数组
+        """
+        f = self.features
+        scores = np.zeros(len(f), dtype=np.float64)
+        has_season = f.seasons > 0
+
+        if season in SEASON_BITS:
+            matched = (f.seasons & SEASON_BITS[season]) > 0
+            scores += np.where(has_season, np.where(matched, 2.0, -2.0), 0.0)
+
+        if temperature is not None:
+            warmth = _MASK_TEMPERATURES[f.seasons]
+            fit = np.maximum(-2.0, 2.0 - np.abs(warmth - temperature) / 5.0)
+            scores += np.where(has_season, fit, 0.0)
+
+        if preferred_styles:
+            scores += np.isin(f.style_ids, preferred_styles) * 2.0
+        if occasion_styles:
+            scores += np.isin(f.style_ids, occasion_styles) * 1.5
+
+        if rainy and 'outerwear' in f.slot_names:
+            scores += f.slot_matrix[:, f.slot_names.index('outerwear')] * 1.0
+        return scores
+
+    def pair_scores(self, left=None, right=None):
+        """
+        计算衣物两两之间的颜色协调度和风格一致性得分
+        下标等于衣物数量时表示“不选”占位（颜色向量全0、无风格），与任何衣物的得分均为0
+        :param left: 衣物下标数组（任意形状），默认为全部衣物
+        :param right: 一维衣物下标数组，默认为全部衣物
+        :return: 形状为left.shape + right.shape的得分数组
+        """
+        f = self.features
+        count = len(f)
+        left = np.arange(count) if left is None else np.asarray(left)
+        right = np.arange(count) if right is None else np.asarray(right)
+
+        colors = np.vstack([f.colors, np.zeros((1, 4), dtype=np.float32)])
+        style_ids = np.append(f.style_ids, -1)
+
+        a, b = colors[left][..., None, :], colors[right]
+        neutral_a, neutral_b = a[..., 0] > 0, b[..., 0] > 0
+        accent_a, accent_b = a[..., 1] > 0, b[..., 1] > 0
+        hue_similarity = (a[..., 2:] * b[..., 2:]).sum(axis=-1)
+
+        harmony = np.where(neutral_a | neutral_b, NEUTRAL_HARMONY,
+                           np.where(accent_a & accent_b,
+                                    np.where(hue_similarity > 0.8, SAME_HUE_HARMONY, CLASH_HARMONY),
+                                    0.0))
+
+        style_a, style_b = style_ids[left][..., None], style_ids[right]
+        coherence = np.where((style_a >= 0) & (style_b >= 0),
+                             np.where(style_a == style_b, SAME_STYLE_BONUS, MIXED_STYLE_PENALTY),
+                             0.0)
+
+        # 中性色的协调度不依赖另一件衣物，需要单独排除“不选”占位
+        placeholder = (left[..., None] == count) | (right == count)
+        return np.where(placeholder, 0.0, harmony + coherence)
+
+    def rank(self, item_scores, required_slots, optional_slots=(), beam_width=200, top_k=5):
+        """
+        按搭配位置逐步扩展组合并评分（束搜索），返回得分最高的组合
+        组合得分 = 单品平均分 + 两两搭配平均分；每扩展一个位置保留得分最高的beam_width个部分组合。
+        完整的组合张量大小为各位置候选数之积（千件衣橱每个位置约250件时超过10^9个组合），无法一次评分，因此逐步剪枝：
+        平均分不随位置单调，被剪掉的部分组合仍可能组成更高分的方案，结果是近似最优；
+        束宽不小于前面各位置的组合数时不发生剪枝，结果与穷举一致
+        :param item_scores: 单品得分数组
+        :param required_slots: 必须包含的搭配位置列表，第一个位置作为起点
+        :param optional_slots: 可选的搭配位置列表（可以不选）
+        :param beam_width: 每一步保留的部分组合数量
+        :param top_k: 返回的组合数量
+        :return: [(得分, 衣物ID列表)]，按得分降序
+        """
+        f = self.features
+        none = len(f)
+
+        # 在末尾追加一个“不选”占位，其单品得分和搭配得分均为0
+        items = np.append(item_scores, 0.0)
+
+        start = f.slot_indices(required_slots[0])
+        if not len(start):
+            return []
+
+        combos = start[:, None]
+        counts = np.ones(len(start), dtype=np.int64)
+        item_sum = items[start]
+        pair_sum = np.zeros(len(start), dtype=np.float64)
+
+        steps = [(slot, False) for slot in required_slots[1:]] + [(slot, True) for slot in optional_slots]
+        for slot, optional in steps:
+            candidates = f.slot_indices(slot)
+            if not len(candidates):
+                if optional:
+                    continue
+                return []
+            if optional:
+                candidates = np.append(candidates, none)
+
+            # 部分组合数×候选数的新增得分
+            new_pairs = self.pair_scores(combos, candidates).sum(axis=1)
+            new_item_sum = item_sum[:, None] + items[candidates][None, :]
+            new_pair_sum = pair_sum[:, None] + new_pairs
+            new_counts = counts[:, None] + (candidates != none)[None, :]
+            scores = self._combo_scores(new_item_sum, new_pair_sum, new_counts)
+
+            keep = self._top_indices(scores.ravel(), beam_width)
+            rows, cols = np.unravel_index(keep, scores.shape)
+            combos = np.concatenate([combos[rows], candidates[cols][:, None]], axis=1)
+            counts = new_counts[rows, cols]
+            item_sum = new_item_sum[rows, cols]
+            pair_sum = new_pair_sum[rows, cols]
+
+        scores = self._combo_scores(item_sum, pair_sum, counts)
+        best = self._top_indices(scores, top_k)
+        return [
+            (float(scores[i]), [int(f.ids[j]) for j in combos[i] if j != none])
+            for i in best
+        ]
+
+    @staticmethod
+    def _combo_scores(item_sum, pair_sum, counts):
+        """
+        组合得分 = 单品平均分 + 两两搭配平均分
+        """
+        pair_counts = counts * (counts - 1) / 2.0
+        return item_sum / counts + np.divide(pair_sum, pair_counts,
+                                             out=np.zeros_like(pair_sum), where=pair_counts > 0)
+
+    @staticmethod
+    def _top_indices(scores, k):
+        """
+        获取得分最高的k个下标（降序）
+        """
+        if len(scores) > k:
+            candidates = np.argpartition(-scores, k - 1)[:k]
+        else:
+            candidates = np.arange(len(scores))
+        return candidates[np.argsort(-scores[candidates], kind='stable')]
@@ -1,6 +1,9 @@
+from sqlalchemy.orm import selectinload
 from app import db
-from app.models.outfit import Outfit
 from app.models.clothes import Clothes
+from app.models.outfit import Outfit
+from app.models.outfit_item import OutfitItem
+from app.services.wardrobe_cache import wardrobe_cache
 
 class OutfitService:
     """穿搭服务类"""
@@ -19,16 +22,9 @@ class OutfitService:
         :param occasion: 适合场合
         :return: 穿搭对象
         """
-        # 验证衣物ID是否都属于当前用户
+        # 验证衣物ID是否都属于当前用户（写操作直接查询数据库，不使用可能过期的衣橱快照），过滤掉无效的衣物ID
         if clothes_items and len(clothes_items) > 0:
-            valid_clothes = Clothes.query.filter(
-                Clothes.id.in_(clothes_items),
-                Clothes.account_id == account_id
-            ).all()
-            
-            # 如果有无效的衣物ID，则过滤掉
-            valid_clothes_ids = [clothes.id for clothes in valid_clothes]
-            clothes_items = [item_id for item_id in clothes_items if item_id in valid_clothes_ids]
+            clothes_items = Clothes.filter_ids(account_id, clothes_items)
         
         # 创建穿搭
         outfit = Outfit(
@@ -49,16 +45,23 @@ class OutfitService:
         return outfit
     
     @staticmethod
-    def get_outfit_list(account_id, style=None, season=None, occasion=None):
+    def get_outfit_list(account_id, style=None, season=None, occasion=None, clothes_id=None):
         """
         获取穿搭列表
         :param account_id: 用户账号ID
         :param style: 风格过滤
         :param season: 季节过滤
         :param occasion: 场合过滤
+        :param clothes_id: 只返回包含该衣物的穿搭
         :return: 穿搭列表
         """
-        query = Outfit.query.filter_by(account_id=account_id)
+        # 一次额外查询加载所有穿搭的衣物关联
+        query = Outfit.query.options(selectinload(Outfit.items)).filter_by(account_id=account_id)
+        
+        if clothes_id:
+            query = query.filter(Outfit.id.in_(
+                db.session.query(OutfitItem.outfit_id).filter_by(account_id=account_id, clothes_id=clothes_id)
+            ))
         
         if style:
             query = query.filter_by(style=style)
@@ -74,6 +77,29 @@ class OutfitService:
         
         return query.all()
     
+    @staticmethod
+    def get_clothes_map(account_id, outfits):
+        """
+        从衣橱快照获取穿搭引用的全部衣物，用于序列化时避免逐个穿搭查询；
+        快照中没有的衣物（快照加载之后新增的衣物）用一次IN查询从数据库补充
+        :param account_id: 用户账号ID
+        :param outfits: 穿搭列表
+        :return: 衣物ID到衣物字典的字典
+        """
+        clothes_ids = list(dict.fromkeys(
+            clothes_id for outfit in outfits for clothes_id in outfit.get_clothes_items()
+        ))
+        clothes_map = wardrobe_cache.get_snapshot(account_id).get_clothes_map(clothes_ids)
+        
+        missing_ids = [clothes_id for clothes_id in clothes_ids if clothes_id not in clothes_map]
+        if missing_ids:
+            clothes_list = Clothes.query.filter(
+                Clothes.account_id == account_id,
+                Clothes.id.in_(missing_ids)
+            ).all()
+            clothes_map.update({clothes.id: clothes.to_dict() for clothes in clothes_list})
+        return clothes_map
+    
     @staticmethod
     def get_outfit_by_id(account_id, outfit_id):
         """
@@ -0,0 +1,132 @@
+"""
+AI识别后台任务队列
+任务保存在recognition_jobs表中，每个进程内由一组后台线程领取并执行，
+不依赖任何外部队列服务；多个gunicorn进程之间通过数据库原子领取避免重复执行
+"""
+import os
+import threading
+import time
+from config import Config
+from app import db
+from app.models.recognition_job import RecognitionJob
+
+
+class RecognitionQueue:
+    """AI识别后台任务队列"""
+
+    def __init__(self):
+        """初始化"""
+        self._app = None
+        self._pid = None
+        self._threads = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._service = None
+        self._last_requeue = None
+
+    @property
+    def enabled(self):
+        """是否启用后台线程（工作线程数为0时任务在请求线程中同步执行）"""
+        return Config.RECOGNITION_WORKERS > 0
+
+    def start(self, app):
+        """
+        启动后台工作线程（幂等）
+        服务进程每个请求开始前调用，enqueue时也会调用，fork后的子进程（如gunicorn --preload）借此启动自己的线程
+        :param app: Flask应用实例
+        """
+        if not self.enabled or (self._threads and self._pid == os.getpid()):
+            return
+
+        with self._lock:
+            if self._threads and self._pid == os.getpid():
+                return
+
+            self._app = app
+            self._pid = os.getpid()
+            self._threads = []
+            self._last_requeue = None
+
+            for i in range(Config.RECOGNITION_WORKERS):
+                thread = threading.Thread(
+                    target=self._worker_loop,
+                    name=f"recognition-worker-{i}",
+                    daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def enqueue(self, app, job_id):
+        """
+        提交任务
+        :param app: Flask应用实例
+        :param job_id: 任务ID
+        """
+        if not self.enabled:
+            # 未启用后台线程时同步执行
+            if RecognitionJob.claim(job_id):
+                self._get_service().process_recognition_job(job_id)
+            return
+
+        self.start(app)
+        self._wakeup.set()
+
+    def _get_service(self):
+        """获取共享的衣物服务实例"""
+        if self._service is None:
+            from app.services.clothes_service import ClothesService
+            self._service = ClothesService()
+        return self._service
+
+    def _worker_loop(self):
+        """工作线程主循环：定时回收中断的任务，领取待处理任务并执行，没有任务时等待唤醒或定时轮询"""
+        while True:
+            job_id = None
+            try:
+                with self._app.app_context():
+                    self._requeue_stale_if_due()
+                    job_id = self._claim_next_job()
+                    if job_id:
+                        self._get_service().process_recognition_job(job_id)
+            except Exception as e:
+                print(f"执行AI识别任务失败: {str(e)}")
+
+            if job_id:
+                continue
+
+            self._wakeup.wait(timeout=Config.RECOGNITION_POLL_INTERVAL)
+            self._wakeup.clear()
+
+    def _requeue_stale_if_due(self):
+        """
+        每个轮询间隔最多一次，将超时未更新的运行中任务重新入队
+        其他进程在运行中退出时遗留的任务由仍在运行的进程回收，不需要等待进程重启；
+        线程启动后的第一次循环立即执行，回收本进程重启前遗留的任务
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self._last_requeue is not None and now - self._last_requeue < Config.RECOGNITION_POLL_INTERVAL:
+                return
+            self._last_requeue = now
+
+        try:
+            RecognitionJob.requeue_stale(Config.RECOGNITION_JOB_TIMEOUT)
+        except Exception as e:
+            db.session.rollback()
+            print(f"回收中断的AI识别任务失败: {str(e)}")
+
+    def _claim_next_job(self):
+        """
+        领取下一个待处理任务
+        :return: 任务ID或None
+        """
+        while True:
+            job_id = RecognitionJob.get_next_pending_id()
+            if not job_id:
+                return None
+            if RecognitionJob.claim(job_id):
+                return job_id
+
+
+# 进程内共享的任务队列实例
+recognition_queue = RecognitionQueue()
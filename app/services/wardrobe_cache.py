@@ -0,0 +1,317 @@
+"""
+衣橱快照缓存
+按账号缓存衣橱中全部衣物的序列化结果（Clothes.to_dict()），穿搭推荐的候选衣物和穿搭序列化等只读路径都从同一份快照读取，
+不再在一次请求中反复查询同一用户的衣物。写操作前的衣物ID校验直接查询数据库（Clothes.filter_ids）。ClothesService的每个写操作（上传、识别、修改、删除、重新识别）提交后都会使快照失效。
+缓存后端通过Config.WARDROBE_CACHE_BACKEND选择：
+- memory: 进程内LRU缓存（默认），按账号数量上限淘汰；失效时同时递增数据库中该账号的衣橱版本号（wardrobe_versions表），
+  每次读取快照先按主键查询版本号，与缓存时的版本号不同则重新加载，多个gunicorn进程之间的写入立即可见
+- redis: 多个进程共享的Redis缓存（需要安装redis包）
+- none: 不缓存，每次请求从数据库加载（同一请求内仍只加载一次）
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from flask import g, has_app_context
+from config import Config
+from app.models.clothes import Clothes
+from app.models.wardrobe_version import WardrobeVersion
+
+
+class WardrobeSnapshot:
+    """
+    某个账号的衣橱快照
+    衣物以Clothes.to_dict()的字典形式保存，按创建时间倒序排列；快照在多个请求之间共享，调用方不应修改其中的字典
+    """
+
+    def __init__(self, account_id, items):
+        """
+        初始化
+        :param account_id: 账号ID
+        :param items: 衣物字典列表
+        """
+        self.account_id = account_id
+        self.items = items
+        self._by_id = {item['id']: item for item in items}
+
+    def __len__(self):
+        return len(self.items)
+
+    def get(self, clothes_id):
+        """
+        获取单件衣物
+        :param clothes_id: 衣物ID
+        :return: 衣物字典或None
+        """
+        return self._by_id.get(clothes_id)
+
+    def get_clothes_map(self, clothes_ids=None):
+        """
+        获取衣物ID到衣物字典的映射
+        :param clothes_ids: 只包含这些衣物，默认包含全部衣物
+        :return: 衣物ID到衣物字典的字典
+        """
+        if clothes_ids is None:
+            return dict(self._by_id)
+        return {clothes_id: self._by_id[clothes_id] for clothes_id in clothes_ids if clothes_id in self._by_id}
+
+    def get_available(self, exclude_clothes_ids=None):
+        """
+        获取可用状态的衣物
+        :param exclude_clothes_ids: 排除的衣物ID列表
+        :return: 衣物字典列表
+        """
+        excluded = set(exclude_clothes_ids or [])
+        return [item for item in self.items if item['status'] == 'available' and item['id'] not in excluded]
+
+
+class WardrobeCacheBackend:
+    """衣橱快照缓存后端基类，保存的是包含版本号和衣物字典列表的快照数据"""
+
+    name = None
+    # 是否由多个进程共享（共享的后端失效时所有进程立即可见，不需要检查数据库中的版本号）
+    shared = True
+
+    def get(self, account_id):
+        """
+        读取缓存
+        :param account_id: 账号ID
+        :return: 快照数据字典（version、items），未命中时返回None
+        """
+        raise NotImplementedError
+
+    def set(self, account_id, data):
+        """
+        写入缓存
+        :param account_id: 账号ID
+        :param data: 快照数据字典（version、items）
+        """
+        raise NotImplementedError
+
+    def delete(self, account_id):
+        """
+        删除缓存
+        :param account_id: 账号ID
+        """
+        raise NotImplementedError
+
+
+class NullBackend(WardrobeCacheBackend):
+    """不缓存"""
+
+    name = 'none'
+
+    def get(self, account_id):
+        return None
+
+    def set(self, account_id, data):
+        pass
+
+    def delete(self, account_id):
+        pass
+
+
+class MemoryBackend(WardrobeCacheBackend):
+    """进程内LRU缓存"""
+
+    name = 'memory'
+    shared = False
+
+    def __init__(self, max_entries=None, ttl=None):
+        """
+        初始化
+        :param max_entries: 最多缓存的账号数量，超出后淘汰最久未访问的账号
+        :param ttl: 缓存有效期（秒），0表示不过期
+        """
+        self.max_entries = max_entries or Config.WARDROBE_CACHE_MAX_ACCOUNTS
+        self.ttl = Config.WARDROBE_CACHE_TTL if ttl is None else ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, account_id):
+        with self._lock:
+            entry = self._entries.get(account_id)
+            if entry is None:
+                return None
+            expires_at, data = entry
+            if expires_at and expires_at < time.monotonic():
+                del self._entries[account_id]
+                return None
+            self._entries.move_to_end(account_id)
+            return data
+
+    def set(self, account_id, data):
+        expires_at = time.monotonic() + self.ttl if self.ttl else 0
+        with self._lock:
+            self._entries[account_id] = (expires_at, data)
+            self._entries.move_to_end(account_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, account_id):
+        with self._lock:
+            self._entries.pop(account_id, None)
+
+
+class RedisBackend(WardrobeCacheBackend):
+    """多个进程共享的Redis缓存，快照以JSON保存"""
+
+    name = 'redis'
+
+    KEY_PREFIX = 'ai-cabinet:wardrobe:'
+
+    def __init__(self, url=None, ttl=None):
+        """
+        初始化Redis客户端（redis为可选依赖，只在使用该后端时导入）
+        :param url: Redis连接地址
+        :param ttl: 缓存有效期（秒），0表示不过期
+        """
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("使用redis衣橱缓存后端需要先安装redis: pip install redis")
+        self.client = redis.Redis.from_url(url or Config.WARDROBE_CACHE_REDIS_URL)
+        self.ttl = Config.WARDROBE_CACHE_TTL if ttl is None else ttl
+
+    def get(self, account_id):
+        data = self.client.get(self.KEY_PREFIX + account_id)
+        return json.loads(data) if data else None
+
+    def set(self, account_id, data):
+        self.client.set(self.KEY_PREFIX + account_id, json.dumps(data, ensure_ascii=False),
+                        ex=self.ttl or None)
+
+    def delete(self, account_id):
+        self.client.delete(self.KEY_PREFIX + account_id)
+
+
+BACKENDS = {
+    NullBackend.name: NullBackend,
+    MemoryBackend.name: MemoryBackend,
+    RedisBackend.name: RedisBackend,
+}
+
+
+def create_backend(name=None):
+    """
+    按配置创建缓存后端
+    :param name: 后端名称，默认使用Config.WARDROBE_CACHE_BACKEND
+    :return: 缓存后端实例
+    """
+    name = (name or Config.WARDROBE_CACHE_BACKEND).lower()
+    if name not in BACKENDS:
+        raise ValueError(f"不支持的衣橱缓存后端: {name}")
+    return BACKENDS[name]()
+
+
+class WardrobeCache:
+    """衣橱快照缓存"""
+
+    def __init__(self, backend=None):
+        """
+        初始化
+        :param backend: 缓存后端，默认在第一次使用时按配置创建
+        """
+        self._backend = backend
+        self._lock = threading.Lock()
+        # 每个账号的失效次数，加载期间发生写入时不把旧数据写回缓存
+        self._generations = {}
+
+    @property
+    def backend(self):
+        """缓存后端"""
+        if self._backend is None:
+            with self._lock:
+                if self._backend is None:
+                    self._backend = create_backend()
+        return self._backend
+
+    def get_snapshot(self, account_id):
+        """
+        获取账号的衣橱快照，同一请求（应用上下文）内多次调用返回同一份快照
+        :param account_id: 账号ID
+        :return: WardrobeSnapshot对象
+        """
+        snapshots = self._request_snapshots()
+        if account_id in snapshots:
+            return snapshots[account_id]
+
+        # 进程内的缓存需要与数据库中的版本号比较，版本号读取失败时不使用缓存
+        version = None
+        cacheable = True
+        if not self.backend.shared:
+            try:
+                version = WardrobeVersion.get_version(account_id)
+            except Exception as e:
+                print(f"读取衣橱版本号失败: {str(e)}")
+                cacheable = False
+
+        items = None
+        if cacheable:
+            try:
+                data = self.backend.get(account_id)
+                if isinstance(data, dict) and data.get('version') == version:
+                    items = data['items']
+            except Exception as e:
+                print(f"读取衣橱缓存失败: {str(e)}")
+
+        if items is None:
+            # 加载期间发生的写入会使版本号变化，之后读取时发现不一致会重新加载
+            generation = self._generations.get(account_id, 0)
+            items = self.load_items(account_id)
+            if cacheable and self._generations.get(account_id, 0) == generation:
+                try:
+                    self.backend.set(account_id, {"version": version, "items": items})
+                except Exception as e:
+                    print(f"写入衣橱缓存失败: {str(e)}")
+
+        snapshot = WardrobeSnapshot(account_id, items)
+        snapshots[account_id] = snapshot
+        return snapshot
+
+    def invalidate(self, account_id):
+        """
+        使账号的衣橱快照失效（衣物写入并提交后调用）
+        进程内的缓存只能删除当前进程的快照，同时递增数据库中的版本号使其他进程的快照失效
+        :param account_id: 账号ID
+        """
+        with self._lock:
+            self._generations[account_id] = self._generations.get(account_id, 0) + 1
+        self._request_snapshots().pop(account_id, None)
+        if not self.backend.shared:
+            try:
+                WardrobeVersion.bump(account_id)
+            except Exception as e:
+                print(f"更新衣橱版本号失败: {str(e)}")
+        try:
+            self.backend.delete(account_id)
+        except Exception as e:
+            print(f"删除衣橱缓存失败: {str(e)}")
+
+    @staticmethod
+    def load_items(account_id):
+        """
+        从数据库加载账号的全部衣物（一次查询）
+        :param account_id: 账号ID
+        :return: 衣物字典列表，按创建时间倒序
+        """
+        clothes_list = Clothes.query.filter_by(account_id=account_id).order_by(
+            Clothes.created_at.desc(), Clothes.id.desc()
+        ).all()
+        return [clothes.to_dict() for clothes in clothes_list]
+
+    @staticmethod
+    def _request_snapshots():
+        """
+        当前应用上下文中已加载的快照
+        :return: 账号ID到快照的字典，不在应用上下文中时返回临时字典
+        """
+        if not has_app_context():
+            return {}
+        if not hasattr(g, 'wardrobe_snapshots'):
+            g.wardrobe_snapshots = {}
+        return g.wardrobe_snapshots
+
+
+# 进程内共享的衣橱快照缓存
+wardrobe_cache = WardrobeCache()
@@ -0,0 +1,49 @@
+"""
+并发工具
+"""
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from flask import current_app, has_app_context
+
+
+def run_in_parallel(func, items, max_workers, on_result=None):
+    """
+    使用有界线程池并发执行任务
+    如果调用时存在Flask应用上下文，每个工作线程都会推入该应用的上下文，
+    任务内部可以正常访问数据库（每个线程使用独立的会话）
+    :param func: 任务函数，接收单个元素作为参数
+    :param items: 元素列表
+    :param max_workers: 最大并发数
+    :param on_result: 可选回调 on_result(index, result)，每个任务完成时在调用线程中执行，可用于上报进度
+    :return: 结果列表，顺序与输入顺序一致
+    """
+    items = list(items)
+    if not items:
+        return []
+
+    app = current_app._get_current_object() if has_app_context() else None
+
+    def _run(item):
+        if app is None:
+            return func(item)
+        with app.app_context():
+            return func(item)
+
+    results = [None] * len(items)
+    workers = max(1, min(int(max_workers or 1), len(items)))
+
+    if workers == 1:
+        for index, item in enumerate(items):
+            results[index] = _run(item)
+            if on_result:
+                on_result(index, results[index])
+        return results
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(_run, item): index for index, item in enumerate(items)}
+        for future in as_completed(futures):
+            index = futures[future]
+            results[index] = future.result()
+            if on_result:
+                on_result(index, results[index])
+
+    return results
@@ -0,0 +1,33 @@
+"""
+文件流工具
+"""
+import io
+import os
+
+
+def get_stream_size(stream):
+    """
+    通过seek/tell获取文件流的大小，不读取文件内容，完成后恢复原来的文件指针位置
+    :param stream: 文件流
+    :return: 字节数，文件流不支持seek时返回None
+    """
+    try:
+        position = stream.tell()
+        size = stream.seek(0, os.SEEK_END)
+        stream.seek(position)
+        return size
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return None
+
+
+def get_file_size(file_storage):
+    """
+    获取上传文件的大小
+    优先通过seek/tell获取，不支持seek时使用请求中声明的Content-Length
+    :param file_storage: Flask FileStorage对象
+    :return: 字节数，无法获取时返回0
+    """
+    size = get_stream_size(file_storage.stream)
+    if size is None:
+        size = file_storage.content_length or 0
+    return size
@@ -0,0 +1,56 @@
+"""
+内容哈希工具
+"""
+import hashlib
+import requests
+
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+def sha256_stream(stream, chunk_size=HASH_CHUNK_SIZE):
+    """
+    分块计算文件流的SHA-256，计算完成后将文件指针重置到起始位置
+    :param stream: 可seek的文件流
+    :param chunk_size: 分块大小
+    :return: 十六进制哈希字符串
+    """
+    digest = hashlib.sha256()
+    stream.seek(0)
+    for chunk in iter(lambda: stream.read(chunk_size), b''):
+        digest.update(chunk)
+    stream.seek(0)
+    return digest.hexdigest()
+
+
+def sha256_url(url, timeout=10, chunk_size=HASH_CHUNK_SIZE):
+    """
+    下载URL内容并计算SHA-256
+    :param url: 文件URL
+    :param timeout: 超时时间（秒）
+    :param chunk_size: 分块大小
+    :return: 十六进制哈希字符串，下载失败返回None
+    """
+    try:
+        digest = hashlib.sha256()
+        with requests.get(url, stream=True, timeout=timeout) as response:
+            if response.status_code != 200:
+                return None
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                digest.update(chunk)
+        return digest.hexdigest()
+    except Exception as e:
+        print(f"下载图片计算哈希失败: {str(e)}")
+        return None
+
+
+def sha256_text(*parts):
+    """
+    计算多个文本片段拼接后的SHA-256
+    :param parts: 文本片段
+    :return: 十六进制哈希字符串
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update((part or '').encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
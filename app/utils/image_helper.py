@@ -0,0 +1,170 @@
+"""
+图片处理工具
+上传的照片在保存前解码（支持HEIC/HEIF）、按EXIF方向旋转、去除元数据，
+生成限制尺寸的识别用图片和列表用缩略图（响应式图片变体）。
+Pillow和pillow-heif为可选依赖：未安装Pillow时不处理图片，直接上传原图；未安装pillow-heif时HEIC图片按原图上传
+"""
+import io
+from config import Config
+
+try:
+    from PIL import Image, ImageOps
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+try:
+    from pillow_heif import register_heif_opener
+    register_heif_opener()
+    HEIF_AVAILABLE = True
+except ImportError:
+    HEIF_AVAILABLE = False
+
+# 输出格式：Pillow格式名 -> (扩展名, Content-Type)
+IMAGE_FORMATS = {
+    'JPEG': ('jpg', 'image/jpeg'),
+    'WEBP': ('webp', 'image/webp'),
+}
+
+
+class ProcessedImage:
+    """处理后的图片"""
+
+    def __init__(self, data, image_format, width, height, thumbnails=None):
+        """
+        初始化
+        :param data: 识别用图片的编码数据
+        :param image_format: 输出格式（JPEG/WEBP）
+        :param width: 宽度
+        :param height: 高度
+        :param thumbnails: 缩略图边长到编码数据的字典
+        """
+        self.data = data
+        self.image_format = image_format
+        self.width = width
+        self.height = height
+        self.thumbnails = thumbnails or {}
+
+    @property
+    def extension(self):
+        """扩展名"""
+        return IMAGE_FORMATS[self.image_format][0]
+
+    @property
+    def content_type(self):
+        """Content-Type"""
+        return IMAGE_FORMATS[self.image_format][1]
+
+
+def is_enabled():
+    """
+    是否处理上传的图片
+    :return: 布尔值
+    """
+    return PIL_AVAILABLE and Config.IMAGE_PROCESSING_ENABLED
+
+
+def encode_image(image, image_format, quality):
+    """
+    编码图片（不写入任何元数据）
+    :param image: Pillow图片对象
+    :param image_format: 输出格式（JPEG/WEBP）
+    :param quality: 压缩质量
+    :return: 编码后的字节
+    """
+    buffer = io.BytesIO()
+    if image_format == 'JPEG':
+        image.save(buffer, format='JPEG', quality=quality, optimize=True, progressive=True)
+    else:
+        image.save(buffer, format=image_format, quality=quality)
+    return buffer.getvalue()
+
+
+def make_thumbnail(image, size, image_format='WEBP', quality=None):
+    """
+    生成缩略图（保持比例，最长边不超过size）
+    :param image: Pillow图片对象
+    :param size: 最长边像素
+    :param image_format: 输出格式
+    :param quality: 压缩质量，默认Config.IMAGE_THUMBNAIL_QUALITY
+    :return: 编码后的字节
+    """
+    thumbnail = image.copy()
+    thumbnail.thumbnail((size, size), Image.LANCZOS)
+    return encode_image(thumbnail, image_format, quality or Config.IMAGE_THUMBNAIL_QUALITY)
+
+
+def open_image(stream, max_dimension=None):
+    """
+    解码图片：按EXIF方向旋转并转换为RGB
+    JPEG使用draft模式直接以接近目标的尺寸解码，大幅降低大图的解码时间和内存
+    :param stream: 图片文件流
+    :param max_dimension: 最长边像素上限，超过时等比缩小
+    :return: Pillow图片对象
+    """
+    image = Image.open(stream)
+    if max_dimension and image.format == 'JPEG':
+        image.draft('RGB', (max_dimension, max_dimension))
+    image = ImageOps.exif_transpose(image)
+
+    # 透明背景的图片填充为白色，去除调色板等模式
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+    elif image.mode != 'RGB':
+        image = image.convert('RGB')
+
+    if max_dimension and max(image.size) > max_dimension:
+        image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+    return image
+
+
+def process_image(stream, max_dimension=None, image_format=None, quality=None, thumbnail_sizes=None):
+    """
+    规范化上传的图片并生成缩略图，完成后将文件指针重置到起始位置
+    :param stream: 图片文件流
+    :param max_dimension: 识别用图片的最长边像素，默认Config.IMAGE_MAX_DIMENSION
+    :param image_format: 识别用图片的格式，默认Config.IMAGE_FORMAT
+    :param quality: 识别用图片的压缩质量，默认Config.IMAGE_QUALITY
+    :param thumbnail_sizes: 缩略图最长边像素列表，默认Config.IMAGE_THUMBNAIL_SIZES
+    :return: ProcessedImage对象，未启用或无法解码时返回None（调用方上传原图）
+    """
+    if not is_enabled():
+        return None
+
+    image_format = (image_format or Config.IMAGE_FORMAT).upper()
+    if image_format not in IMAGE_FORMATS:
+        raise ValueError(f"不支持的图片格式: {image_format}")
+    thumbnail_sizes = Config.IMAGE_THUMBNAIL_SIZES if thumbnail_sizes is None else thumbnail_sizes
+
+    try:
+        stream.seek(0)
+        image = open_image(stream, max_dimension or Config.IMAGE_MAX_DIMENSION)
+        data = encode_image(image, image_format, quality or Config.IMAGE_QUALITY)
+        thumbnails = {size: make_thumbnail(image, size) for size in thumbnail_sizes}
+        return ProcessedImage(data, image_format, image.width, image.height, thumbnails)
+    except Exception as e:
+        print(f"处理图片失败，使用原图: {str(e)}")
+        return None
+    finally:
+        stream.seek(0)
+
+
+def generate_thumbnails(stream, sizes=None):
+    """
+    为已保存的图片生成缩略图（用于补生成旧图片的缩略图），按最大的缩略图尺寸解码，不生成识别用图片
+    :param stream: 图片文件流
+    :param sizes: 缩略图最长边像素列表，默认Config.IMAGE_THUMBNAIL_SIZES
+    :return: 缩略图边长到编码数据（WebP）的字典，未启用时返回None
+    :raises: 无法解码图片时抛出异常
+    """
+    if not is_enabled():
+        return None
+
+    sizes = Config.IMAGE_THUMBNAIL_SIZES if sizes is None else sizes
+    if not sizes:
+        return {}
+    image = open_image(stream, max(sizes))
+    return {size: make_thumbnail(image, size) for size in sizes}
@@ -0,0 +1,57 @@
+"""
+流式JSON解析工具
+"""
+
+
+class JsonObjectScanner:
+    """
+    增量扫描流式输出的文本，检测第一个顶层JSON对象何时闭合
+    能正确处理字符串中的括号和转义字符
+    """
+
+    def __init__(self):
+        """初始化"""
+        self.buffer = []
+        self.length = 0
+        self._depth = 0
+        self._start = None
+        self._in_string = False
+        self._escaped = False
+        self._result = None
+
+    def feed(self, text):
+        """
+        追加一段文本
+        :param text: 新到达的文本片段
+        :return: JSON对象闭合时返回完整的对象文本，否则返回None
+        """
+        if self._result is not None:
+            return self._result
+
+        for char in text or '':
+            position = self.length
+            self.buffer.append(char)
+            self.length += 1
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"' and self._start is not None:
+                self._in_string = True
+            elif char == '{':
+                if self._start is None:
+                    self._start = position
+                self._depth += 1
+            elif char == '}' and self._start is not None:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._result = ''.join(self.buffer[self._start:position + 1])
+                    return self._result
+
+        return None
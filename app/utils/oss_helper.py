@@ -1,42 +1,28 @@
 """
-阿里云OSS工具类
+对象存储工具类
+负责对象键名、公共URL和上传流程，存储操作由Config.STORAGE_BACKEND选择的后端（阿里云OSS、本地磁盘或内存）完成，
+各后端的键名和URL规则相同，调用方不需要关心实际使用的存储
 """
-import os
 import uuid
 from datetime import datetime
-import alibabacloud_oss_v2 as oss
 from config import Config
+from app.utils.storage_backend import get_storage_backend
 
 # 从配置中导入OSS相关配置
-OSS_ACCESS_KEY_ID = Config.OSS_ACCESS_KEY_ID
-OSS_ACCESS_KEY_SECRET = Config.OSS_ACCESS_KEY_SECRET
-OSS_REGION = Config.OSS_REGION
-OSS_BUCKET_NAME = Config.OSS_BUCKET_NAME
-OSS_ENDPOINT = Config.OSS_ENDPOINT
 ALLOWED_EXTENSIONS = Config.ALLOWED_EXTENSIONS
 OSS_URL_EXPIRATION = Config.OSS_URL_EXPIRATION
-OSS_PUBLIC_URL_BASE = Config.OSS_PUBLIC_URL_BASE
+OSS_UPLOAD_URL_EXPIRATION = Config.OSS_UPLOAD_URL_EXPIRATION
 
 
 class OSSHelper:
-    """阿里云OSS工具类"""
-
-    def __init__(self):
-        """初始化OSS客户端"""
-        # 创建凭证提供者
-        credentials_provider = oss.credentials.StaticCredentialsProvider(
-            OSS_ACCESS_KEY_ID, OSS_ACCESS_KEY_SECRET
-        )
-        
-        # 使用SDK的默认配置
-        cfg = oss.config.load_default()
-        cfg.credentials_provider = credentials_provider
-        cfg.region = OSS_REGION
-        cfg.endpoint = OSS_ENDPOINT
-        
-        # 创建OSS客户端
-        self.client = oss.Client(cfg)
-        self.bucket_name = OSS_BUCKET_NAME
+    """对象存储工具类"""
+
+    def __init__(self, backend=None):
+        """
+        初始化
+        :param backend: 存储后端，默认使用进程内共享的Config.STORAGE_BACKEND后端
+        """
+        self.backend = backend or get_storage_backend()
 
     def allowed_file(self, filename):
         """
@@ -64,6 +50,17 @@ class OSSHelper:
         
         return f"{file_type}/{account_id}/{today}/{unique_id}.{ext}"
 
+    def derive_object_key(self, object_key, suffix, ext):
+        """
+        根据对象键名生成派生文件（如缩略图）的键名，与原文件位于同一目录
+        :param object_key: 原对象键名
+        :param suffix: 派生文件后缀，如w256
+        :param ext: 派生文件扩展名
+        :return: 派生对象键名，如clothes/<账号>/<日期>/<UUID>_w256.webp
+        """
+        base = object_key.rsplit('.', 1)[0] if '.' in object_key.rsplit('/', 1)[-1] else object_key
+        return f"{base}_{suffix}.{ext}"
+
     def upload_file(self, account_id, file_storage, file_type='clothes'):
         """
         上传文件到OSS
@@ -75,24 +72,26 @@ class OSSHelper:
         if not file_storage or not self.allowed_file(file_storage.filename):
             return None
         
+        # 生成对象键名
+        object_key = self.generate_object_key(account_id, file_storage.filename, file_type)
+        if self.put_stream(object_key, file_storage.stream):
+            return object_key
+        return None
+
+    def put_stream(self, object_key, stream, content_type=None):
+        """
+        将文件流上传到指定的对象键名（OSS后端不会把文件整体读入内存，大文件使用分片上传）
+        :param object_key: 对象键名
+        :param stream: 文件流
+        :param content_type: Content-Type
+        :return: 布尔值，表示是否上传成功
+        """
         try:
-            # 生成对象键名
-            object_key = self.generate_object_key(account_id, file_storage.filename, file_type)
-            
-            # 上传文件
-            result = self.client.put_object(oss.PutObjectRequest(
-                bucket=self.bucket_name,
-                key=object_key,
-                body=file_storage.stream,
-            ))
-            
-            if result and result.etag:
-                return object_key
-            
-            return None
+            self.backend.put_stream(object_key, stream, content_type)
+            return True
         except Exception as e:
             print(f"上传文件到OSS失败: {str(e)}")
-            return None
+            return False
 
     def get_signed_url(self, object_key, expires=OSS_URL_EXPIRATION):
         """
@@ -102,34 +101,77 @@ class OSSHelper:
         :return: 签名URL
         """
         try:
-            # 生成签名URL
-            request = oss.GetObjectRequest(bucket=self.bucket_name, key=object_key)
-            presigned_url = self.client.generate_presigned_url(request, expires_in=expires)
-            return presigned_url
+            return self.backend.get_signed_url(object_key, expires)
         except Exception as e:
             print(f"获取签名URL失败: {str(e)}")
             return None
 
+    def get_signed_put_url(self, object_key, content_type=None, expires=OSS_UPLOAD_URL_EXPIRATION):
+        """
+        获取直传对象的签名PUT URL，客户端使用该URL直接上传文件到存储，文件内容不经过应用服务器
+        :param object_key: 对象键名
+        :param content_type: 文件的Content-Type，指定后客户端上传时必须携带相同的请求头
+        :param expires: 过期时间（秒）
+        :return: 包含url、method、headers、expiration的字典，失败返回None
+        """
+        try:
+            return self.backend.get_signed_put_url(object_key, content_type, expires)
+        except Exception as e:
+            print(f"获取上传签名URL失败: {str(e)}")
+            return None
+
+    def get_object_meta(self, object_key):
+        """
+        获取对象的元信息（OSS后端为HEAD请求，不下载文件内容）
+        :param object_key: 对象键名
+        :return: 包含size、content_type、etag的字典，对象不存在或请求失败时返回None
+        """
+        try:
+            return self.backend.get_object_meta(object_key)
+        except Exception as e:
+            print(f"获取OSS对象信息失败: {str(e)}")
+            return None
+
+    def get_object(self, object_key):
+        """
+        下载对象内容
+        :param object_key: 对象键名
+        :return: 文件内容（字节），对象不存在或请求失败时返回None
+        """
+        try:
+            return self.backend.get_object(object_key)
+        except Exception as e:
+            print(f"下载OSS对象失败: {str(e)}")
+            return None
+
+    def get_object_key(self, url):
+        """
+        从公共URL中解析对象键名（get_public_url的逆操作）
+        :param url: 公共URL
+        :return: 对象键名，不是当前存储的URL时返回None
+        """
+        prefix = f"{self.backend.url_base}/"
+        if not url or not url.startswith(prefix):
+            return None
+        return url[len(prefix):].split('?', 1)[0] or None
+
     def get_public_url(self, object_key):
         """
         获取对象的公共URL
         :param object_key: 对象键名
         :return: 公共URL
         """
-        return f"{OSS_PUBLIC_URL_BASE}/{object_key}"
+        return f"{self.backend.url_base}/{object_key}"
 
     def delete_object(self, object_key):
         """
-        删除OSS对象
+        删除对象
         :param object_key: 对象键名
         :return: 布尔值，表示是否删除成功
         """
         try:
-            self.client.delete_object(oss.DeleteObjectRequest(
-                bucket=self.bucket_name,
-                key=object_key
-            ))
+            self.backend.delete_object(object_key)
             return True
         except Exception as e:
             print(f"删除OSS对象失败: {str(e)}")
-            return False 
\ No newline at end of file
+            return False
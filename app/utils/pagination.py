@@ -0,0 +1,32 @@
+"""
+游标分页工具
+游标是对排序键（created_at, id）编码后的不透明字符串，客户端原样回传即可获取下一页
+"""
+import base64
+from datetime import datetime
+
+
+def encode_cursor(created_at, item_id):
+    """
+    将排序键编码为游标
+    :param created_at: 创建时间
+    :param item_id: 记录ID
+    :return: 游标字符串
+    """
+    raw = f"{created_at.isoformat()}|{item_id}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    解析游标
+    :param cursor: 游标字符串
+    :return: (创建时间, 记录ID)
+    :raises ValueError: 游标格式错误
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, item_id = base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8').split('|')
+        return datetime.fromisoformat(created_at), int(item_id)
+    except Exception:
+        raise ValueError("无效的分页游标")
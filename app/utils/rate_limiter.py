@@ -0,0 +1,80 @@
+"""
+限流工具
+"""
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    线程安全的令牌桶限流器
+    令牌以固定速率补充，桶满后不再增加；每次请求消耗令牌，令牌不足时等待补充，
+    允许最多capacity个请求的突发，长期平均速率不超过rate
+    """
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        """
+        初始化
+        :param rate: 每秒补充的令牌数，0表示不限流
+        :param capacity: 桶容量（允许的突发请求数），默认与rate相同且至少为1
+        :param clock: 返回当前时间（秒）的函数
+        :param sleep: 等待指定秒数的函数
+        """
+        self.rate = float(rate or 0)
+        self.capacity = max(1.0, float(capacity or self.rate or 1))
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        """是否限流"""
+        return self.rate > 0
+
+    def try_acquire(self, tokens=1):
+        """
+        尝试立即获取令牌
+        :param tokens: 需要的令牌数
+        :return: 布尔值，表示是否获取成功
+        """
+        return self._take(tokens) == 0
+
+    def acquire(self, tokens=1, timeout=None):
+        """
+        获取令牌，令牌不足时阻塞等待
+        :param tokens: 需要的令牌数（超过桶容量时按桶容量计算）
+        :param timeout: 最长等待时间（秒），None表示一直等待
+        :return: 布尔值，表示是否在超时前获取成功
+        """
+        if not self.enabled:
+            return True
+
+        deadline = None if timeout is None else self._clock() + timeout
+        while True:
+            wait = self._take(tokens)
+            if wait == 0:
+                return True
+            if deadline is not None and self._clock() + wait > deadline:
+                return False
+            self._sleep(wait)
+
+    def _take(self, tokens):
+        """
+        补充令牌并在足够时扣除
+        :param tokens: 需要的令牌数
+        :return: 获取成功时返回0，否则返回还需等待的秒数
+        """
+        if not self.enabled:
+            return 0
+
+        tokens = min(float(tokens), self.capacity)
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0
+            return (tokens - self._tokens) / self.rate
@@ -1,3 +1,4 @@
+import json
 from flask import jsonify
 
 def success_response(result=None, status_code=200):
@@ -29,4 +30,13 @@ def error_response(message, errors=None, status_code=400):
     if errors:
         response["errors"] = errors
         
-    return jsonify(response), status_code 
\ No newline at end of file
+    return jsonify(response), status_code
+
+def sse_event(event, data=None):
+    """
+    格式化一条Server-Sent Events消息
+    :param event: 事件名
+    :param data: 事件数据，序列化为JSON
+    :return: SSE消息文本
+    """
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
\ No newline at end of file
@@ -0,0 +1,367 @@
+"""
+对象存储后端
+OSSHelper负责对象键名、URL和上传流程，实际的存储操作交给后端，通过Config.STORAGE_BACKEND选择实现：
+- oss: 阿里云OSS（默认，需要安装alibabacloud_oss_v2，只在使用该后端时导入）
+- local: 本地磁盘，对象保存在STORAGE_LOCAL_ROOT下与OSS相同的键名路径中，由应用的/ai-cabinet/storage接口提供访问和直传
+- memory: 进程内内存，用于测试和离线压测（多进程部署时各进程互不可见）
+local和memory后端不需要云端凭证和网络，可以离线运行完整的上传流程，压测结果只包含Flask和数据库的开销
+"""
+import hashlib
+import hmac
+import mimetypes
+import os
+import shutil
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from urllib.parse import urlencode
+from config import Config
+from app.utils.file_helper import get_stream_size
+
+# 从配置中导入分片上传配置
+OSS_MULTIPART_THRESHOLD = Config.OSS_MULTIPART_THRESHOLD
+OSS_MULTIPART_PART_SIZE = Config.OSS_MULTIPART_PART_SIZE
+OSS_MULTIPART_PARALLEL = Config.OSS_MULTIPART_PARALLEL
+
+
+class StorageBackend:
+    """对象存储后端基类，失败时直接抛出异常，由OSSHelper统一处理（OSS后端对象不存在时也抛出异常）"""
+
+    name = None
+
+    @property
+    def url_base(self):
+        """公共URL的前缀，对象的公共URL为<url_base>/<对象键名>"""
+        raise NotImplementedError
+
+    def put_stream(self, object_key, stream, content_type=None):
+        """
+        将文件流保存到指定的对象键名
+        :param object_key: 对象键名
+        :param stream: 文件流
+        :param content_type: Content-Type
+        """
+        raise NotImplementedError
+
+    def get_object(self, object_key):
+        """
+        读取对象内容
+        :param object_key: 对象键名
+        :return: 文件内容（字节），对象不存在时返回None
+        """
+        raise NotImplementedError
+
+    def get_object_meta(self, object_key):
+        """
+        获取对象的元信息
+        :param object_key: 对象键名
+        :return: 包含size、content_type、etag的字典，对象不存在时返回None
+        """
+        raise NotImplementedError
+
+    def delete_object(self, object_key):
+        """
+        删除对象，对象不存在时不报错
+        :param object_key: 对象键名
+        """
+        raise NotImplementedError
+
+    def get_signed_url(self, object_key, expires):
+        """
+        获取下载对象的签名URL
+        :param object_key: 对象键名
+        :param expires: 过期时间（秒）
+        :return: 签名URL
+        """
+        raise NotImplementedError
+
+    def get_signed_put_url(self, object_key, content_type, expires):
+        """
+        获取直传对象的签名PUT URL
+        :param object_key: 对象键名
+        :param content_type: 文件的Content-Type，指定后上传时必须携带相同的请求头
+        :param expires: 过期时间（秒）
+        :return: 包含url、method、headers、expiration的字典
+        """
+        raise NotImplementedError
+
+
+class OSSBackend(StorageBackend):
+    """阿里云OSS"""
+
+    name = 'oss'
+
+    def __init__(self):
+        """初始化OSS客户端（alibabacloud_oss_v2只在使用该后端时导入）"""
+        try:
+            import alibabacloud_oss_v2 as oss
+        except ImportError:
+            raise RuntimeError("使用oss存储后端需要先安装alibabacloud_oss_v2: pip install alibabacloud-oss-v2")
+        self.oss = oss
+
+        # 创建凭证提供者
+        credentials_provider = oss.credentials.StaticCredentialsProvider(
+            Config.OSS_ACCESS_KEY_ID, Config.OSS_ACCESS_KEY_SECRET
+        )
+
+        # 使用SDK的默认配置
+        cfg = oss.config.load_default()
+        cfg.credentials_provider = credentials_provider
+        cfg.region = Config.OSS_REGION
+        cfg.endpoint = Config.OSS_ENDPOINT
+
+        # 创建OSS客户端
+        self.client = oss.Client(cfg)
+        self.bucket_name = Config.OSS_BUCKET_NAME
+
+    @property
+    def url_base(self):
+        return Config.OSS_PUBLIC_URL_BASE
+
+    def put_stream(self, object_key, stream, content_type=None):
+        """
+        文件流直接交给OSS客户端分块读取，不会整体读入内存；
+        超过OSS_MULTIPART_THRESHOLD的文件使用分片上传，内存占用不超过分片大小×并发数
+        """
+        request = self.oss.PutObjectRequest(bucket=self.bucket_name, key=object_key, content_type=content_type)
+
+        size = get_stream_size(stream)
+        if size is not None and size > OSS_MULTIPART_THRESHOLD:
+            uploader = self.client.uploader(part_size=OSS_MULTIPART_PART_SIZE, parallel_num=OSS_MULTIPART_PARALLEL)
+            result = uploader.upload_from(request, stream)
+        else:
+            request.body = stream
+            result = self.client.put_object(request)
+
+        if not (result and result.etag):
+            raise RuntimeError(f"上传{object_key}未返回ETag")
+
+    def get_object(self, object_key):
+        result = self.client.get_object(self.oss.GetObjectRequest(bucket=self.bucket_name, key=object_key))
+        with result.body as body:
+            return body.read()
+
+    def get_object_meta(self, object_key):
+        result = self.client.head_object(self.oss.HeadObjectRequest(bucket=self.bucket_name, key=object_key))
+        return {
+            "size": result.content_length,
+            "content_type": result.content_type,
+            "etag": result.etag
+        }
+
+    def delete_object(self, object_key):
+        self.client.delete_object(self.oss.DeleteObjectRequest(bucket=self.bucket_name, key=object_key))
+
+    def get_signed_url(self, object_key, expires):
+        request = self.oss.GetObjectRequest(bucket=self.bucket_name, key=object_key)
+        return self.client.presign(request, expires=timedelta(seconds=expires)).url
+
+    def get_signed_put_url(self, object_key, content_type, expires):
+        request = self.oss.PutObjectRequest(bucket=self.bucket_name, key=object_key, content_type=content_type)
+        result = self.client.presign(request, expires=timedelta(seconds=expires))
+        return {
+            "url": result.url,
+            "method": result.method,
+            "headers": dict(result.signed_headers or {}),
+            "expiration": result.expiration.isoformat() if result.expiration else None
+        }
+
+
+class AppServedBackend(StorageBackend):
+    """
+    由应用自身提供访问的存储后端（local、memory）
+    对象通过/ai-cabinet/storage/<对象键名>下载；直传使用应用签发的PUT URL，签名为SECRET_KEY对键名、过期时间和Content-Type的HMAC
+    """
+
+    @property
+    def url_base(self):
+        return Config.STORAGE_URL_BASE.rstrip('/')
+
+    def get_signed_url(self, object_key, expires):
+        # 本地对象不需要签名即可访问
+        return f"{self.url_base}/{object_key}"
+
+    def get_signed_put_url(self, object_key, content_type, expires):
+        expires_at = int(time.time()) + int(expires)
+        query = urlencode({
+            "expires": expires_at,
+            "signature": self.sign_put(object_key, expires_at, content_type)
+        })
+        return {
+            "url": f"{self.url_base}/{object_key}?{query}",
+            "method": "PUT",
+            "headers": {"Content-Type": content_type} if content_type else {},
+            "expiration": datetime.utcfromtimestamp(expires_at).isoformat()
+        }
+
+    @staticmethod
+    def sign_put(object_key, expires_at, content_type=None):
+        """
+        计算直传PUT URL的签名
+        :param object_key: 对象键名
+        :param expires_at: 过期时间戳（秒）
+        :param content_type: Content-Type
+        :return: 十六进制签名
+        """
+        message = f"PUT\n{object_key}\n{expires_at}\n{content_type or ''}"
+        return hmac.new(Config.SECRET_KEY.encode('utf-8'), message.encode('utf-8'), hashlib.sha256).hexdigest()
+
+    def verify_put(self, object_key, expires_at, signature, content_type=None):
+        """
+        校验直传PUT URL的签名和有效期
+        :param object_key: 对象键名
+        :param expires_at: URL中的过期时间戳
+        :param signature: URL中的签名
+        :param content_type: 请求的Content-Type
+        :return: 布尔值
+        """
+        try:
+            expires_at = int(expires_at)
+        except (TypeError, ValueError):
+            return False
+        if expires_at < time.time():
+            return False
+        # 签发时未指定Content-Type的URL允许任意Content-Type
+        return any(hmac.compare_digest(self.sign_put(object_key, expires_at, value), signature or '')
+                   for value in (content_type, None))
+
+
+class LocalBackend(AppServedBackend):
+    """本地磁盘，对象按键名保存在根目录下，目录结构与OSS中的键名一致"""
+
+    name = 'local'
+
+    def __init__(self, root=None):
+        """
+        初始化
+        :param root: 根目录，默认Config.STORAGE_LOCAL_ROOT
+        """
+        self.root = os.path.abspath(root or Config.STORAGE_LOCAL_ROOT)
+
+    def get_path(self, object_key):
+        """
+        获取对象的文件路径
+        :param object_key: 对象键名
+        :return: 绝对路径
+        :raises ValueError: 键名指向根目录之外时抛出
+        """
+        path = os.path.abspath(os.path.join(self.root, object_key))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"非法的对象键名: {object_key}")
+        return path
+
+    def put_stream(self, object_key, stream, content_type=None):
+        # 先写入临时文件再重命名，读取方不会看到写了一半的文件
+        path = self.get_path(object_key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(temp_path, 'wb') as f:
+                shutil.copyfileobj(stream, f)
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def get_object(self, object_key):
+        try:
+            with open(self.get_path(object_key), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def get_object_meta(self, object_key):
+        try:
+            stat = os.stat(self.get_path(object_key))
+        except FileNotFoundError:
+            return None
+        return {
+            "size": stat.st_size,
+            "content_type": mimetypes.guess_type(object_key)[0],
+            "etag": f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+        }
+
+    def delete_object(self, object_key):
+        try:
+            os.remove(self.get_path(object_key))
+        except FileNotFoundError:
+            pass
+
+
+class MemoryBackend(AppServedBackend):
+    """进程内内存"""
+
+    name = 'memory'
+
+    def __init__(self):
+        """初始化"""
+        self.objects = {}
+        self._lock = threading.Lock()
+
+    def put_stream(self, object_key, stream, content_type=None):
+        data = stream.read()
+        with self._lock:
+            self.objects[object_key] = (data, content_type or mimetypes.guess_type(object_key)[0])
+
+    def get_object(self, object_key):
+        entry = self.objects.get(object_key)
+        return entry[0] if entry else None
+
+    def get_object_meta(self, object_key):
+        entry = self.objects.get(object_key)
+        if entry is None:
+            return None
+        data, content_type = entry
+        return {
+            "size": len(data),
+            "content_type": content_type,
+            "etag": hashlib.md5(data).hexdigest()
+        }
+
+    def delete_object(self, object_key):
+        with self._lock:
+            self.objects.pop(object_key, None)
+
+
+BACKENDS = {
+    OSSBackend.name: OSSBackend,
+    LocalBackend.name: LocalBackend,
+    MemoryBackend.name: MemoryBackend,
+}
+
+# 进程内共享的存储后端实例
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def create_storage_backend(name=None):
+    """
+    按配置创建新的存储后端（一般应使用get_storage_backend共享实例）
+    :param name: 后端名称，默认使用Config.STORAGE_BACKEND
+    :return: 存储后端实例
+    """
+    name = (name or Config.STORAGE_BACKEND).lower()
+    if name not in BACKENDS:
+        raise ValueError(f"不支持的存储后端: {name}")
+    return BACKENDS[name]()
+
+
+def get_storage_backend(name=None):
+    """
+    获取进程内共享的存储后端
+    所有OSSHelper实例共用同一个OSS客户端（及其连接池）和同一份内存存储；
+    按进程ID区分实例，gunicorn fork出的每个worker会创建自己的客户端
+    :param name: 后端名称，默认使用Config.STORAGE_BACKEND
+    :return: 存储后端实例
+    """
+    key = ((name or Config.STORAGE_BACKEND).lower(), os.getpid())
+
+    backend = _registry.get(key)
+    if backend is None:
+        with _registry_lock:
+            backend = _registry.get(key)
+            if backend is None:
+                backend = create_storage_backend(key[0])
+                _registry[key] = backend
+    return backend
@@ -11,6 +11,39 @@ class Config:
     # 文件上传配置
     MAX_CONTENT_LENGTH = 10 * 1024 * 1024  # 最大上传文件大小（10MB）
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp', 'bmp', 'tiff', 'ico', 'heic', 'heif'}  # 允许上传的图片格式
+    UPLOAD_MAX_FILES = int(os.getenv('UPLOAD_MAX_FILES', 50))  # 直传签名和提交接口单次请求的最大文件数
+    UPLOAD_MAX_WORKERS = int(os.getenv('UPLOAD_MAX_WORKERS', 4))  # 单次上传请求/识别任务内并发处理文件（OSS上传、AI识别）的最大线程数
+    
+    # 上传图片处理配置（需要安装Pillow，HEIC/HEIF需要安装pillow-heif）
+    IMAGE_PROCESSING_ENABLED = os.getenv('IMAGE_PROCESSING_ENABLED', 'true').lower() == 'true'  # 是否在上传时规范化图片，关闭或未安装Pillow时上传原图
+    IMAGE_MAX_DIMENSION = int(os.getenv('IMAGE_MAX_DIMENSION', 1600))  # 识别用图片的最长边像素
+    IMAGE_FORMAT = os.getenv('IMAGE_FORMAT', 'JPEG')  # 识别用图片的格式：JPEG、WEBP
+    IMAGE_QUALITY = int(os.getenv('IMAGE_QUALITY', 85))  # 识别用图片的压缩质量
+    IMAGE_THUMBNAIL_SIZES = [int(size) for size in os.getenv('IMAGE_THUMBNAIL_SIZES', '128,256,512').split(',') if size.strip()]  # 缩略图（响应式图片变体）最长边像素，逗号分隔
+    IMAGE_THUMBNAIL_QUALITY = int(os.getenv('IMAGE_THUMBNAIL_QUALITY', 80))  # 缩略图（WebP）的压缩质量
+    IMAGE_THUMBNAIL_SIZE = int(os.getenv('IMAGE_THUMBNAIL_SIZE', 256))  # 衣物thumbnail_url字段使用的缩略图尺寸（不小于该尺寸的最小变体）
+    IMAGE_VARIANT_WORKERS = int(os.getenv('IMAGE_VARIANT_WORKERS', 1))  # 为旧图片补生成缩略图的后台线程数，0表示不补生成（旧图片返回原图URL）
+    
+    # 衣物列表分页配置
+    CLOTHES_PAGE_SIZE = int(os.getenv('CLOTHES_PAGE_SIZE', 50))  # 默认每页数量
+    CLOTHES_MAX_PAGE_SIZE = int(os.getenv('CLOTHES_MAX_PAGE_SIZE', 200))  # 每页数量上限
+    
+    # 衣橱快照缓存配置（按账号缓存全部衣物，衣物写入后失效）
+    WARDROBE_CACHE_BACKEND = os.getenv('WARDROBE_CACHE_BACKEND', 'memory')  # 缓存后端：memory（进程内LRU）、redis（多进程共享）、none（不缓存）
+    WARDROBE_CACHE_MAX_ACCOUNTS = int(os.getenv('WARDROBE_CACHE_MAX_ACCOUNTS', 1000))  # 进程内最多缓存的账号数量，超出后淘汰最久未访问的账号
+    WARDROBE_CACHE_TTL = int(os.getenv('WARDROBE_CACHE_TTL', 300))  # 缓存有效期（秒）
+    WARDROBE_CACHE_REDIS_URL = os.getenv('WARDROBE_CACHE_REDIS_URL', 'redis://localhost:6379/0')  # redis后端的连接地址
+    
+    # AI识别后台任务配置
+    RECOGNITION_WORKERS = int(os.getenv('RECOGNITION_WORKERS', 2))  # 每个进程的后台识别线程数，0表示在请求中同步识别
+    RECOGNITION_AUTOSTART = os.getenv('RECOGNITION_AUTOSTART', 'true').lower() == 'true'  # 服务进程收到请求时是否自动启动后台识别线程（命令行和迁移脚本不启动）
+    RECOGNITION_POLL_INTERVAL = 5  # 后台线程轮询待处理任务的间隔（秒）
+    RECOGNITION_JOB_TIMEOUT = 600  # 运行中任务超过该时间未更新则视为中断，由后台线程每个轮询间隔检查并重新入队（秒）
+    
+    # 对象存储配置
+    STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'oss')  # 存储后端：oss（阿里云OSS）、local（本地磁盘）、memory（进程内内存，用于测试和离线压测）
+    STORAGE_LOCAL_ROOT = os.getenv('STORAGE_LOCAL_ROOT', 'storage')  # local后端的根目录，目录结构与OSS中的键名一致
+    STORAGE_URL_BASE = os.getenv('STORAGE_URL_BASE', 'http://localhost:8080/ai-cabinet/storage')  # local和memory后端的公共URL前缀（由应用的/ai-cabinet/storage接口提供访问）
     
     # 阿里云OSS配置
     OSS_ACCESS_KEY_ID = os.getenv('OSS_ACCESS_KEY_ID', '')
@@ -21,13 +54,42 @@ class Config:
     
     # OSS文件访问配置
     OSS_URL_EXPIRATION = 360000  # 签名URL有效期（秒）
+    OSS_UPLOAD_URL_EXPIRATION = int(os.getenv('OSS_UPLOAD_URL_EXPIRATION', 900))  # 直传签名PUT URL有效期（秒）
+    OSS_MULTIPART_THRESHOLD = int(os.getenv('OSS_MULTIPART_THRESHOLD', 4 * 1024 * 1024))  # 超过该大小的文件使用分片上传（字节）
+    OSS_MULTIPART_PART_SIZE = int(os.getenv('OSS_MULTIPART_PART_SIZE', 1024 * 1024))  # 分片大小（字节），OSS要求不小于100KB
+    OSS_MULTIPART_PARALLEL = int(os.getenv('OSS_MULTIPART_PARALLEL', 2))  # 单个文件并发上传的分片数
     OSS_PUBLIC_URL_BASE = f"https://{OSS_BUCKET_NAME}.{OSS_ENDPOINT.replace('https://', '')}"  # 公开访问的URL基础
     
+    # 大模型服务配置
+    LLM_PROVIDER = os.getenv('LLM_PROVIDER', 'openai')  # 服务提供者：openai（OpenAI兼容接口）、stub（本地桩，用于离线压测）
+    LLM_TIMEOUT = float(os.getenv('LLM_TIMEOUT', 60))  # 单次请求超时时间（秒）
+    LLM_CONNECT_TIMEOUT = float(os.getenv('LLM_CONNECT_TIMEOUT', 5))  # 建立连接超时时间（秒）
+    LLM_POOL_MAX_CONNECTIONS = int(os.getenv('LLM_POOL_MAX_CONNECTIONS', 20))  # 每个进程的最大连接数
+    LLM_POOL_MAX_KEEPALIVE = int(os.getenv('LLM_POOL_MAX_KEEPALIVE', 10))  # 每个进程保持的空闲长连接数
+    LLM_POOL_KEEPALIVE_EXPIRY = float(os.getenv('LLM_POOL_KEEPALIVE_EXPIRY', 60))  # 空闲长连接的保持时间（秒）
+    
     # OpenAI配置
     OPENAI_API_KEY = os.getenv('OPENAI_API_KEY', '')
     OPENAI_MODEL = os.getenv('OPENAI_MODEL', '')
+    OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL', 'https://ark.cn-beijing.volces.com/api/v3')
     OPENAI_MAX_RETRIES = 3  # 最大重试次数
     
+    # 本地桩服务配置（LLM_PROVIDER=stub时生效），随机数使用固定种子，结果可重复复现
+    LLM_STUB_LATENCY_MS = int(os.getenv('LLM_STUB_LATENCY_MS', 800))  # 平均响应延迟（毫秒）
+    LLM_STUB_LATENCY_JITTER_MS = int(os.getenv('LLM_STUB_LATENCY_JITTER_MS', 200))  # 延迟抖动范围（毫秒）
+    LLM_STUB_ERROR_RATE = float(os.getenv('LLM_STUB_ERROR_RATE', 0))  # 模拟错误的概率（0-1）
+    LLM_STUB_TIMEOUT_RATE = float(os.getenv('LLM_STUB_TIMEOUT_RATE', 0))  # 模拟超时的概率（0-1），超时请求等待LLM_TIMEOUT后失败
+    LLM_STUB_SEED = int(os.getenv('LLM_STUB_SEED', 42))  # 随机数种子
+    
+    # AI识别结果缓存配置（按图片内容哈希去重）
+    AI_CACHE_ENABLED = os.getenv('AI_CACHE_ENABLED', 'true').lower() == 'true'
+    AI_CACHE_TTL = int(os.getenv('AI_CACHE_TTL', 30 * 24 * 3600))  # 缓存有效期（秒）
+    AI_CACHE_MAX_ENTRIES = int(os.getenv('AI_CACHE_MAX_ENTRIES', 100000))  # 最大缓存条数，超出后淘汰最久未命中的记录
+    AI_CACHE_EVICT_INTERVAL = int(os.getenv('AI_CACHE_EVICT_INTERVAL', 100))  # 每个进程每写入多少条缓存执行一次淘汰
+    AI_CACHE_EVICT_BATCH = int(os.getenv('AI_CACHE_EVICT_BATCH', 1000))  # 每次淘汰最多删除的记录数
+    AI_CACHE_HIT_FLUSH_SIZE = int(os.getenv('AI_CACHE_HIT_FLUSH_SIZE', 50))  # 进程内累积多少条命中记录后批量写入数据库
+    AI_CACHE_STATS_ACCOUNTS = [account.strip() for account in os.getenv('AI_CACHE_STATS_ACCOUNTS', '').split(',') if account.strip()]  # 允许查询缓存统计的管理员账号ID，逗号分隔，为空时关闭统计接口
+    
     # AI识别提示词配置
     AI_VISION_SYSTEM_PROMPT = os.getenv('AI_VISION_SYSTEM_PROMPT', 
         "你是一个专业的服装分析AI,擅长识别服装类型、颜色、适合季节和风格。")
@@ -41,12 +103,28 @@ class Config:
         
     请只返回JSON格式的结果,不要包含其他解释文字。"""
     AI_VISION_USER_PROMPT = os.getenv('AI_VISION_USER_PROMPT', ai_version_user_promot)
+    AI_VISION_BATCH_SIZE = int(os.getenv('AI_VISION_BATCH_SIZE', 8))  # 单次多图识别请求包含的最大图片数，1表示逐张识别
+    AI_VISION_RATE_LIMIT = float(os.getenv('AI_VISION_RATE_LIMIT', 5))  # 每个进程每秒最多发起的识别请求数（令牌桶补充速率），0表示不限流
+    AI_VISION_RATE_BURST = int(os.getenv('AI_VISION_RATE_BURST', 10))  # 令牌桶容量，允许短时间内突发的识别请求数
+    REANALYZE_MAX_ITEMS = int(os.getenv('REANALYZE_MAX_ITEMS', 1000))  # 单次批量重新识别的最大衣物数量
+    
+    # AI穿搭推荐配置
+    OUTFIT_PROMPT_TOKEN_BUDGET = int(os.getenv('OUTFIT_PROMPT_TOKEN_BUDGET', 3000))  # 提示词中衣物列表的token预算，超出时按相关性截断
+    OUTFIT_RULE_TOP_K = int(os.getenv('OUTFIT_RULE_TOP_K', 5))  # 本地规则引擎交给大模型挑选的候选方案数量
+    OUTFIT_RULE_BEAM_WIDTH = int(os.getenv('OUTFIT_RULE_BEAM_WIDTH', 200))  # 逐个搭配位置扩展组合时保留的部分组合数量
+    OUTFIT_RULE_FALLBACK = os.getenv('OUTFIT_RULE_FALLBACK', 'true').lower() == 'true'  # 大模型调用失败时是否返回本地规则引擎的推荐
 class DevelopmentConfig(Config):
     """开发环境配置"""
     DEBUG = True
     # SQLite配置
     SQLALCHEMY_DATABASE_URI = 'sqlite:///dev.db'
     
+class TestingConfig(Config):
+    """测试环境配置"""
+    TESTING = True
+    # SQLite内存数据库
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    
 class ProductionConfig(Config):
     """生产环境配置"""
     DEBUG = False
@@ -58,5 +136,6 @@ class ProductionConfig(Config):
 config = {
     'development': DevelopmentConfig,
     'production': ProductionConfig,
+    'testing': TestingConfig,
     'default': DevelopmentConfig
 } 
\ No newline at end of file
@@ -0,0 +1,14 @@
+-- AI识别结果缓存：按图片内容哈希和提示词指纹去重，避免重复调用大模型
+-- 衣物的image_hash列由20261016_recognition_jobs.sql添加
+CREATE TABLE ai_recognition_cache (
+    id BIGINT PRIMARY KEY AUTO_INCREMENT COMMENT '缓存记录ID',
+    image_hash CHAR(64) NOT NULL COMMENT '图片内容SHA-256',
+    prompt_hash CHAR(64) NOT NULL COMMENT '模型和提示词指纹',
+    result TEXT NOT NULL COMMENT '识别结果（JSON）',
+    hit_count INT NOT NULL DEFAULT 0 COMMENT '命中次数',
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
+    last_hit_at DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT '最近命中时间',
+    UNIQUE (image_hash, prompt_hash),
+    INDEX (created_at),
+    INDEX (last_hit_at)
+) COMMENT='AI识别结果缓存表';
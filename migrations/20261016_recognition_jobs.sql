@@ -0,0 +1,24 @@
+-- AI识别后台任务队列：上传后先创建待识别的衣物记录和识别任务，由后台线程识别
+-- 需要在其他20261017_*迁移之前执行（20261017_composite_indexes.sql修改recognition_jobs的索引，
+-- 20261017_clothes_image_variants.sql在image_hash列之后添加列）
+-- 1. 衣物的图片内容哈希（用于AI识别结果缓存）和AI识别状态，已有衣物视为识别完成
+ALTER TABLE clothes ADD COLUMN image_hash CHAR(64) COMMENT '图片内容SHA-256' AFTER image_url;
+ALTER TABLE clothes ADD COLUMN recognition_status ENUM('pending', 'completed', 'failed') DEFAULT 'completed' COMMENT 'AI识别状态' AFTER image_hash;
+
+-- 2. 识别任务表
+CREATE TABLE recognition_jobs (
+    id BIGINT PRIMARY KEY AUTO_INCREMENT COMMENT '任务ID',
+    account_id VARCHAR(64) NOT NULL COMMENT '所属账号',
+    job_type VARCHAR(20) NOT NULL DEFAULT 'upload' COMMENT '任务类型',
+    status ENUM('pending', 'running', 'completed', 'failed') NOT NULL DEFAULT 'pending' COMMENT '任务状态',
+    clothes_items TEXT COMMENT '待识别的衣物ID列表（JSON数组）',
+    total_count INT NOT NULL DEFAULT 0 COMMENT '衣物总数',
+    processed_count INT NOT NULL DEFAULT 0 COMMENT '已处理数量',
+    success_count INT NOT NULL DEFAULT 0 COMMENT '识别成功数量',
+    failed_count INT NOT NULL DEFAULT 0 COMMENT '识别失败数量',
+    message VARCHAR(255) COMMENT '错误信息',
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    INDEX (account_id),
+    INDEX (status)
+) COMMENT='AI识别任务表';
@@ -0,0 +1,3 @@
+-- 衣物缩略图（响应式图片变体）：保存各尺寸WebP缩略图的URL
+-- 已有衣物保持NULL，第一次被列表或详情接口请求时由后台线程补生成缩略图
+ALTER TABLE clothes ADD COLUMN image_variants TEXT COMMENT '缩略图URL，JSON格式：{"128": url, "256": url}，NULL表示尚未生成' AFTER image_hash;
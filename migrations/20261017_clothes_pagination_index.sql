@@ -0,0 +1,2 @@
+-- 衣物列表按(created_at, id)游标分页
+ALTER TABLE clothes ADD INDEX idx_clothes_account_created (account_id, created_at, id);
@@ -0,0 +1,12 @@
+-- 衣物季节改为位掩码存储（spring=1, summer=2, autumn=4, winter=8）
+-- 1. 添加位掩码列
+ALTER TABLE clothes ADD COLUMN season_mask TINYINT UNSIGNED NOT NULL DEFAULT 0 COMMENT '适合季节位掩码：spring=1, summer=2, autumn=4, winter=8' AFTER color;
+
+-- 2. 回填：SET类型的数值即为按定义顺序排列的位掩码，与season_mask的取值一致
+UPDATE clothes SET season_mask = season + 0 WHERE season IS NOT NULL;
+
+-- 3. 按状态和季节筛选的复合索引
+ALTER TABLE clothes ADD INDEX idx_clothes_account_status_season (account_id, status, season_mask);
+
+-- 4. 核对回填结果后删除旧列
+-- ALTER TABLE clothes DROP COLUMN season;
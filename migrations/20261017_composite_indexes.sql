@@ -0,0 +1,36 @@
+-- 按账号查询的复合索引，与模型中__table_args__声明的索引一致
+-- 0. 登录时按用户名查询用户
+ALTER TABLE users ADD INDEX (username);
+
+-- 1. 衣物按分类筛选
+ALTER TABLE clothes ADD INDEX idx_clothes_account_category (account_id, category);
+
+-- 2. 按标签查询衣物
+ALTER TABLE clothes_tags ADD INDEX idx_clothes_tag_tag (account_id, tag_id);
+
+-- 3. 穿搭列表按创建时间倒序
+ALTER TABLE outfits ADD INDEX idx_outfit_account_created (account_id, created_at);
+
+-- 4. 按穿搭查询推荐记录
+ALTER TABLE recommendations ADD INDEX idx_recommendation_account_outfit (account_id, outfit_id);
+
+-- 5. 天气记录按日期（及日期范围）和位置查询
+ALTER TABLE weather_logs ADD INDEX idx_weather_account_date (account_id, date);
+ALTER TABLE weather_logs ADD INDEX idx_weather_account_location (account_id, location);
+
+-- 6. 每件衣物只保留一条AI识别信息（模型中已声明唯一约束）
+--    添加前先清理重复记录：
+--    DELETE a FROM clothes_ai_info a JOIN clothes_ai_info b
+--        ON a.account_id = b.account_id AND a.clothes_id = b.clothes_id AND a.id < b.id;
+ALTER TABLE clothes_ai_info ADD UNIQUE KEY uix_ai_info_account_clothes (account_id, clothes_id);
+
+-- 7. 后台线程按状态领取任务、回收超时任务，替换原来的单列status索引
+ALTER TABLE recognition_jobs ADD INDEX idx_recognition_job_status_updated (status, updated_at);
+ALTER TABLE recognition_jobs DROP INDEX status;
+
+-- 8. 删除被复合索引前缀覆盖的单列account_id索引（MySQL默认以列名命名，执行前可用SHOW INDEX确认）
+ALTER TABLE clothes DROP INDEX account_id;
+ALTER TABLE outfits DROP INDEX account_id;
+ALTER TABLE recommendations DROP INDEX account_id;
+ALTER TABLE weather_logs DROP INDEX account_id;
+ALTER TABLE clothes_ai_info DROP INDEX account_id;
@@ -0,0 +1,28 @@
+-- 穿搭衣物改为关联表存储（MySQL 8.0+）
+-- 1. 创建关联表
+CREATE TABLE IF NOT EXISTS outfit_items (
+    id BIGINT PRIMARY KEY AUTO_INCREMENT COMMENT '记录ID',
+    account_id VARCHAR(64) NOT NULL COMMENT '所属账号',
+    outfit_id BIGINT NOT NULL COMMENT '搭配ID',
+    clothes_id BIGINT NOT NULL COMMENT '衣物ID',
+    position INT NOT NULL DEFAULT 0 COMMENT '衣物在搭配中的顺序',
+    UNIQUE KEY uix_outfit_clothes (outfit_id, clothes_id),
+    INDEX idx_outfit_item_position (outfit_id, position),
+    INDEX idx_outfit_item_clothes (account_id, clothes_id)
+) COMMENT='穿搭与衣物的关联表';
+
+-- 2. 从outfits.clothes_items（JSON数组）回填，重复的衣物ID只保留第一次出现的位置
+INSERT IGNORE INTO outfit_items (account_id, outfit_id, clothes_id, position)
+SELECT o.account_id, o.id, j.clothes_id, j.position - 1
+FROM outfits o,
+     JSON_TABLE(o.clothes_items, '$[*]' COLUMNS (
+         position FOR ORDINALITY,
+         clothes_id BIGINT PATH '$'
+     )) AS j
+WHERE o.clothes_items IS NOT NULL
+  AND JSON_VALID(o.clothes_items)
+  AND j.clothes_id IS NOT NULL
+ORDER BY o.id, j.position;
+
+-- 3. 核对回填结果后删除旧列
+-- ALTER TABLE outfits DROP COLUMN clothes_items;
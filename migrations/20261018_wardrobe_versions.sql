@@ -0,0 +1,7 @@
+-- 衣橱版本号：每个账号的衣物写入后加1，使用进程内衣橱快照缓存（WARDROBE_CACHE_BACKEND=memory）的各个进程
+-- 读取快照前按主键比较版本号，其他进程的写入立即可见
+CREATE TABLE wardrobe_versions (
+    account_id VARCHAR(64) PRIMARY KEY COMMENT '账号ID',
+    version INT NOT NULL DEFAULT 0 COMMENT '版本号，衣物每次写入后加1',
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间'
+) COMMENT='衣橱版本号表';
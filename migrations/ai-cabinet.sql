@@ -7,7 +7,8 @@ CREATE TABLE users (
     password_hash VARCHAR(255) NOT NULL COMMENT '加密后的密码',
     gender ENUM('male', 'female', 'other') COMMENT '性别',
     birthdate DATE COMMENT '出生日期',
-    created_at DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间'
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
+    INDEX (username)
 ) COMMENT='用户信息表';
 
 -- 衣物表：使用 account_id 关联用户，无外键
@@ -17,12 +18,17 @@ CREATE TABLE clothes (
     name VARCHAR(100) COMMENT '衣物名称',
     category VARCHAR(50) COMMENT '分类，如上衣、裤子',
     color VARCHAR(30) COMMENT '主色调',
-    season SET('spring', 'summer', 'autumn', 'winter') COMMENT '适合季节',
+    season_mask TINYINT UNSIGNED NOT NULL DEFAULT 0 COMMENT '适合季节位掩码：spring=1, summer=2, autumn=4, winter=8',
     style VARCHAR(50) COMMENT '风格',
     status ENUM('available', 'dirty', 'laundry', 'lost', 'discarded') DEFAULT 'available' COMMENT '状态',
     image_url VARCHAR(255) COMMENT '衣物图片URL',
+    image_hash CHAR(64) COMMENT '图片内容SHA-256',
+    image_variants TEXT COMMENT '缩略图URL，JSON格式：{"128": url, "256": url}，NULL表示尚未生成',
+    recognition_status ENUM('pending', 'completed', 'failed') DEFAULT 'completed' COMMENT 'AI识别状态',
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
-    INDEX (account_id)
+    INDEX idx_clothes_account_created (account_id, created_at, id),
+    INDEX idx_clothes_account_status_season (account_id, status, season_mask),
+    INDEX idx_clothes_account_category (account_id, category)
 ) COMMENT='衣物信息表';
 
 -- 标签表：用于给衣物打标签
@@ -43,7 +49,8 @@ CREATE TABLE clothes_tags (
     tag_id BIGINT NOT NULL COMMENT '标签ID',
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
     UNIQUE (account_id, clothes_id, tag_id),
-    INDEX (account_id)
+    INDEX (account_id),
+    INDEX idx_clothes_tag_tag (account_id, tag_id)
 ) COMMENT='衣物与标签的关联表';
 
 
@@ -57,12 +64,23 @@ CREATE TABLE outfits (
 	style VARCHAR(50) COMMENT '风格', 
 	season VARCHAR(50) COMMENT '适合季节', 
 	occasion VARCHAR(50) COMMENT '适合场合', 
-	clothes_items TEXT COMMENT '包含的衣物ID列表（JSON数组）', 
 	image_url VARCHAR(255) COMMENT '搭配展示图', 
 	created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-    INDEX (account_id)
+    INDEX idx_outfit_account_created (account_id, created_at)
 ) COMMENT='穿搭记录表';
 
+-- 穿搭包含的衣物
+CREATE TABLE outfit_items (
+    id BIGINT PRIMARY KEY AUTO_INCREMENT COMMENT '记录ID',
+    account_id VARCHAR(64) NOT NULL COMMENT '所属账号',
+    outfit_id BIGINT NOT NULL COMMENT '搭配ID',
+    clothes_id BIGINT NOT NULL COMMENT '衣物ID',
+    position INT NOT NULL DEFAULT 0 COMMENT '衣物在搭配中的顺序',
+    UNIQUE KEY uix_outfit_clothes (outfit_id, clothes_id),
+    INDEX idx_outfit_item_position (outfit_id, position),
+    INDEX idx_outfit_item_clothes (account_id, clothes_id)
+) COMMENT='穿搭与衣物的关联表';
+
 -- 推荐记录
 CREATE TABLE recommendations (
     id BIGINT PRIMARY KEY AUTO_INCREMENT COMMENT '推荐记录ID',
@@ -72,7 +90,7 @@ CREATE TABLE recommendations (
     feedback ENUM('like', 'dislike', 'neutral') DEFAULT 'neutral' COMMENT '用户反馈',
     generated_by_ai BOOLEAN DEFAULT TRUE COMMENT '是否由AI生成',
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-    INDEX (account_id)
+    INDEX idx_recommendation_account_outfit (account_id, outfit_id)
 ) COMMENT='AI推荐记录表';
 
 -- 天气记录
@@ -86,7 +104,8 @@ CREATE TABLE weather_logs (
     humidity DECIMAL(5,2) COMMENT '湿度',
     wind_speed DECIMAL(5,2) COMMENT '风速',
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-    INDEX (account_id)
+    INDEX idx_weather_account_date (account_id, date),
+    INDEX idx_weather_account_location (account_id, location)
 ) COMMENT='天气记录表';
 
 -- AI识别数据表：记录每次识别的结果
@@ -99,9 +118,41 @@ CREATE TABLE clothes_ai_info (
     detected_texture VARCHAR(50) COMMENT '纹理/图案',
     ai_confidence DECIMAL(5,2) COMMENT '识别置信度',
     updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-    INDEX (account_id)
+    UNIQUE KEY uix_ai_info_account_clothes (account_id, clothes_id)
 ) COMMENT='衣物AI识别信息';
 
+-- AI识别结果缓存：按图片内容哈希和提示词指纹去重，避免重复调用大模型
+CREATE TABLE ai_recognition_cache (
+    id BIGINT PRIMARY KEY AUTO_INCREMENT COMMENT '缓存记录ID',
+    image_hash CHAR(64) NOT NULL COMMENT '图片内容SHA-256',
+    prompt_hash CHAR(64) NOT NULL COMMENT '模型和提示词指纹',
+    result TEXT NOT NULL COMMENT '识别结果（JSON）',
+    hit_count INT NOT NULL DEFAULT 0 COMMENT '命中次数',
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
+    last_hit_at DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT '最近命中时间',
+    UNIQUE (image_hash, prompt_hash),
+    INDEX (created_at),
+    INDEX (last_hit_at)
+) COMMENT='AI识别结果缓存表';
+
+-- AI识别任务：基于数据库的后台识别队列
+CREATE TABLE recognition_jobs (
+    id BIGINT PRIMARY KEY AUTO_INCREMENT COMMENT '任务ID',
+    account_id VARCHAR(64) NOT NULL COMMENT '所属账号',
+    job_type VARCHAR(20) NOT NULL DEFAULT 'upload' COMMENT '任务类型',
+    status ENUM('pending', 'running', 'completed', 'failed') NOT NULL DEFAULT 'pending' COMMENT '任务状态',
+    clothes_items TEXT COMMENT '待识别的衣物ID列表（JSON数组）',
+    total_count INT NOT NULL DEFAULT 0 COMMENT '衣物总数',
+    processed_count INT NOT NULL DEFAULT 0 COMMENT '已处理数量',
+    success_count INT NOT NULL DEFAULT 0 COMMENT '识别成功数量',
+    failed_count INT NOT NULL DEFAULT 0 COMMENT '识别失败数量',
+    message VARCHAR(255) COMMENT '错误信息',
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    INDEX (account_id),
+    INDEX idx_recognition_job_status_updated (status, updated_at)
+) COMMENT='AI识别任务表';
+
 -- 衣柜共享（家庭/好友共享）
 CREATE TABLE shared_wardrobes (
     id BIGINT PRIMARY KEY AUTO_INCREMENT COMMENT '共享记录ID',
@@ -114,6 +165,13 @@ CREATE TABLE shared_wardrobes (
     INDEX (shared_with_account_id)
 ) COMMENT='衣柜共享关系表';
 
+-- 衣橱版本号表：衣物每次写入后加1，多个进程据此判断进程内的衣橱快照是否过期
+CREATE TABLE wardrobe_versions (
+    account_id VARCHAR(64) PRIMARY KEY COMMENT '账号ID',
+    version INT NOT NULL DEFAULT 0 COMMENT '版本号，衣物每次写入后加1',
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间'
+) COMMENT='衣橱版本号表';
+
 -- 用户身材表：与用户表通过account_id关联
 CREATE TABLE user_body_info (
     id BIGINT PRIMARY KEY AUTO_INCREMENT COMMENT '身材信息ID',
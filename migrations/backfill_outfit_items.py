@@ -0,0 +1,56 @@
+"""
+将outfits.clothes_items（JSON数组）回填到outfit_items关联表
+适用于任何数据库（开发环境的SQLite等），MySQL也可以直接执行20261017_outfit_items.sql
+用法：python migrations/backfill_outfit_items.py
+"""
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+from sqlalchemy import inspect, text
+from app import create_app, db
+from app.models.outfit_item import OutfitItem
+
+
+def backfill():
+    """
+    回填关联表，已有关联记录的穿搭会被跳过
+    :return: 回填的穿搭数量
+    """
+    columns = [column['name'] for column in inspect(db.engine).get_columns('outfits')]
+    if 'clothes_items' not in columns:
+        print("outfits表中没有clothes_items列，无需回填")
+        return 0
+
+    OutfitItem.__table__.create(db.engine, checkfirst=True)
+    migrated = {row[0] for row in db.session.query(OutfitItem.outfit_id).distinct()}
+
+    count = 0
+    rows = db.session.execute(text("SELECT id, account_id, clothes_items FROM outfits")).fetchall()
+    for outfit_id, account_id, clothes_items in rows:
+        if outfit_id in migrated or not clothes_items:
+            continue
+        try:
+            clothes_ids = [int(clothes_id) for clothes_id in json.loads(clothes_items)]
+        except (ValueError, TypeError):
+            print(f"穿搭{outfit_id}的衣物列表格式错误，已跳过")
+            continue
+        if not clothes_ids:
+            continue
+
+        for position, clothes_id in enumerate(dict.fromkeys(clothes_ids)):
+            db.session.add(OutfitItem(account_id, clothes_id, position=position, outfit_id=outfit_id))
+        count += 1
+
+    db.session.commit()
+    return count
+
+
+if __name__ == '__main__':
+    load_dotenv()
+    app = create_app(os.getenv('FLASK_ENV', 'development'))
+    with app.app_context():
+        print(f"已回填{backfill()}个穿搭")
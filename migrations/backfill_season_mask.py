@@ -0,0 +1,55 @@
+"""
+为clothes表添加season_mask列，并从旧的season列（逗号分隔的字符串）回填
+适用于任何数据库（开发环境的SQLite等），MySQL也可以直接执行20261017_clothes_season_mask.sql
+用法：python migrations/backfill_season_mask.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+from sqlalchemy import inspect, text
+from app import create_app, db
+from app.models.clothes import Clothes
+
+
+def backfill():
+    """
+    添加列和索引并回填，只处理season_mask为0的记录，可重复执行
+    :return: 回填的衣物数量
+    """
+    columns = [column['name'] for column in inspect(db.engine).get_columns('clothes')]
+    if 'season_mask' not in columns:
+        db.session.execute(text("ALTER TABLE clothes ADD COLUMN season_mask INTEGER NOT NULL DEFAULT 0"))
+        db.session.commit()
+
+    indexes = [index['name'] for index in inspect(db.engine).get_indexes('clothes')]
+    for index in Clothes.__table__.indexes:
+        if index.name not in indexes:
+            index.create(db.engine)
+
+    if 'season' not in columns:
+        print("clothes表中没有season列，无需回填")
+        return 0
+
+    count = 0
+    rows = db.session.execute(text(
+        "SELECT id, season FROM clothes WHERE season_mask = 0 AND season IS NOT NULL AND season != ''"
+    )).fetchall()
+    for clothes_id, season in rows:
+        mask = Clothes.season_to_mask(season.split(','))
+        if mask:
+            db.session.execute(text("UPDATE clothes SET season_mask = :mask WHERE id = :id"),
+                               {"mask": mask, "id": clothes_id})
+            count += 1
+
+    db.session.commit()
+    return count
+
+
+if __name__ == '__main__':
+    load_dotenv()
+    app = create_app(os.getenv('FLASK_ENV', 'development'))
+    with app.app_context():
+        print(f"已回填{backfill()}件衣物")
@@ -0,0 +1,79 @@
+"""
+pytest公共夹具
+使用SQLite内存数据库创建应用，并写入一组覆盖各张表的测试数据
+"""
+from datetime import date, datetime, timedelta
+import pytest
+from app import create_app, db
+from app.services.wardrobe_cache import wardrobe_cache
+from app.models import (
+    Clothes, Tag, ClothesTag, ClothesAiInfo, Outfit, WeatherLog,
+    Recommendation, RecognitionJob, SharedWardrobe, UserBodyInfo, User
+)
+
+ACCOUNT_ID = 'test-account'
+OTHER_ACCOUNT_ID = 'other-account'
+
+
+@pytest.fixture(scope='module')
+def app():
+    """创建测试应用并建表"""
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture(scope='module')
+def seed(app):
+    """
+    写入测试数据（两个账号，每个账号若干衣物、标签、穿搭、天气等记录）
+    :return: 当前测试账号下各类记录的ID
+    """
+    ids = {}
+    for account_id in (OTHER_ACCOUNT_ID, ACCOUNT_ID):
+        now = datetime.utcnow()
+        clothes_list = []
+        for i, (category, season) in enumerate([('上衣', 'spring,autumn'), ('下装', 'summer'),
+                                                ('外套', 'winter'), ('鞋子', 'spring,summer')]):
+            clothes = Clothes(account_id, name=f'衣物{i}', category=category, color='黑色',
+                              season=season, style='休闲')
+            clothes.created_at = now - timedelta(minutes=i)
+            clothes_list.append(clothes)
+        db.session.add_all(clothes_list)
+        db.session.flush()
+
+        tag = Tag(account_id, '通勤')
+        db.session.add(tag)
+        db.session.flush()
+        db.session.add(ClothesTag(account_id, clothes_list[0].id, tag.id))
+        db.session.add(ClothesAiInfo(account_id, clothes_list[0].id, detected_category='上衣'))
+
+        outfit = Outfit(account_id, name='通勤穿搭', clothes_items=[c.id for c in clothes_list[:2]],
+                        style='休闲', season='spring', occasion='上班')
+        db.session.add(outfit)
+        db.session.flush()
+
+        db.session.add(WeatherLog(account_id, date.today(), location='北京', temperature=20))
+        db.session.add(Recommendation(account_id, date.today(), outfit_id=outfit.id))
+        job = RecognitionJob(account_id, [c.id for c in clothes_list])
+        db.session.add(job)
+        db.session.add(SharedWardrobe(account_id, OTHER_ACCOUNT_ID if account_id == ACCOUNT_ID else ACCOUNT_ID))
+        db.session.add(UserBodyInfo(account_id, height=170))
+        db.session.add(User(username=account_id, password='password123'))
+        db.session.flush()
+
+        ids = {
+            'clothes_id': clothes_list[0].id,
+            'tag_id': tag.id,
+            'outfit_id': outfit.id,
+            'job_id': job.id,
+        }
+    db.session.commit()
+    
+    # 每个模块使用新的数据库，清除之前模块留下的衣橱快照
+    for account_id in (OTHER_ACCOUNT_ID, ACCOUNT_ID):
+        wardrobe_cache.invalidate(account_id)
+    return ids
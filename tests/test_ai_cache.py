@@ -0,0 +1,105 @@
+"""
+AI识别缓存测试
+命中记录在进程内累积后批量写入，容量淘汰按写入次数定期执行且每次删除的记录数有上限；
+读写缓存不提交也不回滚调用方会话中的修改
+"""
+import pytest
+from flask_jwt_extended import create_access_token
+from app import db
+from app.models import Clothes
+from app.models.ai_recognition_cache import AiRecognitionCache
+from app.services import ai_cache_service
+from app.services.ai_cache_service import AICacheService
+from config import Config
+from tests.conftest import ACCOUNT_ID, OTHER_ACCOUNT_ID
+from tests.test_query_plans import capture_queries
+
+
+@pytest.fixture
+def cache(app, monkeypatch):
+    """清空缓存表和进程内的累积状态"""
+    monkeypatch.setattr(Config, 'AI_CACHE_ENABLED', True)
+    monkeypatch.setattr(ai_cache_service, '_pending_hits', {})
+    monkeypatch.setattr(ai_cache_service, '_puts_since_evict', 0)
+    AiRecognitionCache.query.delete()
+    db.session.commit()
+    yield
+    AiRecognitionCache.query.delete()
+    db.session.commit()
+
+
+def hit_counts():
+    """从数据库读取各缓存记录的命中次数"""
+    return dict(db.session.query(AiRecognitionCache.image_hash, AiRecognitionCache.hit_count).all())
+
+
+def test_hits_are_flushed_in_batches(cache, monkeypatch):
+    """命中时不提交事务，累积到指定数量的缓存记录后一次写入"""
+    monkeypatch.setattr(Config, 'AI_CACHE_HIT_FLUSH_SIZE', 2)
+    AICacheService.put('a', 'p', {"category": "上衣"})
+    AICacheService.put('b', 'p', {"category": "下装"})
+
+    with capture_queries() as queries:
+        assert AICacheService.get('a', 'p') == {"category": "上衣"}
+        assert AICacheService.get('a', 'p') == {"category": "上衣"}
+    assert all(statement.lstrip().upper().startswith('SELECT') for statement, _ in queries)
+    assert hit_counts() == {'a': 0, 'b': 0}
+
+    AICacheService.get('b', 'p')
+    assert hit_counts() == {'a': 2, 'b': 1}
+
+
+def test_eviction_is_periodic_and_bounded(cache, monkeypatch):
+    """每写入指定条数才执行一次淘汰，每次最多删除指定条数"""
+    monkeypatch.setattr(Config, 'AI_CACHE_MAX_ENTRIES', 1)
+    monkeypatch.setattr(Config, 'AI_CACHE_EVICT_INTERVAL', 5)
+    monkeypatch.setattr(Config, 'AI_CACHE_EVICT_BATCH', 2)
+
+    for i in range(4):
+        AICacheService.put(f'image-{i}', 'p', {"index": i})
+    assert AiRecognitionCache.query.count() == 4
+
+    # 最早写入的image-0刚被命中，不会被淘汰
+    AICacheService.get('image-0', 'p')
+    AICacheService.put('image-4', 'p', {"index": 4})
+    remaining = sorted(entry.image_hash for entry in AiRecognitionCache.query.all())
+    assert len(remaining) == 3 and 'image-0' in remaining
+
+    assert AICacheService.evict() == 2
+    assert AiRecognitionCache.query.count() == 1
+
+
+def test_cache_does_not_touch_caller_session(cache):
+    """读写缓存（包括重复写入失败）不会提交调用方尚未提交的修改，也不会回滚丢弃它们"""
+    clothes = Clothes(ACCOUNT_ID, name='缓存期间未提交')
+    db.session.add(clothes)
+
+    AICacheService.put('a', 'p', {"category": "上衣"})
+    AICacheService.put('a', 'p', {"category": "上衣"})
+    assert AICacheService.get('a', 'p') == {"category": "上衣"}
+    assert AICacheService.get('missing', 'p') is None
+    assert clothes in db.session
+
+    db.session.rollback()
+    assert Clothes.query.filter_by(name='缓存期间未提交').count() == 0
+    assert AiRecognitionCache.query.count() == 1
+
+
+def test_stats_only_for_configured_accounts(app, cache, monkeypatch):
+    """缓存统计只允许配置的管理员账号查询，未配置时所有账号都无权访问"""
+    monkeypatch.setitem(app.config, 'JWT_SECRET_KEY', 'test-secret-key-for-ai-cache-stats')
+    client = app.test_client()
+
+    def get_stats(account_id):
+        with app.app_context():
+            token = create_access_token(identity=account_id)
+        return client.get('/ai-cabinet/api/clothes/ai-cache/stats', headers={"Authorization": f"Bearer {token}"})
+
+    assert get_stats(ACCOUNT_ID).status_code == 403
+
+    monkeypatch.setattr(Config, 'AI_CACHE_STATS_ACCOUNTS', [ACCOUNT_ID])
+    assert get_stats(OTHER_ACCOUNT_ID).status_code == 403
+    response = get_stats(ACCOUNT_ID)
+    result = response.get_json()['result']
+    assert response.status_code == 200 and result['entries'] == 0
+    assert result['counter_scope'] == 'process' and result['process_id'] > 0
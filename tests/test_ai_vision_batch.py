@@ -0,0 +1,101 @@
+"""
+批量图片识别测试
+多图请求返回的每项按图片序号对应到图片；结果数量不符、序号无效或字段不完整时回退为单张识别
+"""
+import json
+import pytest
+from app.services import ai_vision_service
+from app.services.ai_vision_service import AIVisionService
+from config import Config
+
+URLS = [f'https://oss/batch/{i}.jpg' for i in range(1, 4)]
+
+
+def clothing(color, index=None):
+    """生成一项识别结果"""
+    item = {"category": "上衣", "color": color, "season": "summer", "style": "休闲", "confidence": 90}
+    if index is not None:
+        item["index"] = index
+    return item
+
+
+class FakeClient:
+    """桩大模型客户端：多图请求返回预设的文本，单图请求按图片URL返回识别结果"""
+
+    name = 'fake'
+
+    def __init__(self, batch_reply):
+        self.batch_reply = batch_reply
+        self.single_urls = []
+
+    def chat(self, messages, **params):
+        images = [part["image_url"]["url"] for part in messages[-1]["content"] if part.get("type") == "image_url"]
+        if len(images) > 1:
+            return self.batch_reply
+        self.single_urls.append(images[0])
+        return json.dumps(clothing(f"单张{images[0][-5]}"), ensure_ascii=False)
+
+
+@pytest.fixture
+def vision(monkeypatch):
+    """
+    使用桩客户端的识别服务，关闭识别缓存和限流
+    :return: 设置批量返回文本并返回(服务, 客户端)的函数
+    """
+    monkeypatch.setattr(Config, 'AI_CACHE_ENABLED', False)
+    monkeypatch.setattr(Config, 'AI_VISION_BATCH_SIZE', len(URLS))
+    monkeypatch.setattr(ai_vision_service.vision_rate_limiter, 'acquire', lambda *args, **kwargs: None)
+
+    def _create(batch_reply):
+        client = FakeClient(batch_reply)
+        monkeypatch.setattr(ai_vision_service, 'get_llm_provider', lambda **kwargs: client)
+        return AIVisionService(), client
+
+    return _create
+
+
+def colors(results):
+    """识别结果的颜色列表"""
+    return [result["data"]["color"] for result in results]
+
+
+def test_batch_items_mapped_by_index(vision):
+    """乱序返回的结果按图片序号对应，index字段不写入识别结果，不调用单张识别"""
+    reply = json.dumps({"items": [clothing("白色", 3), clothing("黑色", 1), clothing("红色", 2)]}, ensure_ascii=False)
+    service, client = vision(reply)
+
+    results = service.analyze_clothing_images(URLS)
+    assert colors(results) == ["黑色", "红色", "白色"]
+    assert all("index" not in result["data"] for result in results)
+    assert client.single_urls == []
+    assert "index字段" in service._build_batch_prompt(len(URLS))
+
+
+@pytest.mark.parametrize('items', [
+    [clothing("黑色", 1), clothing("红色", 2)],
+    [clothing("黑色", 1), clothing("红色", 2), clothing("白色", 3), clothing("蓝色", 4)],
+    [clothing("黑色"), clothing("红色"), clothing("白色")],
+    [clothing("黑色", 1), clothing("红色", 1), clothing("白色", 3)],
+    [clothing("黑色", 1), clothing("红色", 2), clothing("白色", 4)],
+    [clothing("黑色", 1), clothing("红色", 2), clothing("白色", "3")],
+])
+def test_mismatched_batch_falls_back_to_single(vision, items):
+    """结果数量不符、缺少序号、序号重复或越界时整组回退为单张识别"""
+    service, client = vision(json.dumps({"items": items}, ensure_ascii=False))
+
+    results = service.analyze_clothing_images(URLS)
+    assert client.single_urls == URLS
+    assert colors(results) == ["单张1", "单张2", "单张3"]
+
+
+def test_incomplete_item_and_invalid_json_fall_back(vision):
+    """字段不完整的单项回退为单张识别，无法解析的返回整组回退"""
+    incomplete = clothing("红色", 2)
+    del incomplete["style"]
+    service, client = vision(json.dumps({"items": [clothing("黑色", 1), incomplete, clothing("白色", 3)]},
+                                        ensure_ascii=False))
+    assert colors(service.analyze_clothing_images(URLS)) == ["黑色", "单张2", "白色"]
+    assert client.single_urls == [URLS[1]]
+
+    service, client = vision('不是JSON')
+    assert colors(service.analyze_clothing_images(URLS)) == ["单张1", "单张2", "单张3"]
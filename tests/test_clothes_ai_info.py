@@ -0,0 +1,96 @@
+"""
+AI识别信息批量读写测试
+衣物列表附带AI识别信息时每页只多一次IN查询，批量写入时新增和更新在同一条语句中完成
+"""
+from sqlalchemy import event
+from app import db
+from app.models import ClothesAiInfo
+from app.services.clothes_service import ClothesService
+from tests.conftest import ACCOUNT_ID, OTHER_ACCOUNT_ID
+from tests.test_clothes_tags import create_clothes
+from tests.test_query_plans import capture_queries
+
+
+def count_inserts(func):
+    """执行函数并返回执行的INSERT语句数量"""
+    statements = []
+
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('INSERT'):
+            statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', _before_cursor_execute)
+    try:
+        func()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', _before_cursor_execute)
+    return len(statements)
+
+
+def test_bulk_upsert_inserts_and_updates_in_one_statement(seed):
+    """已有记录被更新、缺少的记录被创建，只执行一条INSERT"""
+    clothes_ids = create_clothes(3)
+    ClothesAiInfo.bulk_upsert(ACCOUNT_ID, [{'clothes_id': clothes_ids[0], 'detected_category': '旧分类'}])
+    db.session.commit()
+    ai_info = ClothesAiInfo.get_by_clothes_id(ACCOUNT_ID, clothes_ids[0])
+
+    rows = [{'clothes_id': clothes_id, 'detected_category': '上衣', 'detected_color': '白色', 'ai_confidence': 0.9}
+            for clothes_id in clothes_ids]
+    assert count_inserts(lambda: ClothesAiInfo.bulk_upsert(ACCOUNT_ID, rows)) == 1
+    db.session.commit()
+
+    # 会话中已加载的对象读取到新的值
+    assert ai_info.detected_category == '上衣'
+    ai_info_map = ClothesAiInfo.get_ai_info_map(ACCOUNT_ID, clothes_ids)
+    assert [ai_info_map[clothes_id].detected_color for clothes_id in clothes_ids] == ['白色'] * 3
+    assert ClothesAiInfo.query.filter(ClothesAiInfo.clothes_id.in_(clothes_ids)).count() == 3
+
+
+def test_bulk_upsert_keeps_existing_optional_fields(seed):
+    """识别结果缺少纹理和置信度时保留已有的值，分类和颜色照常覆盖"""
+    clothes_id, = create_clothes(1)
+    ClothesAiInfo.bulk_upsert(ACCOUNT_ID, [{'clothes_id': clothes_id, 'detected_category': '上衣',
+                                            'detected_texture': '条纹', 'ai_confidence': 0.8}])
+    db.session.commit()
+
+    ClothesAiInfo.bulk_upsert(ACCOUNT_ID, [{'clothes_id': clothes_id, 'detected_category': '外套',
+                                            'detected_color': '黑色'}])
+    db.session.commit()
+
+    ai_info = ClothesAiInfo.get_by_clothes_id(ACCOUNT_ID, clothes_id)
+    assert (ai_info.detected_category, ai_info.detected_color) == ('外套', '黑色')
+    assert ai_info.detected_texture == '条纹' and float(ai_info.ai_confidence) == 0.8
+
+    ClothesAiInfo.bulk_upsert(ACCOUNT_ID, [{'clothes_id': clothes_id, 'detected_texture': '纯色'}])
+    db.session.commit()
+    assert ClothesAiInfo.get_by_clothes_id(ACCOUNT_ID, clothes_id).detected_texture == '纯色'
+
+
+def test_get_ai_info_map_is_scoped_to_account(seed):
+    """其他账号的AI识别信息不会被读取"""
+    assert ClothesAiInfo.get_ai_info_map(OTHER_ACCOUNT_ID, [seed['clothes_id']]) == {seed['clothes_id']: None}
+    assert ClothesAiInfo.get_ai_info_map(ACCOUNT_ID, [seed['clothes_id']])[seed['clothes_id']] is not None
+
+
+def test_list_include_ai_info_query_count_is_constant(seed):
+    """衣物列表附带AI识别信息时，每页只多一次IN查询"""
+    create_clothes(10)
+    service = ClothesService()
+    with capture_queries() as plain:
+        service.get_clothes_list(ACCOUNT_ID, page_size=10)
+    with capture_queries() as small:
+        service.get_clothes_list(ACCOUNT_ID, page_size=2, include=['ai_info'])
+    with capture_queries() as large:
+        result = service.get_clothes_list(ACCOUNT_ID, page_size=10, include=['ai_info', 'tags'])
+
+    assert len(small) == len(plain) + 1
+    assert len(large) == len(plain) + 2
+    assert all('ai_info' in item and 'tags' in item for item in result['items'])
+
+
+def test_detail_include_ai_info(seed):
+    """衣物详情附带AI识别信息和标签"""
+    item = ClothesService().get_clothes_detail(ACCOUNT_ID, seed['clothes_id'], include=['ai_info', 'tags'])
+    assert item['ai_info']['detected_category'] == '上衣'
+    assert [tag['name'] for tag in item['tags']] == ['通勤']
+    assert ClothesService().get_clothes_detail(OTHER_ACCOUNT_ID, seed['clothes_id']) is None
@@ -0,0 +1,88 @@
+"""
+批量标签测试
+批量设置标签和衣物列表附带标签时，执行的SQL数量不随衣物数量增长
+"""
+from app import db
+from app.models import Clothes, ClothesTag
+from app.services.clothes_service import ClothesService
+from app.services.wardrobe_cache import wardrobe_cache
+from tests.conftest import ACCOUNT_ID
+from tests.test_query_plans import capture_queries
+
+
+def create_clothes(count):
+    """
+    创建一批衣物（直接写入数据库，需要同时使衣橱快照失效）
+    :return: 衣物ID列表
+    """
+    clothes_list = [Clothes(ACCOUNT_ID, name=f'批量衣物{i}', category='上衣') for i in range(count)]
+    db.session.add_all(clothes_list)
+    db.session.commit()
+    wardrobe_cache.invalidate(ACCOUNT_ID)
+    return [clothes.id for clothes in clothes_list]
+
+
+def count_set_tags(clothes_ids, names):
+    """批量设置标签并返回执行的SQL数量"""
+    with capture_queries() as statements:
+        result = ClothesService().set_clothes_tags(ACCOUNT_ID, {clothes_id: names for clothes_id in clothes_ids})
+    assert result['success'], result
+    return len(statements)
+
+
+def test_set_tags_query_count_is_constant(seed):
+    """设置5件和50件衣物的标签执行相同数量的查询"""
+    small, large = create_clothes(5), create_clothes(50)
+    ClothesService().set_clothes_tags(ACCOUNT_ID, {clothes_id: ['预热'] for clothes_id in small + large})
+
+    assert count_set_tags(small, ['通勤', '新标签A']) == count_set_tags(large, ['通勤', '新标签B'])
+
+    tags_map = ClothesTag.get_tags_map(ACCOUNT_ID, small + large)
+    assert [tag.name for tag in tags_map[small[0]]] == ['新标签A', '通勤']
+    assert [tag.name for tag in tags_map[large[-1]]] == ['新标签B', '通勤']
+
+
+def test_set_tags_clears_and_rejects_foreign_clothes(seed):
+    """空列表清空标签；包含其他账号的衣物时整体失败"""
+    clothes_ids = create_clothes(2)
+    service = ClothesService()
+    service.set_clothes_tags(ACCOUNT_ID, {clothes_ids[0]: ['通勤'], clothes_ids[1]: ['通勤']})
+
+    result = service.set_clothes_tags(ACCOUNT_ID, {clothes_ids[0]: []})
+    assert result['result'] == [{'clothes_id': clothes_ids[0], 'tags': []}]
+    assert len(ClothesTag.get_tags_map(ACCOUNT_ID, clothes_ids)[clothes_ids[1]]) == 1
+
+    result = service.set_clothes_tags(ACCOUNT_ID, {clothes_ids[0]: ['通勤'], 10 ** 6: ['通勤']})
+    assert not result['success']
+    assert ClothesTag.get_tags_map(ACCOUNT_ID, clothes_ids)[clothes_ids[0]] == []
+
+
+def test_set_tags_validates_against_database_not_snapshot(seed):
+    """其他进程写入后本进程的快照尚未失效时，校验仍以数据库为准"""
+    clothes_ids = create_clothes(1)
+    wardrobe_cache.get_snapshot(ACCOUNT_ID)
+
+    # 模拟其他进程新增和删除衣物：直接写数据库，不使快照失效
+    added = Clothes(ACCOUNT_ID, name='其他进程上传')
+    db.session.add(added)
+    db.session.delete(Clothes.get_by_id(ACCOUNT_ID, clothes_ids[0]))
+    db.session.commit()
+
+    service = ClothesService()
+    assert service.set_clothes_tags(ACCOUNT_ID, {added.id: ['通勤']})['success']
+    assert not service.set_clothes_tags(ACCOUNT_ID, {clothes_ids[0]: ['通勤']})['success']
+    wardrobe_cache.invalidate(ACCOUNT_ID)
+
+
+def test_list_include_tags_query_count_is_constant(seed):
+    """衣物列表附带标签时，每页只多一次联表查询"""
+    service = ClothesService()
+    with capture_queries() as plain:
+        service.get_clothes_list(ACCOUNT_ID, page_size=50)
+    with capture_queries() as small:
+        service.get_clothes_list(ACCOUNT_ID, page_size=5, include=['tags'])
+    with capture_queries() as large:
+        result = service.get_clothes_list(ACCOUNT_ID, page_size=50, include=['tags'])
+
+    assert len(small) == len(large) == len(plain) + 1
+    assert all('tags' in item for item in result['items'])
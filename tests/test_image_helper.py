@@ -0,0 +1,115 @@
+"""
+上传图片处理测试
+图片按EXIF方向旋转、去除元数据、限制尺寸并生成缩略图；无法解码的文件返回None由调用方上传原图
+"""
+import io
+import pytest
+from werkzeug.datastructures import FileStorage
+from app.services.clothes_service import ClothesService
+from app.utils import image_helper
+from app.utils.oss_helper import OSSHelper
+from config import Config
+
+PIL = pytest.importorskip('PIL')
+from PIL import Image  # noqa: E402
+
+# EXIF方向标签：6表示需要顺时针旋转90度显示
+ORIENTATION_TAG = 0x0112
+GPS_TAG = 0x8825
+
+
+def make_jpeg(width, height, orientation=None):
+    """生成带EXIF信息的JPEG图片"""
+    image = Image.new('RGB', (width, height), (200, 30, 30))
+    exif = Image.Exif()
+    if orientation:
+        exif[ORIENTATION_TAG] = orientation
+    exif[0x010F] = 'PhoneMaker'
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', exif=exif.tobytes())
+    buffer.seek(0)
+    return buffer
+
+
+def test_orients_resizes_and_strips_metadata():
+    """按EXIF方向旋转、限制最长边、去除EXIF并生成WebP缩略图"""
+    stream = make_jpeg(3000, 2000, orientation=6)
+    processed = image_helper.process_image(stream, max_dimension=1200, image_format='JPEG',
+                                           thumbnail_sizes=[128, 256])
+
+    assert (processed.width, processed.height) == (800, 1200)
+    assert processed.extension == 'jpg' and processed.content_type == 'image/jpeg'
+    output = Image.open(io.BytesIO(processed.data))
+    assert output.size == (800, 1200)
+    assert not output.getexif()
+
+    assert sorted(processed.thumbnails) == [128, 256]
+    thumbnail = Image.open(io.BytesIO(processed.thumbnails[128]))
+    assert thumbnail.format == 'WEBP'
+    assert max(thumbnail.size) == 128
+    assert stream.tell() == 0
+
+
+def test_transparent_png_is_flattened():
+    """透明背景填充为白色"""
+    buffer = io.BytesIO()
+    Image.new('RGBA', (100, 50), (0, 0, 0, 0)).save(buffer, format='PNG')
+    processed = image_helper.process_image(buffer, image_format='WEBP', thumbnail_sizes=[])
+
+    output = Image.open(io.BytesIO(processed.data))
+    assert output.format == 'WEBP'
+    assert output.convert('RGB').getpixel((10, 10)) == (255, 255, 255)
+
+
+def test_invalid_or_disabled_returns_none(monkeypatch):
+    """无法解码或关闭处理时返回None"""
+    assert image_helper.process_image(io.BytesIO(b'not an image')) is None
+
+    monkeypatch.setattr(Config, 'IMAGE_PROCESSING_ENABLED', False)
+    assert image_helper.process_image(make_jpeg(10, 10)) is None
+
+
+@pytest.mark.skipif(not image_helper.HEIF_AVAILABLE, reason='未安装pillow-heif')
+def test_heic_is_decoded():
+    """HEIC照片被解码并转换为JPEG"""
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 48), (0, 128, 0)).save(buffer, format='HEIF')
+    processed = image_helper.process_image(buffer, image_format='JPEG', thumbnail_sizes=[])
+    assert Image.open(io.BytesIO(processed.data)).size == (64, 48)
+
+
+class RecordingOSSHelper(OSSHelper):
+    """把上传的对象保存在内存中的OSS辅助类"""
+
+    def __init__(self):
+        self.objects = {}
+        self.deleted = []
+
+    def put_stream(self, object_key, stream, content_type=None):
+        self.objects[object_key] = (stream.read(), content_type)
+        return True
+
+    def get_public_url(self, object_key):
+        return f"https://oss/{object_key}"
+
+    def delete_object(self, object_key):
+        self.deleted.append(object_key)
+        return True
+
+
+def test_upload_stores_normalized_image_and_thumbnails(app, monkeypatch):
+    """上传时保存规范化的JPEG和派生键名下的缩略图，删除时一并删除"""
+    monkeypatch.setattr(Config, 'IMAGE_THUMBNAIL_SIZES', [256])
+    service = ClothesService()
+    service.oss_helper = RecordingOSSHelper()
+
+    item = service._upload_file('acc', FileStorage(stream=make_jpeg(2400, 1800), filename='photo.heic'))
+
+    object_key = item['object_key']
+    assert object_key.startswith('clothes/acc/') and object_key.endswith('.jpg')
+    assert item['derived_keys'] == [object_key[:-len('.jpg')] + '_w256.webp']
+    assert service.oss_helper.objects[object_key][1] == 'image/jpeg'
+    assert max(Image.open(io.BytesIO(service.oss_helper.objects[object_key][0])).size) == Config.IMAGE_MAX_DIMENSION
+
+    service._delete_uploaded(item)
+    assert service.oss_helper.deleted == [object_key] + item['derived_keys']
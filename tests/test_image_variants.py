@@ -0,0 +1,163 @@
+"""
+衣物缩略图（响应式图片变体）测试
+新上传的图片在上传时生成各尺寸缩略图；旧图片在第一次被列表或详情请求时提交到后台补生成，
+本次请求返回原图URL，生成完成后直接返回缩略图URL
+"""
+import io
+import pytest
+from werkzeug.datastructures import FileStorage
+from app import db
+from app.models import Clothes
+from app.services.clothes_service import ClothesService
+from app.services.image_variant_queue import image_variant_queue
+from config import Config
+from tests.conftest import ACCOUNT_ID
+from tests.test_image_helper import RecordingOSSHelper, make_jpeg
+
+pytest.importorskip('PIL')
+from PIL import Image  # noqa: E402
+
+SIZES = [128, 256, 512]
+
+
+class StoredOSSHelper(RecordingOSSHelper):
+    """可以下载已保存对象的内存OSS辅助类"""
+
+    def __init__(self):
+        super().__init__()
+        self.downloads = []
+
+    def get_object(self, object_key):
+        self.downloads.append(object_key)
+        return self.objects[object_key][0] if object_key in self.objects else None
+
+    def get_object_key(self, url):
+        return url[len("https://oss/"):] if url.startswith("https://oss/") else None
+
+
+@pytest.fixture
+def service(app, monkeypatch):
+    """使用内存OSS、由后台线程补生成缩略图的衣物服务"""
+    monkeypatch.setattr(Config, 'IMAGE_THUMBNAIL_SIZES', SIZES)
+    monkeypatch.setattr(Config, 'IMAGE_THUMBNAIL_SIZE', 256)
+    monkeypatch.setattr(Config, 'IMAGE_VARIANT_WORKERS', 1)
+    service = ClothesService()
+    service.oss_helper = StoredOSSHelper()
+    monkeypatch.setattr(image_variant_queue, '_service', service)
+    yield service
+    image_variant_queue.wait(timeout=10)
+
+
+def wait_for_variants():
+    """等待后台补生成完成，并丢弃会话中已加载的旧对象"""
+    assert image_variant_queue.wait(timeout=10)
+    db.session.expire_all()
+
+
+def add_clothes(image_url, image_variants=None):
+    """创建一件衣物"""
+    clothes = Clothes(ACCOUNT_ID, name='旧衣物', image_url=image_url, image_variants=image_variants)
+    db.session.add(clothes)
+    db.session.commit()
+    return clothes.id
+
+
+def test_thumbnail_url_picks_smallest_variant_not_below_configured_size(app, monkeypatch):
+    """thumbnail_url取不小于配置尺寸的最小缩略图，没有缩略图时返回原图"""
+    monkeypatch.setattr(Config, 'IMAGE_THUMBNAIL_SIZE', 200)
+    clothes = Clothes(ACCOUNT_ID, image_url='https://oss/a.jpg',
+                      image_variants={512: 'https://oss/a_w512.webp', 128: 'https://oss/a_w128.webp',
+                                      256: 'https://oss/a_w256.webp'})
+
+    data = clothes.to_dict(['thumbnail_url', 'image_variants'])
+    assert data['thumbnail_url'] == 'https://oss/a_w256.webp'
+    assert list(data['image_variants']) == ['128', '256', '512']
+
+    monkeypatch.setattr(Config, 'IMAGE_THUMBNAIL_SIZE', 1024)
+    assert clothes.thumbnail_url == 'https://oss/a_w512.webp'
+
+    clothes = Clothes(ACCOUNT_ID, image_url='https://oss/b.jpg')
+    assert clothes.needs_image_variants
+    assert clothes.to_dict(['thumbnail_url', 'image_variants']) == {
+        'thumbnail_url': 'https://oss/b.jpg', 'image_variants': {}}
+
+
+def test_upload_saves_variants_eagerly(service):
+    """上传时生成全部尺寸的缩略图并随衣物记录一起保存"""
+    item = service._upload_file(ACCOUNT_ID, FileStorage(stream=make_jpeg(2000, 1000), filename='new.jpg'))
+    assert sorted(item['image_variants']) == SIZES
+
+    created, errors, job = service._save_pending_clothes(ACCOUNT_ID, [item])
+    clothes = created[item['object_key']]
+    variants = clothes.get_image_variants()
+    assert list(variants) == ['128', '256', '512']
+    assert variants['128'] == 'https://oss/' + item['object_key'][:-len('.jpg')] + '_w128.webp'
+    assert not clothes.needs_image_variants
+
+
+def test_old_image_gets_variants_after_first_request(service):
+    """旧图片第一次被请求时先返回原图并在后台补生成缩略图，之后不再下载原图"""
+    service.oss_helper.objects['clothes/old/photo.jpg'] = (make_jpeg(1200, 1600).read(), 'image/jpeg')
+    clothes_id = add_clothes('https://oss/clothes/old/photo.jpg')
+
+    item = service.get_clothes_detail(ACCOUNT_ID, clothes_id)
+    assert item['thumbnail_url'] == 'https://oss/clothes/old/photo.jpg'
+    assert item['image_variants'] == {}
+    wait_for_variants()
+
+    item = service.get_clothes_detail(ACCOUNT_ID, clothes_id)
+    assert item['thumbnail_url'] == 'https://oss/clothes/old/photo_w256.webp'
+    assert list(item['image_variants']) == ['128', '256', '512']
+    thumbnail = Image.open(io.BytesIO(service.oss_helper.objects['clothes/old/photo_w128.webp'][0]))
+    assert thumbnail.format == 'WEBP' and max(thumbnail.size) == 128
+
+    service.get_clothes_list(ACCOUNT_ID)
+    service.get_clothes_detail(ACCOUNT_ID, clothes_id)
+    assert service.oss_helper.downloads == ['clothes/old/photo.jpg']
+
+
+def test_undecodable_or_missing_image(service):
+    """原图无法解码时不再重试并返回原图URL；原图下载失败时下次请求重试"""
+    service.oss_helper.objects['clothes/old/broken.jpg'] = (b'not an image', 'image/jpeg')
+    broken_id = add_clothes('https://oss/clothes/old/broken.jpg')
+    missing_id = add_clothes('https://oss/clothes/old/missing.jpg')
+
+    service.get_clothes_detail(ACCOUNT_ID, broken_id)
+    service.get_clothes_detail(ACCOUNT_ID, missing_id)
+    wait_for_variants()
+
+    assert not Clothes.get_by_id(ACCOUNT_ID, broken_id).needs_image_variants
+    item = service.get_clothes_detail(ACCOUNT_ID, broken_id)
+    assert item['thumbnail_url'] == 'https://oss/clothes/old/broken.jpg'
+    assert Clothes.get_by_id(ACCOUNT_ID, missing_id).needs_image_variants
+
+
+def test_list_without_image_fields_does_not_generate(service):
+    """只返回不含图片的字段时不补生成缩略图"""
+    service.oss_helper.objects['clothes/old/skip.jpg'] = (make_jpeg(100, 100).read(), 'image/jpeg')
+    clothes_id = add_clothes('https://oss/clothes/old/skip.jpg')
+
+    service.get_clothes_list(ACCOUNT_ID, fields=['name'])
+    wait_for_variants()
+    assert Clothes.get_by_id(ACCOUNT_ID, clothes_id).needs_image_variants
+
+    service.get_clothes_list(ACCOUNT_ID, fields=['thumbnail_url'])
+    wait_for_variants()
+    assert not Clothes.get_by_id(ACCOUNT_ID, clothes_id).needs_image_variants
+
+
+def test_read_paths_do_not_generate_inline(service, monkeypatch):
+    """读取请求只提交补生成任务，不在请求线程中下载原图；关闭补生成时不提交任务"""
+    service.oss_helper.objects['clothes/old/inline.jpg'] = (make_jpeg(100, 100).read(), 'image/jpeg')
+    clothes_id = add_clothes('https://oss/clothes/old/inline.jpg')
+    submitted = []
+    monkeypatch.setattr(image_variant_queue, '_run', lambda app, account_id, clothes_id: submitted.append(clothes_id))
+
+    service.get_clothes_detail(ACCOUNT_ID, clothes_id)
+    assert image_variant_queue.wait(timeout=10)
+    assert submitted == [clothes_id] and service.oss_helper.downloads == []
+
+    monkeypatch.setattr(Config, 'IMAGE_VARIANT_WORKERS', 0)
+    service.get_clothes_detail(ACCOUNT_ID, clothes_id)
+    assert submitted == [clothes_id]
+    assert Clothes.get_by_id(ACCOUNT_ID, clothes_id).needs_image_variants
@@ -0,0 +1,43 @@
+"""
+流式JSON解析测试
+大模型的流式输出按任意位置切分到达，扫描器在第一个顶层JSON对象闭合时立即返回该对象
+"""
+import json
+from app.utils.json_stream import JsonObjectScanner
+
+
+def feed_chunks(text, size):
+    """按固定长度切分文本依次输入扫描器，返回对象闭合时的结果和已输入的片段数"""
+    scanner = JsonObjectScanner()
+    for count, start in enumerate(range(0, len(text), size), 1):
+        result = scanner.feed(text[start:start + size])
+        if result is not None:
+            return result, count
+    return None, None
+
+
+def test_object_closes_across_chunks():
+    """对象跨多个片段时，在闭合的片段返回，前后的说明文字被忽略"""
+    text = '好的，推荐如下：{"name": "通勤", "clothes_ids": [1, 2], "detail": {"top": 1}} 以上'
+    for size in (1, 3, 7, len(text)):
+        result, count = feed_chunks(text, size)
+        assert json.loads(result) == {"name": "通勤", "clothes_ids": [1, 2], "detail": {"top": 1}}
+        assert count == -(-(text.index('}}') + 2) // size)
+
+
+def test_braces_and_escapes_inside_strings():
+    """字符串中的括号和转义引号不影响对象边界"""
+    text = r'{"reasoning": "搭配{上衣}和\"下装}\"", "path": "a\\"}'
+    result, _ = feed_chunks(text, 2)
+    assert result == text
+    assert json.loads(result)['reasoning'] == '搭配{上衣}和"下装}"'
+
+
+def test_incomplete_and_after_close():
+    """对象未闭合时返回None；闭合后继续输入返回同一个对象"""
+    scanner = JsonObjectScanner()
+    assert scanner.feed('前缀 } {"a": "}"') is None
+    assert scanner.feed(None) is None
+    assert scanner.feed(', "b": 1}') == '{"a": "}", "b": 1}'
+    assert scanner.feed('{"c": 2}') == '{"a": "}", "b": 1}'
+    assert scanner.length == len('前缀 } {"a": "}"') + len(', "b": 1}')
@@ -0,0 +1,155 @@
+"""
+大模型服务提供者测试
+本地桩服务的延迟、错误和超时由固定种子决定，相同种子结果可重复；
+返回的衣物识别结果和穿搭推荐符合格式要求；LLM_PROVIDER=stub时各AI服务使用桩服务；
+服务提供者按(名称, 模型, 进程ID)在进程内共享，fork出的子进程创建自己的实例和连接池
+"""
+import json
+import types
+import pytest
+from app.services import llm_provider
+from app.services.ai_vision_service import AIVisionService
+from app.services.llm_provider import LLMError, OpenAIProvider, StubProvider, get_llm_provider
+from app.services.outfit_ai_service import OutfitAIService
+from config import Config
+from tests.conftest import ACCOUNT_ID
+
+
+@pytest.fixture
+def stub_config(monkeypatch):
+    """
+    使用桩服务并记录模拟的等待时间（不实际等待）
+    :return: 每次等待的秒数列表
+    """
+    monkeypatch.setattr(Config, 'LLM_PROVIDER', 'stub')
+    monkeypatch.setattr(Config, 'LLM_STUB_LATENCY_MS', 800)
+    monkeypatch.setattr(Config, 'LLM_STUB_LATENCY_JITTER_MS', 200)
+    monkeypatch.setattr(Config, 'LLM_STUB_ERROR_RATE', 0)
+    monkeypatch.setattr(Config, 'LLM_STUB_TIMEOUT_RATE', 0)
+    monkeypatch.setattr(Config, 'LLM_STUB_SEED', 42)
+    monkeypatch.setattr(llm_provider, '_registry', {})
+    sleeps = []
+    monkeypatch.setattr(llm_provider, 'time', types.SimpleNamespace(sleep=sleeps.append))
+    return sleeps
+
+
+def simulate(provider, count):
+    """连续模拟多次调用，返回每次的延迟或错误信息"""
+    outcomes = []
+    for _ in range(count):
+        try:
+            outcomes.append(round(provider._simulate_call(), 6))
+        except LLMError as e:
+            outcomes.append(str(e))
+    return outcomes
+
+
+def image_request(image_urls):
+    """构建包含图片的识别请求消息"""
+    content = [{"type": "text", "text": "识别服装"}]
+    content += [{"type": "image_url", "image_url": {"url": url}} for url in image_urls]
+    return [{"role": "system", "content": "系统提示词"}, {"role": "user", "content": content}]
+
+
+def test_same_seed_reproduces_latency_errors_and_timeouts(stub_config, monkeypatch):
+    """相同种子的两个实例产生相同的延迟、错误和超时序列，不同种子的序列不同"""
+    monkeypatch.setattr(Config, 'LLM_STUB_ERROR_RATE', 0.3)
+    monkeypatch.setattr(Config, 'LLM_STUB_TIMEOUT_RATE', 0.1)
+
+    outcomes = simulate(StubProvider(), 200)
+    assert outcomes == simulate(StubProvider(), 200)
+
+    monkeypatch.setattr(Config, 'LLM_STUB_SEED', 7)
+    assert simulate(StubProvider(), 200) != outcomes
+
+    delays = [outcome for outcome in outcomes if isinstance(outcome, float)]
+    assert all(0.6 <= delay <= 1.0 for delay in delays)
+    assert 40 <= outcomes.count("服务暂时不可用（模拟）") <= 80
+    assert 10 <= outcomes.count("请求超时（模拟）") <= 30
+
+
+def test_timeout_waits_and_chat_raises(stub_config, monkeypatch):
+    """模拟超时时等待LLM_TIMEOUT后抛出异常，模拟错误时等待一次延迟后抛出异常"""
+    monkeypatch.setattr(Config, 'LLM_TIMEOUT', 12.5)
+    monkeypatch.setattr(Config, 'LLM_STUB_TIMEOUT_RATE', 1)
+    with pytest.raises(LLMError, match='超时'):
+        StubProvider().chat(image_request(['https://oss/a.jpg']))
+    assert stub_config == [12.5]
+
+    monkeypatch.setattr(Config, 'LLM_STUB_TIMEOUT_RATE', 0)
+    monkeypatch.setattr(Config, 'LLM_STUB_ERROR_RATE', 1)
+    with pytest.raises(LLMError, match='不可用'):
+        StubProvider().chat(image_request(['https://oss/a.jpg']))
+    assert 0.6 <= stub_config[-1] <= 1.0
+
+
+def test_clothing_results_are_deterministic(stub_config):
+    """同一图片URL的识别结果相同且包含全部必要字段，多图请求返回带图片序号的items数组"""
+    provider = StubProvider()
+    single = json.loads(provider.chat(image_request(['https://oss/a.jpg'])))
+    assert set(AIVisionService.REQUIRED_FIELDS) <= set(single)
+    assert json.loads(StubProvider().chat(image_request(['https://oss/a.jpg']))) == single
+
+    urls = ['https://oss/b.jpg', 'https://oss/a.jpg', 'https://oss/c.jpg']
+    items = json.loads(provider.chat(image_request(urls)))["items"]
+    assert [item.pop("index") for item in items] == [1, 2, 3]
+    assert items[1] == single
+    assert all(not AIVisionService()._missing_fields(item) for item in items)
+
+
+def test_outfit_result_picks_ids_from_prompt(stub_config):
+    """穿搭请求优先选择第一套候选方案，没有方案时选择衣物列表中的前三个ID；流式输出拼接后与普通输出一致"""
+    provider = StubProvider()
+    with_combos = '衣物：\n12|上衣\n15|下装\n候选方案：\n方案1: 15,12,30\n方案2: 12,31\n'
+    result = json.loads(provider.chat([{"role": "user", "content": with_combos}]))
+    assert result["clothes_ids"] == [15, 12, 30]
+    assert {"name", "style", "season", "occasion", "reasoning"} <= set(result)
+
+    rows = '衣物：\n3|上衣\n8|下装\n21|外套\n40|鞋子\n'
+    assert json.loads(provider.chat([{"role": "user", "content": rows}]))["clothes_ids"] == [3, 8, 21]
+
+    messages = [{"role": "user", "content": with_combos}]
+    chunks = list(provider.chat_stream(messages))
+    assert len(chunks) > 1 and ''.join(chunks) == provider.chat(messages)
+
+
+def test_stub_provider_routes_ai_services(seed, stub_config):
+    """LLM_PROVIDER=stub时穿搭推荐和图片识别都使用进程内共享的桩服务，推荐结果来自桩服务"""
+    outfit_service = OutfitAIService()
+    assert isinstance(outfit_service.llm, StubProvider)
+    assert outfit_service.llm is AIVisionService().llm
+
+    result = outfit_service.generate_outfit(ACCOUNT_ID, season='spring')
+    assert result["success"], result
+    assert result["source"] == "ai" and result["outfit"].name == "本地测试穿搭"
+    assert stub_config and all(0.6 <= delay <= 1.0 for delay in stub_config)
+
+
+def test_provider_shared_per_process(stub_config, monkeypatch):
+    """同一进程内相同名称和模型返回同一个实例，模型或名称不同时创建新实例"""
+    provider = get_llm_provider()
+    assert isinstance(provider, StubProvider)
+    assert get_llm_provider() is provider
+    assert get_llm_provider(name='STUB') is provider
+    assert get_llm_provider(model='other-model') is not provider
+
+    monkeypatch.setattr(Config, 'OPENAI_API_KEY', 'test-key')
+    openai_provider = get_llm_provider(name='openai', model='test-model')
+    assert isinstance(openai_provider, OpenAIProvider)
+    assert get_llm_provider(name='openai', model='test-model') is openai_provider
+    assert openai_provider.client._client is openai_provider.http_client
+
+    with pytest.raises(ValueError):
+        get_llm_provider(name='unknown')
+
+
+def test_new_provider_after_fork(stub_config, monkeypatch):
+    """进程ID变化（gunicorn fork出的worker）后创建新的实例，不复用父进程的连接池"""
+    parent_pid = llm_provider.os.getpid()
+    parent = get_llm_provider()
+    monkeypatch.setattr(llm_provider, 'os', types.SimpleNamespace(getpid=lambda: parent_pid + 1))
+    child = get_llm_provider()
+    assert child is not parent
+    assert get_llm_provider() is child
+    assert set(llm_provider._registry) == {('stub', Config.OPENAI_MODEL, parent_pid),
+                                           ('stub', Config.OPENAI_MODEL, parent_pid + 1)}
@@ -0,0 +1,107 @@
+"""
+OSS上传测试
+文件大小通过seek/tell获取而不读取内容；文件流原样交给OSS客户端，大文件使用分片上传
+"""
+import io
+from types import SimpleNamespace
+from werkzeug.datastructures import FileStorage
+import alibabacloud_oss_v2 as oss
+import app.utils.storage_backend as storage_backend_module
+from app.utils.file_helper import get_file_size, get_stream_size
+from app.utils.oss_helper import OSSHelper
+from app.utils.storage_backend import OSSBackend
+
+
+class TrackingStream(io.BytesIO):
+    """记录读取字节数的文件流"""
+
+    def __init__(self, data):
+        super().__init__(data)
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        data = super().read(size)
+        self.bytes_read += len(data)
+        return data
+
+
+class UnseekableStream(io.RawIOBase):
+    """不支持seek的文件流"""
+
+    def readable(self):
+        return True
+
+
+class FakeUploader:
+    """记录分片上传参数的上传器"""
+
+    def __init__(self, calls, **options):
+        self.calls = calls
+        self.options = options
+
+    def upload_from(self, request, reader):
+        self.calls.append(('multipart', request.key, reader, self.options))
+        return SimpleNamespace(etag='multipart-etag')
+
+
+class FakeClient:
+    """记录调用的OSS客户端"""
+
+    def __init__(self):
+        self.calls = []
+
+    def put_object(self, request):
+        self.calls.append(('put', request.key, request.body, None))
+        return SimpleNamespace(etag='etag')
+
+    def uploader(self, **options):
+        return FakeUploader(self.calls, **options)
+
+
+def make_helper():
+    """创建使用假客户端的OSS辅助类"""
+    backend = OSSBackend.__new__(OSSBackend)
+    backend.oss = oss
+    backend.client = FakeClient()
+    backend.bucket_name = 'bucket'
+    return OSSHelper(backend)
+
+
+def test_size_check_does_not_read_stream():
+    """获取大小不读取内容，并恢复文件指针"""
+    stream = TrackingStream(b'x' * 5000)
+    stream.seek(10)
+    assert get_stream_size(stream) == 5000
+    assert stream.tell() == 10
+    assert get_file_size(FileStorage(stream=stream, filename='a.jpg')) == 5000
+    assert stream.bytes_read == 0
+
+
+def test_unseekable_stream_uses_content_length():
+    """不支持seek时使用声明的Content-Length"""
+    file = FileStorage(stream=UnseekableStream(), filename='a.jpg', content_length=123)
+    assert get_stream_size(file.stream) is None
+    assert get_file_size(file) == 123
+
+
+def test_small_file_is_streamed_to_put_object():
+    """小文件把原始文件流交给put_object"""
+    helper = make_helper()
+    stream = TrackingStream(b'x' * 1000)
+
+    object_key = helper.upload_file('acc', FileStorage(stream=stream, filename='a.jpg'))
+    assert helper.backend.client.calls == [('put', object_key, stream, None)]
+    assert stream.bytes_read == 0
+
+
+def test_large_file_uses_multipart_upload(monkeypatch):
+    """超过阈值的文件使用分片上传"""
+    monkeypatch.setattr(storage_backend_module, 'OSS_MULTIPART_THRESHOLD', 1000)
+    monkeypatch.setattr(storage_backend_module, 'OSS_MULTIPART_PART_SIZE', 512)
+    helper = make_helper()
+    stream = TrackingStream(b'x' * 2000)
+
+    object_key = helper.upload_file('acc', FileStorage(stream=stream, filename='a.jpg'))
+    (kind, key, reader, options), = helper.backend.client.calls
+    assert (kind, key, reader) == ('multipart', object_key, stream)
+    assert options['part_size'] == 512
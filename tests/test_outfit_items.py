@@ -0,0 +1,140 @@
+"""
+穿搭衣物关联表测试
+穿搭包含的衣物保存在outfit_items表中并按position排序；添加、移除、整体替换衣物和删除衣物时关联记录同步更新；
+回填脚本把旧的outfits.clothes_items（JSON数组）写入关联表
+"""
+import importlib.util
+import os
+from sqlalchemy import text
+from app import create_app, db
+from app.models import Clothes, Outfit, OutfitItem
+from app.services.clothes_service import ClothesService
+from app.services.outfit_service import OutfitService
+from tests.conftest import ACCOUNT_ID, OTHER_ACCOUNT_ID
+
+
+def create_clothes(count):
+    """创建一批衣物，返回衣物ID列表"""
+    clothes_list = [Clothes(ACCOUNT_ID, name=f'关联衣物{i}', category='上衣') for i in range(count)]
+    db.session.add_all(clothes_list)
+    db.session.commit()
+    return [clothes.id for clothes in clothes_list]
+
+
+def stored_items(outfit_id):
+    """从数据库读取穿搭的关联记录，按position排序"""
+    return [(item.clothes_id, item.position) for item in
+            OutfitItem.query.filter_by(outfit_id=outfit_id).order_by(OutfitItem.position).all()]
+
+
+def test_create_outfit_keeps_order(seed):
+    """创建穿搭时按传入顺序写入关联记录，重复和不属于当前账号的衣物被过滤"""
+    a, b, c = create_clothes(3)
+    other_id = Clothes.query.filter_by(account_id=OTHER_ACCOUNT_ID).first().id
+
+    outfit = OutfitService.create_outfit(ACCOUNT_ID, '顺序穿搭', [c, a, other_id, c, b])
+    assert stored_items(outfit.id) == [(c, 0), (a, 1), (b, 2)]
+
+    db.session.expire_all()
+    outfit = Outfit.get_by_id(ACCOUNT_ID, outfit.id)
+    assert outfit.get_clothes_items() == [c, a, b]
+    assert all(item.account_id == ACCOUNT_ID for item in outfit.items)
+
+
+def test_add_and_remove_clothes(seed):
+    """添加的衣物排在最后，重复添加无效；移除后其余衣物保持原有顺序"""
+    a, b, c = create_clothes(3)
+    outfit = OutfitService.create_outfit(ACCOUNT_ID, '增删穿搭', [a, b])
+
+    outfit.add_clothes(c)
+    outfit.add_clothes(a)
+    assert stored_items(outfit.id) == [(a, 0), (b, 1), (c, 2)]
+
+    outfit.remove_clothes(b)
+    outfit.remove_clothes(b)
+    assert stored_items(outfit.id) == [(a, 0), (c, 2)]
+
+    # 移除中间的衣物后再添加，新衣物仍排在最后
+    outfit.add_clothes(b)
+    db.session.expire_all()
+    assert Outfit.get_by_id(ACCOUNT_ID, outfit.id).get_clothes_items() == [a, c, b]
+
+
+def test_update_replaces_items(seed):
+    """整体替换衣物列表时删除旧的关联记录，保留的衣物按新顺序重新编号"""
+    a, b, c = create_clothes(3)
+    outfit = OutfitService.create_outfit(ACCOUNT_ID, '替换穿搭', [a, b])
+
+    outfit.set_clothes_items([c, a])
+    db.session.commit()
+    assert stored_items(outfit.id) == [(c, 0), (a, 1)]
+    assert OutfitItem.query.filter_by(outfit_id=outfit.id, clothes_id=b).count() == 0
+
+
+def test_delete_clothes_removes_from_outfits(seed):
+    """删除衣物时从所有包含它的穿搭中移除，其他衣物的顺序不变，其他账号的关联记录不受影响"""
+    a, b, c = create_clothes(3)
+    first = OutfitService.create_outfit(ACCOUNT_ID, '穿搭一', [a, b, c])
+    second = OutfitService.create_outfit(ACCOUNT_ID, '穿搭二', [b, a])
+    other = Outfit(OTHER_ACCOUNT_ID, name='其他账号', clothes_items=[b])
+    db.session.add(other)
+    db.session.commit()
+    assert sorted(OutfitItem.get_outfit_ids_by_clothes(ACCOUNT_ID, b)) == sorted([first.id, second.id])
+
+    assert ClothesService().delete_clothes(ACCOUNT_ID, b)['success']
+
+    db.session.expire_all()
+    assert Outfit.get_by_id(ACCOUNT_ID, first.id).get_clothes_items() == [a, c]
+    assert Outfit.get_by_id(ACCOUNT_ID, second.id).get_clothes_items() == [a]
+    assert OutfitItem.get_outfit_ids_by_clothes(ACCOUNT_ID, b) == []
+    assert stored_items(other.id) == [(b, 0)]
+
+    # delete_by_clothes不提交事务，返回删除的记录数
+    assert OutfitItem.delete_by_clothes(ACCOUNT_ID, a) == 2
+    db.session.rollback()
+    assert len(OutfitItem.get_outfit_ids_by_clothes(ACCOUNT_ID, a)) == 2
+
+
+def test_delete_outfit_deletes_items(seed):
+    """删除穿搭时同时删除它的全部关联记录"""
+    a, b = create_clothes(2)
+    outfit = OutfitService.create_outfit(ACCOUNT_ID, '待删除穿搭', [a, b])
+    outfit_id = outfit.id
+
+    assert OutfitService.delete_outfit(ACCOUNT_ID, outfit_id)
+    assert stored_items(outfit_id) == []
+
+
+def load_backfill_script():
+    """按文件路径加载migrations/backfill_outfit_items.py"""
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        'migrations', 'backfill_outfit_items.py')
+    spec = importlib.util.spec_from_file_location('backfill_outfit_items', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_backfill_outfit_items():
+    """回填脚本按JSON数组顺序写入关联表，跳过重复ID、格式错误和已回填的穿搭，重复执行不会重复写入"""
+    backfill = load_backfill_script().backfill
+    legacy_app = create_app('testing')
+
+    with legacy_app.app_context():
+        db.session.execute(text(
+            "CREATE TABLE outfits (id INTEGER PRIMARY KEY, account_id VARCHAR(64), clothes_items TEXT)"
+        ))
+        db.session.execute(text("INSERT INTO outfits VALUES "
+                                "(1, 'legacy', '[3, 1, 2]'), (2, 'legacy', '[\"5\", 5, 4]'), "
+                                "(3, 'legacy', 'not json'), (4, 'legacy', NULL), (5, 'legacy', '[]')"))
+        db.session.commit()
+
+        assert backfill() == 2
+        rows = db.session.query(OutfitItem.outfit_id, OutfitItem.clothes_id, OutfitItem.position) \
+            .order_by(OutfitItem.outfit_id, OutfitItem.position).all()
+        assert [tuple(row) for row in rows] == [(1, 3, 0), (1, 1, 1), (1, 2, 2), (2, 5, 0), (2, 4, 1)]
+        assert {item.account_id for item in OutfitItem.query.all()} == {'legacy'}
+
+        assert backfill() == 0
+        assert OutfitItem.query.count() == 5
+        db.session.remove()
@@ -0,0 +1,126 @@
+"""
+本地穿搭规则引擎测试
+按搭配位置组合上衣/下装/鞋子/外套，外套按温度和季节决定是否必须，场合偏好对应风格的衣物；
+大模型调用失败时穿搭推荐使用规则引擎得分最高的方案
+"""
+import pytest
+from app.services import outfit_ai_service
+from app.services.llm_provider import LLMError
+from app.services.outfit_ai_service import OutfitAIService
+from app.services.outfit_rule_engine import OutfitRuleEngine
+from config import Config
+from tests.conftest import ACCOUNT_ID
+
+TOPS = {1, 2}
+BOTTOMS = {3, 4}
+OUTERWEAR = {5}
+SHOES = {6, 7}
+
+
+@pytest.fixture
+def wardrobe():
+    """一个小衣橱：两件上衣、两件下装、一件外套、两双鞋和一件不参与组合的配饰"""
+    return [
+        {'id': 1, 'category': 'T恤', 'color': '白色', 'style': '休闲', 'season': ['summer']},
+        {'id': 2, 'category': '衬衫', 'color': '白色', 'style': '正式', 'season': ['spring', 'autumn']},
+        {'id': 3, 'category': '裤子', 'color': '黑色', 'style': '正式', 'season': ['spring', 'autumn']},
+        {'id': 4, 'category': '短裤', 'color': '灰色', 'style': '运动', 'season': ['summer']},
+        {'id': 5, 'category': '大衣', 'color': '黑色', 'style': '正式', 'season': ['winter']},
+        {'id': 6, 'category': '鞋子', 'color': '黑色', 'style': '正式', 'season': []},
+        {'id': 7, 'category': '鞋', 'color': '白色', 'style': '运动', 'season': []},
+        {'id': 8, 'category': '配饰', 'color': '红色', 'style': '时尚', 'season': []},
+    ]
+
+
+def slots_of(clothes_ids):
+    """统计组合中各搭配位置的衣物数量"""
+    ids = set(clothes_ids)
+    return tuple(len(ids & slot) for slot in (TOPS, BOTTOMS, OUTERWEAR, SHOES))
+
+
+def test_get_slot():
+    """类别映射到搭配位置，配饰和空类别不参与组合"""
+    assert OutfitRuleEngine.get_slot('毛衣') == 'top'
+    assert OutfitRuleEngine.get_slot('半身裙') == 'bottom'
+    assert OutfitRuleEngine.get_slot('羽绒服') == 'outerwear'
+    assert OutfitRuleEngine.get_slot('鞋') == 'shoes'
+    assert OutfitRuleEngine.get_slot('配饰') is None
+    assert OutfitRuleEngine.get_slot(None) is None
+
+
+def test_every_combo_fills_required_slots(wardrobe):
+    """每套方案恰好包含一件上衣、一件下装和一双鞋，配饰不参与组合，方案按得分降序"""
+    combos = OutfitRuleEngine(top_k=10).recommend(wardrobe, temperature=28)
+    assert len(combos) == 8
+    assert all(slots_of(combo['clothes_ids']) == (1, 1, 0, 1) for combo in combos)
+    assert all(8 not in combo['clothes_ids'] for combo in combos)
+    assert [combo['score'] for combo in combos] == sorted((combo['score'] for combo in combos), reverse=True)
+
+    # 没有鞋子时只组合上衣和下装；缺少上衣或下装时没有方案
+    without_shoes = [clothes for clothes in wardrobe if clothes['id'] not in SHOES]
+    combos = OutfitRuleEngine(top_k=10).recommend(without_shoes, temperature=28)
+    assert combos and all(slots_of(combo['clothes_ids']) == (1, 1, 0, 0) for combo in combos)
+    assert OutfitRuleEngine().recommend([c for c in wardrobe if c['id'] not in BOTTOMS]) == []
+    assert OutfitRuleEngine().recommend([]) == []
+
+
+@pytest.mark.parametrize('season, temperature, expected', [
+    (None, 30, 'excluded'),
+    (None, 5, 'required'),
+    ('winter', 20, 'optional'),
+    ('summer', None, 'excluded'),
+    ('winter', None, 'required'),
+    ('spring', None, 'optional'),
+])
+def test_outerwear_policy(season, temperature, expected):
+    """温度优先决定外套是否必须，没有温度时按季节决定"""
+    assert OutfitRuleEngine._outerwear_policy(season, temperature) == expected
+
+
+def test_outerwear_follows_temperature(wardrobe):
+    """炎热时方案不含外套，寒冷时每套方案都含外套，季节名称支持中文"""
+    engine = OutfitRuleEngine(top_k=20)
+    assert all(slots_of(combo['clothes_ids'])[2] == 0 for combo in engine.recommend(wardrobe, temperature=30))
+    assert all(slots_of(combo['clothes_ids'])[2] == 1 for combo in engine.recommend(wardrobe, temperature=3))
+    assert all(slots_of(combo['clothes_ids'])[2] == 1 for combo in engine.recommend(wardrobe, season='冬季'))
+
+    optional = {slots_of(combo['clothes_ids'])[2] for combo in engine.recommend(wardrobe, season='spring')}
+    assert optional == {0, 1}
+
+
+def test_occasion_prefers_matching_styles(wardrobe):
+    """炎热天气默认首选夏季衣物，上班时改为首选正式风格的衣物，运动时首选运动风格的衣物"""
+    engine = OutfitRuleEngine()
+    assert engine.recommend(wardrobe, temperature=28)[0]['clothes_ids'] == [1, 4, 7]
+    assert engine.recommend(wardrobe, occasion='周一上班', temperature=28)[0]['clothes_ids'] == [2, 3, 6]
+    assert set(engine.recommend(wardrobe, occasion='运动', temperature=28)[0]['clothes_ids']) >= {4, 7}
+
+
+class FailingLLM:
+    """调用即失败的大模型服务提供者"""
+
+    name = 'failing'
+
+    def chat(self, messages, **params):
+        raise LLMError('服务暂时不可用')
+
+
+def test_offline_fallback_when_llm_fails(seed, monkeypatch):
+    """大模型调用失败时返回规则引擎得分最高的方案；关闭回退时返回错误信息"""
+    monkeypatch.setattr(outfit_ai_service, 'get_llm_provider', lambda **kwargs: FailingLLM())
+    monkeypatch.setattr(Config, 'OUTFIT_RULE_FALLBACK', True)
+    service = OutfitAIService()
+
+    prepared = service._prepare_request(ACCOUNT_ID, season='spring')
+    assert prepared['combos']
+    result = service.generate_outfit(ACCOUNT_ID, season='spring')
+    assert result['success'], result
+    assert result['source'] == 'rule'
+    assert result['outfit'].name == '本地推荐穿搭'
+    assert result['outfit'].get_clothes_items() == prepared['combos'][0]['clothes_ids']
+    assert 'spring' in result['outfit'].description
+
+    monkeypatch.setattr(Config, 'OUTFIT_RULE_FALLBACK', False)
+    result = service.generate_outfit(ACCOUNT_ID, season='spring')
+    assert not result['success']
+    assert '服务暂时不可用' in result['message']
@@ -0,0 +1,159 @@
+"""
+穿搭向量化评分测试
+束搜索的结果与穷举全部组合一致（束宽足够时不剪枝，默认束宽剪枝后前几名仍一致）；单品得分、搭配得分和提示词中衣物列表的token预算符合预期
+"""
+import itertools
+import random
+import re
+import numpy as np
+import pytest
+from app.services.outfit_ai_service import OutfitAIService, estimate_tokens
+from app.services.outfit_rule_engine import SLOT_CATEGORIES
+from app.services.outfit_scoring import WardrobeFeatures, OutfitScorer
+from config import Config
+
+CATEGORIES = ['上衣', '下装', '外套', '鞋子']
+COLORS = ['黑色', '白色', '红色', '酒红色', '蓝色', '绿色', '未知色', None]
+STYLES = ['休闲', '正式', '运动', None]
+SEASONS = ['spring', 'summer', 'autumn', 'winter']
+
+
+def make_wardrobe(count, seed=7):
+    """随机生成一批衣物数据"""
+    rng = random.Random(seed)
+    return [{
+        'id': i + 1,
+        'name': f'衣物{i + 1}',
+        'category': CATEGORIES[i % len(CATEGORIES)],
+        'color': rng.choice(COLORS),
+        'style': rng.choice(STYLES),
+        'season': rng.sample(SEASONS, rng.randint(0, 2)),
+    } for i in range(count)]
+
+
+def brute_force(scorer, item_scores, required_slots, optional_slots):
+    """穷举全部组合（可选位置可以不选），返回按得分降序的(得分, 衣物ID列表)"""
+    f = scorer.features
+    pairs = scorer.pair_scores()
+    choices = [list(f.slot_indices(slot)) for slot in required_slots]
+    choices += [list(f.slot_indices(slot)) + [None] for slot in optional_slots]
+    results = []
+    for combo in itertools.product(*choices):
+        indices = [i for i in combo if i is not None]
+        pair_sum = sum(pairs[a, b] for a, b in itertools.combinations(indices, 2))
+        pair_count = len(indices) * (len(indices) - 1) / 2
+        score = item_scores[indices].mean() + (pair_sum / pair_count if pair_count else 0.0)
+        results.append((score, [int(f.ids[i]) for i in indices]))
+    return sorted(results, key=lambda result: -result[0])
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_beam_search_matches_brute_force(seed):
+    """束宽足够时，束搜索返回的前几名与穷举结果的得分和组合一致"""
+    clothes_data = make_wardrobe(24, seed)
+    scorer = OutfitScorer(WardrobeFeatures(clothes_data, SLOT_CATEGORIES))
+    item_scores = scorer.item_scores(season='summer', temperature=26,
+                                     preferred_styles=scorer.features.style_ids_matching(['休闲']))
+
+    ranked = scorer.rank(item_scores, ['top', 'bottom'], ['outerwear', 'shoes'], beam_width=10000, top_k=5)
+    expected = brute_force(scorer, item_scores, ['top', 'bottom'], ['outerwear', 'shoes'])[:5]
+
+    assert [score for score, _ in ranked] == pytest.approx([score for score, _ in expected])
+    assert ranked[0][1] == expected[0][1]
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_default_beam_width_matches_brute_force(seed):
+    """默认束宽会剪枝（60件衣物共57600个组合，每步只保留200个），前几名的得分仍与穷举一致；束宽为1时只保留一个方案"""
+    clothes_data = make_wardrobe(60, seed)
+    scorer = OutfitScorer(WardrobeFeatures(clothes_data, SLOT_CATEGORIES))
+    item_scores = scorer.item_scores(season='summer', temperature=26,
+                                     preferred_styles=scorer.features.style_ids_matching(['休闲']))
+    expected = brute_force(scorer, item_scores, ['top', 'bottom'], ['outerwear', 'shoes'])
+
+    ranked = scorer.rank(item_scores, ['top', 'bottom'], ['outerwear', 'shoes'],
+                         beam_width=Config.OUTFIT_RULE_BEAM_WIDTH, top_k=5)
+    assert [score for score, _ in ranked] == pytest.approx([score for score, _ in expected[:5]])
+
+    greedy = scorer.rank(item_scores, ['top', 'bottom'], ['outerwear', 'shoes'], beam_width=1, top_k=5)
+    assert len(greedy) == 1 and greedy[0][0] <= expected[0][0] + 1e-9
+
+
+def test_rank_requires_every_required_slot():
+    """缺少必需位置的衣物时没有方案，缺少可选位置时照常组合"""
+    clothes_data = [c for c in make_wardrobe(12) if c['category'] in ('上衣', '下装')]
+    scorer = OutfitScorer(WardrobeFeatures(clothes_data, SLOT_CATEGORIES))
+    scores = scorer.item_scores()
+
+    assert scorer.rank(scores, ['top', 'shoes']) == []
+    ranked = scorer.rank(scores, ['top', 'bottom'], ['outerwear'], top_k=3)
+    assert len(ranked) == 3 and all(len(clothes_ids) == 2 for _, clothes_ids in ranked)
+    assert [score for score, _ in ranked] == sorted((score for score, _ in ranked), reverse=True)
+
+
+def test_item_scores_prefer_matching_season_and_style():
+    """应季、符合风格偏好的单品得分更高，没有季节信息的单品不受季节影响"""
+    clothes_data = [
+        {'id': 1, 'category': '上衣', 'color': '白色', 'style': '休闲', 'season': ['summer']},
+        {'id': 2, 'category': '上衣', 'color': '白色', 'style': '休闲', 'season': ['winter']},
+        {'id': 3, 'category': '上衣', 'color': '白色', 'style': '正式', 'season': ['summer']},
+        {'id': 4, 'category': '上衣', 'color': '白色', 'style': '休闲', 'season': []},
+    ]
+    features = WardrobeFeatures(clothes_data, SLOT_CATEGORIES)
+    scores = OutfitScorer(features).item_scores(season='summer', temperature=28,
+                                                preferred_styles=features.style_ids_matching(['休闲']))
+    assert scores[0] > scores[2] > scores[1]
+    assert scores[3] == pytest.approx(2.0)
+
+
+def test_pair_scores_color_harmony_and_style():
+    """中性色与任何颜色协调，同色系加分、撞色扣分，“不选”占位与任何衣物得分为0"""
+    clothes_data = [
+        {'id': 1, 'category': '上衣', 'color': '黑色', 'style': None, 'season': []},
+        {'id': 2, 'category': '下装', 'color': '红色', 'style': None, 'season': []},
+        {'id': 3, 'category': '外套', 'color': '酒红色', 'style': None, 'season': []},
+        {'id': 4, 'category': '鞋子', 'color': '绿色', 'style': None, 'season': []},
+        {'id': 5, 'category': '上衣', 'color': '绿色', 'style': '运动', 'season': []},
+        {'id': 6, 'category': '下装', 'color': '绿色', 'style': '正式', 'season': []},
+    ]
+    scorer = OutfitScorer(WardrobeFeatures(clothes_data, SLOT_CATEGORIES))
+    pairs = scorer.pair_scores()
+
+    assert pairs[0, 1] == pytest.approx(1.0)
+    assert pairs[1, 2] == pytest.approx(0.5)
+    assert pairs[1, 3] == pytest.approx(-1.0)
+    assert pairs[4, 5] == pytest.approx(0.5 - 0.5)
+    assert np.allclose(scorer.pair_scores([len(clothes_data)]), 0.0)
+
+
+def test_prompt_wardrobe_respects_token_budget(monkeypatch):
+    """衣物列表超出token预算时截断，图例只包含保留下来的取值"""
+    monkeypatch.setattr(Config, 'OUTFIT_PROMPT_TOKEN_BUDGET', 150)
+    clothes_data = make_wardrobe(200)
+    service = OutfitAIService()
+
+    text = service._encode_wardrobe(clothes_data, season='summer')
+    rows = [line for line in text.splitlines() if line.split('|', 1)[0].isdigit()]
+    assert 0 < len(rows) < len(clothes_data)
+    assert f"（衣橱共{len(clothes_data)}件，已按相关性列出{len(rows)}件）" in text
+    assert estimate_tokens(text) < 150 * 1.25
+    legend = next(line for line in text.splitlines() if line.startswith('图例：'))
+    used_codes = {field for row in rows for field in row.split('|')}
+    assert set(re.findall(r'([CKS]\d+)=', legend)) <= used_codes
+
+    monkeypatch.setattr(Config, 'OUTFIT_PROMPT_TOKEN_BUDGET', 300)
+    larger = service._encode_wardrobe(clothes_data, season='summer')
+    assert len([line for line in larger.splitlines() if line.split('|', 1)[0].isdigit()]) > len(rows)
+
+    monkeypatch.setattr(Config, 'OUTFIT_PROMPT_TOKEN_BUDGET', 100000)
+    full = service._encode_wardrobe(clothes_data[:10])
+    assert len([line for line in full.splitlines() if line.split('|', 1)[0].isdigit()]) == 10
+    assert '已按相关性列出' not in full
+
+
+def test_estimate_tokens():
+    """中文按每字1个token估算，其余字符按约4个字符1个token估算"""
+    assert estimate_tokens('') == 0
+    assert estimate_tokens('上衣') == 2
+    assert estimate_tokens('abcd') == 1
+    assert estimate_tokens('abcde上衣') == 4
@@ -0,0 +1,53 @@
+"""
+游标分页测试
+游标编码(created_at, id)排序键，创建时间相同的衣物按ID继续翻页，不重复也不遗漏
+"""
+from datetime import datetime
+import pytest
+from app import db
+from app.models import Clothes
+from app.services.clothes_service import ClothesService
+from app.utils.pagination import encode_cursor, decode_cursor
+
+CURSOR_ACCOUNT_ID = 'cursor-account'
+
+
+def test_cursor_round_trip():
+    """游标解码后得到原始的创建时间（保留微秒）和ID，编码结果不含填充字符"""
+    created_at = datetime(2026, 3, 1, 8, 30, 15, 123456)
+    cursor = encode_cursor(created_at, 42)
+    assert '=' not in cursor and '|' not in cursor
+    assert decode_cursor(cursor) == (created_at, 42)
+    assert decode_cursor(encode_cursor(datetime(2026, 3, 1), 7)) == (datetime(2026, 3, 1), 7)
+
+
+@pytest.mark.parametrize('cursor', ['', 'not-a-cursor', encode_cursor(datetime(2026, 3, 1), 1)[:-3] + '!!!'])
+def test_invalid_cursor(cursor):
+    """格式错误的游标抛出ValueError"""
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_pages_with_equal_created_at(app):
+    """同一时刻创建的衣物跨多页时按ID倒序依次返回，每件只出现一次"""
+    created_at = datetime(2026, 3, 1, 12, 0, 0)
+    clothes_list = [Clothes(CURSOR_ACCOUNT_ID, name=f'同时创建{i}', category='上衣') for i in range(7)]
+    for clothes in clothes_list:
+        clothes.created_at = created_at
+    db.session.add_all(clothes_list)
+    db.session.commit()
+    expected = sorted((clothes.id for clothes in clothes_list), reverse=True)
+
+    service = ClothesService()
+    seen, cursor, pages = [], None, 0
+    while True:
+        page = service.get_clothes_list(CURSOR_ACCOUNT_ID, cursor=cursor, page_size=3, fields=['name'])
+        seen.extend(item['id'] for item in page['items'])
+        pages += 1
+        if not page['has_more']:
+            break
+        assert decode_cursor(page['next_cursor']) == (created_at, page['items'][-1]['id'])
+        cursor = page['next_cursor']
+
+    assert seen == expected
+    assert pages == 3
@@ -0,0 +1,92 @@
+"""
+直传上传测试
+签发的对象键名属于当前账号；提交时校验对象归属、是否已上传、大小和是否重复提交，只为有效的对象创建衣物
+"""
+import pytest
+from app.models import Clothes, RecognitionJob
+from app.services.clothes_service import ClothesService
+from app.utils.oss_helper import OSSHelper
+from config import Config
+from tests.conftest import ACCOUNT_ID, OTHER_ACCOUNT_ID
+
+
+class FakeOSSHelper(OSSHelper):
+    """保存在内存中的OSS辅助类，客户端直传通过put模拟"""
+
+    def __init__(self):
+        self.objects = {}
+        self.deleted = []
+
+    def put(self, object_key, size):
+        self.objects[object_key] = size
+
+    def get_signed_put_url(self, object_key, content_type=None, expires=None):
+        headers = {"Content-Type": content_type} if content_type else {}
+        return {"url": f"https://oss/{object_key}?signature=x", "method": "PUT", "headers": headers,
+                "expiration": None}
+
+    def get_object_meta(self, object_key):
+        if object_key not in self.objects:
+            return None
+        return {"size": self.objects[object_key], "content_type": "image/jpeg", "etag": "etag"}
+
+    def get_public_url(self, object_key):
+        return f"https://oss/{object_key}"
+
+    def delete_object(self, object_key):
+        self.objects.pop(object_key, None)
+        self.deleted.append(object_key)
+        return True
+
+
+@pytest.fixture
+def service(monkeypatch):
+    """使用内存OSS、同步执行识别任务的衣物服务"""
+    monkeypatch.setattr(Config, 'RECOGNITION_WORKERS', 0)
+    monkeypatch.setattr(ClothesService, '_recognize_images',
+                        lambda self, image_urls, image_hashes=None: [{"success": False, "message": "离线"}
+                                                                     for _ in image_urls])
+    service = ClothesService()
+    service.oss_helper = FakeOSSHelper()
+    return service
+
+
+def test_presign_issues_account_scoped_keys(seed, service):
+    """签发的对象键名在当前账号目录下，不支持的文件类型单独失败"""
+    result = service.presign_uploads(ACCOUNT_ID, [
+        {"filename": "shirt.jpg", "content_type": "image/jpeg"},
+        {"filename": "notes.txt"},
+    ])
+    assert result['success']
+    ok, bad = result['result']['items']
+    assert ok['object_key'].startswith(f"clothes/{ACCOUNT_ID}/") and ok['object_key'].endswith('.jpg')
+    assert ok['method'] == 'PUT' and ok['headers'] == {"Content-Type": "image/jpeg"}
+    assert not bad['success']
+
+
+def test_commit_creates_clothes_for_valid_objects(seed, service):
+    """只有已上传、属于当前账号、大小合规且未提交过的对象会创建衣物"""
+    keys = [item['object_key'] for item in service.presign_uploads(
+        ACCOUNT_ID, [{"filename": f"{i}.jpg"} for i in range(4)])['result']['items']]
+    uploaded, too_large, missing, _ = keys
+    service.oss_helper.put(uploaded, 1024)
+    service.oss_helper.put(too_large, Config.MAX_CONTENT_LENGTH + 1)
+    foreign = f"clothes/{OTHER_ACCOUNT_ID}/20260101/abc.jpg"
+    service.oss_helper.put(foreign, 1024)
+
+    result = service.commit_uploads(ACCOUNT_ID, [uploaded, too_large, missing, foreign])
+    assert result['success']
+    items = result['items']['items']
+    assert [item['success'] for item in items] == [True, False, False, False]
+    assert [item.get('message') for item in items[1:]] == ['文件大小超过限制，最大允许10MB', '文件未上传', '无效的对象键名']
+    assert service.oss_helper.deleted == [too_large]
+
+    clothes = Clothes.get_by_id(ACCOUNT_ID, items[0]['clothes_id'])
+    assert clothes.image_url == f"https://oss/{uploaded}"
+    job = RecognitionJob.get_by_id(ACCOUNT_ID, result['items']['job_id'])
+    assert job.get_clothes_items() == [clothes.id]
+
+    # 同一对象不能重复提交
+    result = service.commit_uploads(ACCOUNT_ID, [uploaded])
+    assert not result['success']
+    assert Clothes.query.filter_by(account_id=ACCOUNT_ID, image_url=f"https://oss/{uploaded}").count() == 1
@@ -0,0 +1,192 @@
+"""
+查询计划回归测试
+捕获各个服务和模型查询实际执行的SQL，在SQLite上执行EXPLAIN QUERY PLAN，
+出现未使用索引的全表扫描（SCAN <表名>）时测试失败，防止新增查询或修改索引后退化为全表扫描
+"""
+import re
+from contextlib import contextmanager
+from datetime import date, timedelta
+import pytest
+from sqlalchemy import event
+from app import db
+from app.models import (
+    Clothes, Tag, ClothesTag, ClothesAiInfo, Outfit, OutfitItem, WeatherLog,
+    Recommendation, RecognitionJob, SharedWardrobe, UserBodyInfo, User, WardrobeVersion
+)
+from app.services.clothes_service import ClothesService
+from app.services.outfit_service import OutfitService
+from app.services.weather_service import WeatherService
+from app.services.user_service import UserService
+from app.services.user_body_service import UserBodyService
+from app.services.wardrobe_cache import WardrobeCache
+from app.utils.pagination import encode_cursor
+from tests.conftest import ACCOUNT_ID, OTHER_ACCOUNT_ID
+
+# 查询计划中的全表扫描：SCAN <表名>，不带USING ... INDEX
+FULL_SCAN_PATTERN = re.compile(r'^SCAN (\w+)$')
+
+
+@contextmanager
+def capture_queries():
+    """
+    捕获代码块中执行的SELECT/UPDATE/DELETE语句
+    :return: (SQL语句, 参数)列表
+    """
+    statements = []
+
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE')):
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', _before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', _before_cursor_execute)
+
+
+def explain(statement, parameters):
+    """
+    获取SQL语句的查询计划
+    :param statement: SQL语句
+    :param parameters: 参数
+    :return: 查询计划每一步的描述列表
+    """
+    rows = db.session.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+    return [row[-1] for row in rows]
+
+
+def full_scans(statement, parameters):
+    """
+    获取SQL语句查询计划中的全表扫描
+    :return: 被全表扫描的表名列表
+    """
+    return [match.group(1) for match in map(FULL_SCAN_PATTERN.match, explain(statement, parameters)) if match]
+
+
+# 需要检查的查询：名称 -> 执行查询的函数（参数为测试数据的ID字典）
+QUERIES = {
+    # 衣物
+    'Clothes.get_by_id': lambda ids: Clothes.get_by_id(ACCOUNT_ID, ids['clothes_id']),
+    'Clothes.get_by_category': lambda ids: Clothes.get_by_category(ACCOUNT_ID, '上衣'),
+    'Clothes.get_by_status': lambda ids: Clothes.get_by_status(ACCOUNT_ID, 'available'),
+    'Clothes.get_by_season': lambda ids: Clothes.get_by_season(ACCOUNT_ID, 'summer'),
+    'Clothes.get_ai_info': lambda ids: Clothes.get_by_id(ACCOUNT_ID, ids['clothes_id']).get_ai_info(),
+    'Clothes.get_tags': lambda ids: Clothes.get_by_id(ACCOUNT_ID, ids['clothes_id']).get_tags(),
+    'Clothes.filter_ids': lambda ids: Clothes.filter_ids(ACCOUNT_ID, [ids['clothes_id']], status='available'),
+    'ClothesService.get_clothes_by_id': lambda ids: ClothesService().get_clothes_by_id(ACCOUNT_ID, ids['clothes_id']),
+    'ClothesService.get_clothes_list': lambda ids: ClothesService().get_clothes_list(ACCOUNT_ID),
+    'ClothesService.get_clothes_list(category)': lambda ids: ClothesService().get_clothes_list(ACCOUNT_ID, category='上衣'),
+    'ClothesService.get_clothes_list(status, season)': lambda ids: ClothesService().get_clothes_list(
+        ACCOUNT_ID, status='available', season='summer'),
+    'ClothesService.get_clothes_list(cursor)': lambda ids: ClothesService().get_clothes_list(
+        ACCOUNT_ID, cursor=encode_cursor(Clothes.get_by_id(ACCOUNT_ID, ids['clothes_id']).created_at, ids['clothes_id']),
+        page_size=2, fields=['name']),
+    'ClothesService.get_clothes_list(include=tags)': lambda ids: ClothesService().get_clothes_list(
+        ACCOUNT_ID, include=['tags']),
+    'ClothesService.get_clothes_list(include=ai_info)': lambda ids: ClothesService().get_clothes_list(
+        ACCOUNT_ID, include=['ai_info']),
+    'ClothesService.get_recognition_job': lambda ids: ClothesService().get_recognition_job(ACCOUNT_ID, ids['job_id']),
+    'WardrobeCache.load_items': lambda ids: WardrobeCache.load_items(ACCOUNT_ID),
+    'WardrobeVersion.get_version': lambda ids: WardrobeVersion.get_version(ACCOUNT_ID),
+    'ClothesAiInfo.get_by_clothes_id': lambda ids: ClothesAiInfo.get_by_clothes_id(ACCOUNT_ID, ids['clothes_id']),
+    'ClothesAiInfo.get_ai_info_map': lambda ids: ClothesAiInfo.get_ai_info_map(ACCOUNT_ID, [ids['clothes_id']]),
+
+    # 标签
+    'ClothesTag.get_by_clothes': lambda ids: ClothesTag.get_by_clothes(ACCOUNT_ID, ids['clothes_id']),
+    'ClothesTag.get_by_tag': lambda ids: ClothesTag.get_by_tag(ACCOUNT_ID, ids['tag_id']),
+    'ClothesTag.get_tags_map': lambda ids: ClothesTag.get_tags_map(ACCOUNT_ID, [ids['clothes_id']]),
+    'Tag.get_or_create_many': lambda ids: Tag.get_or_create_many(ACCOUNT_ID, ['通勤']),
+    'Tag.get_by_name': lambda ids: Tag.get_by_name(ACCOUNT_ID, '通勤'),
+    'Tag.get_all_by_account': lambda ids: Tag.get_all_by_account(ACCOUNT_ID),
+    'Tag.get_clothes': lambda ids: Tag.get_by_id(ids['tag_id']).get_clothes(),
+
+    # 穿搭
+    'OutfitService.get_outfit_list': lambda ids: OutfitService.get_outfit_list(ACCOUNT_ID),
+    'OutfitService.get_outfit_list(filters)': lambda ids: OutfitService.get_outfit_list(
+        ACCOUNT_ID, style='休闲', season='spring', occasion='上班'),
+    'OutfitService.get_outfit_list(clothes_id)': lambda ids: OutfitService.get_outfit_list(
+        ACCOUNT_ID, clothes_id=ids['clothes_id']),
+    'OutfitService.get_clothes_map': lambda ids: OutfitService.get_clothes_map(
+        ACCOUNT_ID, OutfitService.get_outfit_list(ACCOUNT_ID)),
+    'OutfitService.get_outfit_by_id': lambda ids: OutfitService.get_outfit_by_id(ACCOUNT_ID, ids['outfit_id']),
+    'Outfit.get_by_clothes': lambda ids: Outfit.get_by_clothes(ACCOUNT_ID, ids['clothes_id']),
+    'OutfitItem.get_outfit_ids_by_clothes': lambda ids: OutfitItem.get_outfit_ids_by_clothes(ACCOUNT_ID, ids['clothes_id']),
+    'Recommendation.get_by_outfit': lambda ids: Recommendation.get_by_outfit(ACCOUNT_ID, ids['outfit_id']),
+
+    # 天气
+    'WeatherService.get_weather_by_date': lambda ids: WeatherService.get_weather_by_date(ACCOUNT_ID, date.today()),
+    'WeatherService.get_weather_by_date_range': lambda ids: WeatherService.get_weather_by_date_range(
+        ACCOUNT_ID, date.today() - timedelta(days=7), date.today()),
+    'WeatherService.get_weather_by_location': lambda ids: WeatherService.get_weather_by_location(ACCOUNT_ID, '北京'),
+    'WeatherService.get_current_weather': lambda ids: WeatherService.get_current_weather(ACCOUNT_ID),
+    'WeatherService.get_latest_weather': lambda ids: WeatherService.get_latest_weather(ACCOUNT_ID),
+
+    # 识别任务（后台线程按状态领取和回收任务）
+    'RecognitionJob.get_by_id': lambda ids: RecognitionJob.get_by_id(ACCOUNT_ID, ids['job_id']),
+    'RecognitionJob.get_next_pending_id': lambda ids: RecognitionJob.get_next_pending_id(),
+    'RecognitionJob.requeue_stale': lambda ids: RecognitionJob.requeue_stale(600),
+
+    # 用户与共享
+    'UserService.get_user_by_username': lambda ids: UserService.get_user_by_username(ACCOUNT_ID),
+    'User.get_by_account_id': lambda ids: User.get_by_account_id(ACCOUNT_ID),
+    'UserBodyService.get_user_body_info': lambda ids: UserBodyService.get_user_body_info(ACCOUNT_ID),
+    'UserBodyInfo.get_by_account_id': lambda ids: UserBodyInfo.get_by_account_id(ACCOUNT_ID),
+    'SharedWardrobe.get_by_accounts': lambda ids: SharedWardrobe.get_by_accounts(ACCOUNT_ID, OTHER_ACCOUNT_ID),
+    'SharedWardrobe.get_shared_by_me': lambda ids: SharedWardrobe.get_shared_by_me(ACCOUNT_ID),
+    'SharedWardrobe.get_shared_with_me': lambda ids: SharedWardrobe.get_shared_with_me(ACCOUNT_ID),
+}
+
+
+# 各个复合索引对应的访问路径：查询名称 -> 查询计划中应使用的索引
+EXPECTED_INDEXES = {
+    'Clothes.get_by_category': 'idx_clothes_account_category',
+    'Clothes.get_by_status': 'idx_clothes_account_status_season',
+    'ClothesService.get_clothes_list': 'idx_clothes_account_created',
+    'ClothesService.get_clothes_list(status, season)': 'idx_clothes_account_status_season',
+    'WardrobeCache.load_items': 'idx_clothes_account_created',
+    'ClothesAiInfo.get_ai_info_map': 'sqlite_autoindex_clothes_ai_info_1',
+    'ClothesTag.get_by_clothes': 'idx_clothes_tag_unique',
+    'ClothesTag.get_by_tag': 'idx_clothes_tag_tag',
+    'ClothesTag.get_tags_map': 'idx_clothes_tag_unique',
+    'OutfitService.get_outfit_list': 'idx_outfit_account_created',
+    'OutfitService.get_outfit_list(clothes_id)': 'idx_outfit_item_clothes',
+    'Recommendation.get_by_outfit': 'idx_recommendation_account_outfit',
+    'WeatherService.get_weather_by_date': 'idx_weather_account_date',
+    'WeatherService.get_weather_by_date_range': 'idx_weather_account_date',
+    'WeatherService.get_weather_by_location': 'idx_weather_account_location',
+    'WeatherService.get_latest_weather': 'idx_weather_account_date',
+    'RecognitionJob.requeue_stale': 'idx_recognition_job_status_updated',
+    'UserService.get_user_by_username': 'ix_users_username',
+}
+
+
+@pytest.mark.parametrize('name', list(QUERIES))
+def test_query_uses_index(seed, name):
+    """每个查询执行的所有SQL都不能出现全表扫描"""
+    with capture_queries() as statements:
+        QUERIES[name](seed)
+
+    assert statements, f"{name} 没有执行任何查询"
+    for statement, parameters in statements:
+        scanned = full_scans(statement, parameters)
+        assert not scanned, f"{name} 全表扫描了 {', '.join(scanned)}:\n{statement}\n{explain(statement, parameters)}"
+
+
+@pytest.mark.parametrize('name', list(EXPECTED_INDEXES))
+def test_query_uses_expected_index(seed, name):
+    """按账号查询时应使用与访问路径匹配的复合索引"""
+    with capture_queries() as statements:
+        QUERIES[name](seed)
+
+    plans = [step for statement, parameters in statements for step in explain(statement, parameters)]
+    index = EXPECTED_INDEXES[name]
+    assert any(f"INDEX {index} " in step for step in plans), f"{name} 没有使用索引 {index}: {plans}"
+
+
+def test_full_scan_is_detected(seed):
+    """没有可用索引的查询应被识别为全表扫描"""
+    with capture_queries() as statements:
+        Clothes.query.filter_by(color='黑色').all()
+
+    assert full_scans(*statements[0]) == ['clothes']
@@ -0,0 +1,67 @@
+"""
+令牌桶限流器测试
+使用可控的时钟，验证突发容量、补充速率和超时
+"""
+from app.utils.rate_limiter import TokenBucket
+
+
+class FakeClock:
+    """手动推进的时钟，sleep直接推进时间"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def test_burst_then_refill():
+    """桶满时允许capacity个突发请求，之后按rate补充"""
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, capacity=3, clock=clock, sleep=clock.sleep)
+
+    assert [bucket.try_acquire() for _ in range(4)] == [True, True, True, False]
+    clock.now += 0.5
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+
+    # 长时间空闲后令牌不超过桶容量
+    clock.now += 100
+    assert [bucket.try_acquire() for _ in range(4)] == [True, True, True, False]
+
+
+def test_acquire_waits_for_tokens():
+    """令牌不足时等待补充，平均速率不超过rate"""
+    clock = FakeClock()
+    bucket = TokenBucket(rate=4, capacity=1, clock=clock, sleep=clock.sleep)
+
+    for _ in range(9):
+        assert bucket.acquire()
+    assert clock.now == 2.0
+    assert clock.sleeps == [0.25] * 8
+
+
+def test_acquire_timeout():
+    """等待时间超过timeout时放弃，不消耗令牌"""
+    clock = FakeClock()
+    bucket = TokenBucket(rate=1, capacity=1, clock=clock, sleep=clock.sleep)
+
+    assert bucket.acquire()
+    assert not bucket.acquire(timeout=0.5)
+    assert clock.sleeps == []
+    assert bucket.acquire(timeout=1)
+
+
+def test_disabled_bucket_never_waits():
+    """rate为0时不限流"""
+    clock = FakeClock()
+    bucket = TokenBucket(rate=0, clock=clock, sleep=clock.sleep)
+
+    assert not bucket.enabled
+    assert all(bucket.acquire() for _ in range(100))
+    assert clock.sleeps == []
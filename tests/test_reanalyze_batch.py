@@ -0,0 +1,89 @@
+"""
+批量重新识别测试
+重新识别任务按组识别，每组完成后批量写入AI识别信息并提交进度；只更新AI识别信息，不修改衣物信息
+"""
+import itertools
+import pytest
+from app import db
+from app.models import Clothes, ClothesAiInfo, RecognitionJob
+from app.services.clothes_service import ClothesService
+from app.services.wardrobe_cache import wardrobe_cache
+from config import Config
+from tests.conftest import ACCOUNT_ID, OTHER_ACCOUNT_ID
+
+# 图片URL序号，保证每件衣物的image_url不同
+IMAGE_SEQUENCE = itertools.count()
+
+
+@pytest.fixture
+def recognized(monkeypatch):
+    """
+    同步执行识别任务，识别结果固定为白色上衣
+    :return: 每次识别调用时数据库中任务的已处理数量列表
+    """
+    monkeypatch.setattr(Config, 'RECOGNITION_WORKERS', 0)
+    monkeypatch.setattr(Config, 'UPLOAD_MAX_WORKERS', 1)
+    monkeypatch.setattr(Config, 'AI_VISION_BATCH_SIZE', 2)
+    progress = []
+
+    def _recognize_images(self, image_urls, image_hashes=None):
+        job = RecognitionJob.query.filter_by(job_type='reanalyze').order_by(RecognitionJob.id.desc()).first()
+        progress.append(job.processed_count)
+        return [
+            {"success": True, "image_hash": f"hash-{url}",
+             "data": {"category": "上衣", "color": "白色", "season": "summer", "style": "休闲", "confidence": 90}}
+            for url in image_urls
+        ]
+
+    monkeypatch.setattr(ClothesService, '_recognize_images', _recognize_images)
+    return progress
+
+
+def create_clothes(count, with_image=True):
+    """创建一批已识别的衣物"""
+    clothes_list = [
+        Clothes(ACCOUNT_ID, name=f'重新识别{i}', category='裤子', color='黑色',
+                image_url=f'https://oss/reanalyze/{next(IMAGE_SEQUENCE)}.jpg' if with_image else None)
+        for i in range(count)
+    ]
+    db.session.add_all(clothes_list)
+    db.session.commit()
+    wardrobe_cache.invalidate(ACCOUNT_ID)
+    return [clothes.id for clothes in clothes_list]
+
+
+def test_reanalyze_batch_writes_ai_info_and_progress(seed, recognized):
+    """5件衣物分3组识别，每组提交一次进度，无图片的衣物被跳过"""
+    clothes_ids = create_clothes(5)
+    no_image_id = create_clothes(1, with_image=False)[0]
+
+    result = ClothesService().reanalyze_clothes_batch(ACCOUNT_ID, clothes_ids + [no_image_id])
+    assert result['success'], result
+    assert result['result']['total'] == 5
+    assert result['result']['skipped'] == [no_image_id]
+
+    job = ClothesService().get_recognition_job(ACCOUNT_ID, result['result']['job_id'])
+    assert job['job_type'] == 'reanalyze'
+    assert job['status'] == 'completed'
+    assert (job['processed'], job['success_count'], job['progress']) == (5, 5, 100.0)
+    assert recognized == [0, 2, 4]
+
+    ai_info_map = ClothesAiInfo.get_ai_info_map(ACCOUNT_ID, clothes_ids)
+    assert all(ai_info_map[clothes_id].detected_color == '白色' for clothes_id in clothes_ids)
+    clothes = Clothes.get_by_id(ACCOUNT_ID, clothes_ids[0])
+    assert (clothes.category, clothes.color) == ('裤子', '黑色')
+    assert clothes.image_hash == f'hash-{clothes.image_url}'
+
+
+def test_reanalyze_all_and_validation(seed, recognized):
+    """all重新识别衣橱中所有有图片的衣物；其他账号的衣物被拒绝"""
+    create_clothes(2)
+    with_image = [item['id'] for item in wardrobe_cache.get_snapshot(ACCOUNT_ID).items if item['image_url']]
+
+    result = ClothesService().reanalyze_clothes_batch(ACCOUNT_ID, 'all')
+    assert result['success'], result
+    assert result['result']['total'] == len(with_image)
+
+    other_id = Clothes.query.filter_by(account_id=OTHER_ACCOUNT_ID).first().id
+    result = ClothesService().reanalyze_clothes_batch(ACCOUNT_ID, [other_id])
+    assert not result['success']
@@ -0,0 +1,156 @@
+"""
+AI识别任务测试
+任务原子领取只有一次成功；超时的运行中任务由后台线程定时重新入队；
+识别任务写入衣物和AI识别信息，识别失败和被删除的衣物计为失败；后台线程只在服务进程收到请求时启动
+"""
+from datetime import datetime, timedelta
+import pytest
+from app import create_app, db
+from app.models import Clothes, ClothesAiInfo, RecognitionJob
+from app.services.clothes_service import ClothesService
+from app.services.recognition_queue import RecognitionQueue, recognition_queue
+from app.services.wardrobe_cache import wardrobe_cache
+from config import Config
+from tests.conftest import ACCOUNT_ID
+
+
+def create_job(clothes_ids, status='pending', updated_at=None):
+    """创建一个识别任务"""
+    job = RecognitionJob(ACCOUNT_ID, clothes_ids)
+    job.status = status
+    db.session.add(job)
+    db.session.commit()
+    if updated_at:
+        RecognitionJob.query.filter_by(id=job.id).update({'updated_at': updated_at}, synchronize_session=False)
+        db.session.commit()
+    return job.id
+
+
+def test_claim_succeeds_once(seed):
+    """同一个待处理任务只能被领取一次，领取后不再作为下一个待处理任务返回"""
+    job_id = create_job([])
+    RecognitionJob.query.filter(RecognitionJob.id < job_id, RecognitionJob.status == 'pending').update(
+        {'status': 'completed'}, synchronize_session=False)
+    db.session.commit()
+
+    assert RecognitionJob.get_next_pending_id() == job_id
+    assert RecognitionJob.claim(job_id)
+    assert not RecognitionJob.claim(job_id)
+    assert RecognitionJob.get_next_pending_id() is None
+    assert db.session.get(RecognitionJob, job_id).status == 'running'
+
+
+def test_requeue_stale_only_requeues_timed_out_jobs(seed):
+    """超过超时时间未更新的运行中任务重新入队，最近更新的运行中任务和已完成任务不变"""
+    stale_at = datetime.utcnow() - timedelta(seconds=Config.RECOGNITION_JOB_TIMEOUT + 60)
+    stale_id = create_job([], status='running', updated_at=stale_at)
+    running_id = create_job([], status='running')
+    completed_id = create_job([], status='completed', updated_at=stale_at)
+
+    assert RecognitionJob.requeue_stale(Config.RECOGNITION_JOB_TIMEOUT) == 1
+    db.session.expire_all()
+    assert db.session.get(RecognitionJob, stale_id).status == 'pending'
+    assert db.session.get(RecognitionJob, running_id).status == 'running'
+    assert db.session.get(RecognitionJob, completed_id).status == 'completed'
+
+
+def test_worker_requeues_stale_jobs_once_per_poll_interval(seed, monkeypatch):
+    """后台线程第一次循环立即回收中断的任务，之后每个轮询间隔最多回收一次"""
+    calls = []
+    monkeypatch.setattr(RecognitionJob, 'requeue_stale', classmethod(lambda cls, timeout: calls.append(timeout)))
+    clock = [1000.0]
+    monkeypatch.setattr('app.services.recognition_queue.time.monotonic', lambda: clock[0])
+    queue = RecognitionQueue()
+
+    queue._requeue_stale_if_due()
+    queue._requeue_stale_if_due()
+    assert calls == [Config.RECOGNITION_JOB_TIMEOUT]
+
+    clock[0] += Config.RECOGNITION_POLL_INTERVAL
+    queue._requeue_stale_if_due()
+    assert len(calls) == 2
+
+
+@pytest.fixture
+def recognize(monkeypatch):
+    """
+    同步执行识别任务，图片URL包含fail的识别失败，其余识别为白色上衣
+    :return: 每次识别调用的图片URL列表
+    """
+    monkeypatch.setattr(Config, 'UPLOAD_MAX_WORKERS', 1)
+    monkeypatch.setattr(Config, 'AI_VISION_BATCH_SIZE', 2)
+    calls = []
+
+    def _recognize_images(self, image_urls, image_hashes=None):
+        calls.append(list(image_urls))
+        return [
+            {"success": False, "message": "识别失败", "image_hash": f"hash-{url}"} if 'fail' in url else
+            {"success": True, "image_hash": f"hash-{url}",
+             "data": {"category": "上衣", "color": "白色", "season": "summer", "style": "休闲", "confidence": 90}}
+            for url in image_urls
+        ]
+
+    monkeypatch.setattr(ClothesService, '_recognize_images', _recognize_images)
+    return calls
+
+
+def test_process_upload_job(seed, recognize):
+    """上传任务识别待识别的衣物并写入AI识别信息，失败的使用默认数据，被删除的衣物计为失败"""
+    clothes_list = [
+        Clothes(ACCOUNT_ID, image_url=f'https://oss/job/{name}.jpg', recognition_status='pending')
+        for name in ('ok-1', 'fail-2', 'ok-3')
+    ]
+    db.session.add_all(clothes_list)
+    db.session.commit()
+    clothes_ids = [clothes.id for clothes in clothes_list]
+    job_id = create_job(clothes_ids + [clothes_ids[-1] + 1000])
+    assert RecognitionJob.claim(job_id)
+
+    ClothesService().process_recognition_job(job_id)
+
+    assert recognize == [['https://oss/job/ok-1.jpg', 'https://oss/job/fail-2.jpg'], ['https://oss/job/ok-3.jpg']]
+    job = db.session.get(RecognitionJob, job_id).to_dict()
+    assert (job['status'], job['processed'], job['success_count'], job['failed_count']) == ('completed', 4, 2, 2)
+
+    db.session.expire_all()
+    ok, failed = Clothes.get_by_id(ACCOUNT_ID, clothes_ids[0]), Clothes.get_by_id(ACCOUNT_ID, clothes_ids[1])
+    assert (ok.name, ok.recognition_status, ok.image_hash) == ('白色上衣', 'completed', 'hash-https://oss/job/ok-1.jpg')
+    assert failed.recognition_status == 'failed' and failed.category
+    ai_info_map = ClothesAiInfo.get_ai_info_map(ACCOUNT_ID, clothes_ids)
+    assert {clothes_id for clothes_id, ai_info in ai_info_map.items() if ai_info} == {clothes_ids[0], clothes_ids[2]}
+    assert wardrobe_cache.get_snapshot(ACCOUNT_ID).get(clothes_ids[0])['name'] == '白色上衣'
+
+
+def test_process_job_failure_marks_job_failed(seed, monkeypatch):
+    """识别过程抛出异常时任务标记为失败并记录错误信息"""
+    clothes = Clothes(ACCOUNT_ID, image_url='https://oss/job/error.jpg', recognition_status='pending')
+    db.session.add(clothes)
+    db.session.commit()
+    job_id = create_job([clothes.id])
+    assert RecognitionJob.claim(job_id)
+
+    def _recognize_images(self, image_urls, image_hashes=None):
+        raise RuntimeError('服务不可用')
+
+    monkeypatch.setattr(ClothesService, '_recognize_images', _recognize_images)
+    ClothesService().process_recognition_job(job_id)
+
+    job = db.session.get(RecognitionJob, job_id)
+    assert job.status == 'failed'
+    assert '服务不可用' in job.message
+
+
+def test_workers_start_on_first_request_only(monkeypatch):
+    """创建应用（命令行、迁移脚本）不启动后台线程，服务进程收到请求时才启动；关闭自动启动时不启动"""
+    started = []
+    monkeypatch.setattr(recognition_queue, 'start', lambda app: started.append(app))
+
+    app = create_app('development')
+    assert started == []
+    app.test_client().get('/ai-cabinet/')
+    assert started == [app]
+
+    monkeypatch.setattr(Config, 'RECOGNITION_AUTOSTART', False)
+    app = create_app('development')
+    app.test_client().get('/ai-cabinet/')
+    assert len(started) == 1
@@ -0,0 +1,135 @@
+"""
+上传衣物批量写入测试
+一次上传的所有衣物用一条INSERT写入并只提交一次；批量写入失败时按文件逐条写入，失败的文件单独回滚并删除已上传的文件
+"""
+from sqlalchemy import event, text
+from app import db
+from app.models import Clothes, RecognitionJob
+from app.services.clothes_service import ClothesService
+from tests.conftest import ACCOUNT_ID
+
+
+class RecordingOSSHelper:
+    """记录被删除对象的OSS辅助类"""
+
+    def __init__(self):
+        self.deleted = []
+
+    def delete_object(self, object_key):
+        self.deleted.append(object_key)
+        return True
+
+
+def uploaded_items(prefix, count):
+    """构造已上传到OSS的文件处理结果"""
+    return [
+        {
+            "filename": f"{prefix}{i}.jpg",
+            "object_key": f"clothes/{ACCOUNT_ID}/{prefix}{i}.jpg",
+            "image_url": f"https://oss/clothes/{ACCOUNT_ID}/{prefix}{i}.jpg",
+            "image_hash": None,
+        }
+        for i in range(count)
+    ]
+
+
+def save(items):
+    """
+    保存待识别衣物并统计写入衣物表的INSERT语句数和提交次数
+    :return: (保存结果, INSERT语句数, 提交次数, OSS辅助类)
+    """
+    service = ClothesService()
+    service.oss_helper = RecordingOSSHelper()
+    inserts, commits = [], []
+
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('INSERT INTO CLOTHES '):
+            inserts.append(statement)
+
+    def _commit(session):
+        if not session.in_nested_transaction():
+            commits.append(session)
+
+    # 只统计请求会话最外层事务的提交（衣橱版本号使用独立的连接提交）
+    session = db.session()
+    event.listen(db.engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(session, 'after_commit', _commit)
+    try:
+        result = service._save_pending_clothes(ACCOUNT_ID, items)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', _before_cursor_execute)
+        event.remove(session, 'after_commit', _commit)
+    return result, len(inserts), len(commits), service.oss_helper
+
+
+def test_batch_is_one_insert_and_one_commit(seed):
+    """10个文件只执行一条INSERT并提交一次，识别任务包含全部衣物"""
+    items = uploaded_items('batch', 10)
+    (created, errors, job), inserts, commits, oss_helper = save(items)
+
+    assert inserts == 1
+    assert commits == 1
+    assert errors == {}
+    assert oss_helper.deleted == []
+    assert [created[item["object_key"]].image_url for item in items] == [item["image_url"] for item in items]
+    assert RecognitionJob.get_by_id(ACCOUNT_ID, job.id).get_clothes_items() == [c.id for c in created.values()]
+    assert all(clothes.recognition_status == 'pending' for clothes in created.values())
+
+
+def test_failed_file_is_rolled_back_alone(seed):
+    """批量写入失败时逐个文件写入，只有失败的文件被回滚并从OSS删除"""
+    db.session.execute(text(
+        "CREATE TRIGGER reject_bad_clothes BEFORE INSERT ON clothes "
+        "WHEN NEW.image_url LIKE '%bad%' BEGIN SELECT RAISE(ABORT, 'rejected'); END"
+    ))
+    db.session.commit()
+    try:
+        items = uploaded_items('ok', 2) + uploaded_items('bad', 1) + uploaded_items('fine', 1)
+        (created, errors, job), inserts, commits, oss_helper = save(items)
+    finally:
+        db.session.execute(text("DROP TRIGGER reject_bad_clothes"))
+        db.session.commit()
+
+    bad_key = items[2]["object_key"]
+    assert commits == 1
+    assert list(errors) == [bad_key]
+    assert oss_helper.deleted == [bad_key]
+    assert set(created) == {item["object_key"] for item in items} - {bad_key}
+    assert Clothes.query.filter(Clothes.image_url.like('%bad%')).count() == 0
+    assert sorted(job.get_clothes_items()) == sorted(clothes.id for clothes in created.values())
+
+
+def test_nothing_saved_deletes_all_files(seed):
+    """所有文件都写入失败时不创建识别任务，并删除全部已上传的文件"""
+    db.session.execute(text(
+        "CREATE TRIGGER reject_all_clothes BEFORE INSERT ON clothes BEGIN SELECT RAISE(ABORT, 'rejected'); END"
+    ))
+    db.session.commit()
+    try:
+        items = uploaded_items('rejected', 2)
+        (created, errors, job), inserts, commits, oss_helper = save(items)
+    finally:
+        db.session.execute(text("DROP TRIGGER reject_all_clothes"))
+        db.session.commit()
+
+    assert created == {}
+    assert job is None
+    assert sorted(errors) == sorted(oss_helper.deleted) == sorted(item["object_key"] for item in items)
+
+
+def test_bulk_create_without_returning_ignores_existing_rows(seed, monkeypatch):
+    """不支持RETURNING的数据库（MySQL）逐行插入后按主键查询，账号中已有相同图片的记录不会被当作新记录返回"""
+    existing = Clothes(ACCOUNT_ID, name='已有记录', image_url='https://oss/duplicate.jpg')
+    db.session.add(existing)
+    db.session.commit()
+    monkeypatch.setattr(db.engine.dialect, 'insert_executemany_returning', False)
+
+    rows = [{"image_url": url, "recognition_status": "pending"}
+            for url in ('https://oss/duplicate.jpg', 'https://oss/new.jpg', 'https://oss/duplicate.jpg')]
+    created = Clothes.bulk_create(ACCOUNT_ID, rows)
+    db.session.commit()
+
+    assert len(created) == 3 and len({clothes.id for clothes in created}) == 3
+    assert existing.id not in {clothes.id for clothes in created}
+    assert [clothes.image_url for clothes in created] == [row["image_url"] for row in rows]
+    assert all(clothes.recognition_status == 'pending' for clothes in created)
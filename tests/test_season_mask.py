@@ -0,0 +1,61 @@
+"""
+季节位掩码测试
+季节筛选枚举包含该季节的全部位掩码并使用IN查询，结果必须与按位与的语义完全一致
+"""
+import pytest
+from app import db
+from app.models import Clothes
+
+SEASON_ACCOUNT_ID = 'season-account'
+
+
+def test_season_to_mask_normalizes_names():
+    """中英文名称和别名转换为同一位掩码，无法识别的季节被忽略"""
+    assert Clothes.season_to_mask(['spring', '夏季', 'Fall', '冬']) == 15
+    assert Clothes.season_to_mask(['秋天', 'autumn']) == Clothes.SEASON_BITS['autumn']
+    assert Clothes.season_to_mask(['雨季', '', None]) == 0
+    assert Clothes.season_to_mask(None) == 0
+
+
+def test_season_round_trip():
+    """逗号或顿号分隔的季节字符串与位掩码互相转换"""
+    clothes = Clothes(SEASON_ACCOUNT_ID, name='两季')
+    clothes.season = '春季、autumn'
+    assert clothes.season_mask == 5
+    assert clothes.season_list == ['spring', 'autumn']
+    assert clothes.season == 'spring,autumn'
+
+    clothes.season = None
+    assert clothes.season_mask == 0 and clothes.season is None
+
+
+@pytest.mark.parametrize('season', Clothes.SEASONS)
+def test_season_filter_in_set(season):
+    """IN集合恰好是16个位掩码中包含该季节的8个"""
+    bit = Clothes.SEASON_BITS[season]
+    condition = Clothes.season_filter(season)
+    masks = set(condition.right.value)
+    assert masks == {mask for mask in range(16) if mask & bit}
+    assert len(masks) == 8
+
+
+def test_season_filter_matches_bitwise_semantics(app):
+    """对全部16种位掩码的衣物，IN查询返回的集合与按位与的结果一致"""
+    clothes_list = []
+    for mask in range(16):
+        clothes = Clothes(SEASON_ACCOUNT_ID, name=f'掩码{mask}')
+        clothes.season_mask = mask
+        clothes_list.append(clothes)
+    db.session.add_all(clothes_list)
+    db.session.commit()
+
+    for season in ['spring', '夏天', 'fall', '冬季']:
+        bit = Clothes.SEASON_BITS[Clothes.normalize_season(season)]
+        rows = db.session.query(Clothes.season_mask).filter(
+            Clothes.account_id == SEASON_ACCOUNT_ID,
+            Clothes.season_filter(season)
+        ).all()
+        assert sorted(row[0] for row in rows) == [mask for mask in range(16) if mask & bit]
+
+    assert Clothes.season_filter('雨季') is None
+    assert Clothes.season_filter('') is None
@@ -0,0 +1,107 @@
+"""
+存储后端测试
+local和memory后端与OSS使用相同的键名和URL规则，由应用提供下载和签名直传，上传流程可以完全离线运行
+"""
+import io
+import os
+import pytest
+from werkzeug.datastructures import FileStorage
+from app.models import Clothes
+from app.services.clothes_service import ClothesService
+from app.utils.oss_helper import OSSHelper
+from app.utils.storage_backend import LocalBackend, MemoryBackend, get_storage_backend
+from config import Config
+from tests.conftest import ACCOUNT_ID
+
+
+@pytest.fixture(params=['local', 'memory'])
+def helper(request, tmp_path):
+    """使用本地磁盘或内存存储的OSS辅助类"""
+    backend = LocalBackend(str(tmp_path)) if request.param == 'local' else MemoryBackend()
+    return OSSHelper(backend)
+
+
+@pytest.fixture
+def memory_storage(monkeypatch):
+    """把全局存储后端切换为进程内内存"""
+    monkeypatch.setattr(Config, 'STORAGE_BACKEND', 'memory')
+    return get_storage_backend()
+
+
+def test_round_trip(helper):
+    """上传、读取元信息、下载和删除"""
+    object_key = helper.upload_file(ACCOUNT_ID, FileStorage(stream=io.BytesIO(b'x' * 100), filename='a.jpg'))
+    assert object_key.startswith(f"clothes/{ACCOUNT_ID}/")
+
+    meta = helper.get_object_meta(object_key)
+    assert meta['size'] == 100 and meta['content_type'] == 'image/jpeg' and meta['etag']
+    assert helper.get_object(object_key) == b'x' * 100
+
+    url = helper.get_public_url(object_key)
+    assert url == f"{Config.STORAGE_URL_BASE}/{object_key}"
+    assert helper.get_object_key(url) == object_key
+    assert helper.get_object_key('https://example.com/a.jpg') is None
+
+    assert helper.delete_object(object_key) and helper.delete_object(object_key)
+    assert helper.get_object_meta(object_key) is None
+    assert helper.get_object(object_key) is None
+
+
+def test_local_backend_uses_key_layout(tmp_path):
+    """本地文件的目录结构与键名一致，键名不能指向根目录之外"""
+    helper = OSSHelper(LocalBackend(str(tmp_path)))
+    assert helper.put_stream('clothes/acc/20260101/a_w128.webp', io.BytesIO(b'webp'), 'image/webp')
+    assert (tmp_path / 'clothes' / 'acc' / '20260101' / 'a_w128.webp').read_bytes() == b'webp'
+    assert os.listdir(tmp_path / 'clothes' / 'acc' / '20260101') == ['a_w128.webp']
+
+    assert not helper.put_stream('../outside.jpg', io.BytesIO(b'x'))
+    assert not (tmp_path.parent / 'outside.jpg').exists()
+
+
+def test_signed_put_and_download(app, memory_storage):
+    """签名PUT URL直传后可以通过公共URL下载，签名错误或过期时拒绝上传"""
+    client = app.test_client()
+    helper = OSSHelper()
+    object_key = helper.generate_object_key(ACCOUNT_ID, 'shirt.jpg')
+    signed = helper.get_signed_put_url(object_key, content_type='image/jpeg')
+    assert signed['method'] == 'PUT' and signed['headers'] == {"Content-Type": "image/jpeg"}
+
+    response = client.put(signed['url'], data=b'jpeg-data', headers=signed['headers'])
+    assert response.status_code == 200
+    assert helper.get_object_meta(object_key)['size'] == len(b'jpeg-data')
+
+    response = client.get(helper.get_public_url(object_key))
+    assert response.status_code == 200
+    assert response.data == b'jpeg-data' and response.mimetype == 'image/jpeg'
+
+    assert client.put(signed['url'].replace('signature=', 'signature=0'), data=b'x',
+                      headers=signed['headers']).status_code == 403
+    assert client.put(signed['url'], data=b'x', headers={"Content-Type": "text/html"}).status_code == 403
+    expired = helper.get_signed_put_url(object_key, expires=-1)
+    assert client.put(expired['url'], data=b'x').status_code == 403
+    assert client.get(helper.get_public_url('clothes/missing.jpg')).status_code == 404
+
+
+def test_storage_routes_disabled_for_oss(app, monkeypatch):
+    """使用OSS后端时应用不提供对象访问"""
+    monkeypatch.setattr(Config, 'STORAGE_BACKEND', 'oss')
+    assert app.test_client().get('/ai-cabinet/storage/clothes/a.jpg').status_code == 404
+
+
+def test_upload_pipeline_runs_offline(seed, memory_storage, monkeypatch):
+    """使用内存存储完整执行表单上传：保存图片和缩略图、创建衣物记录"""
+    monkeypatch.setattr(Config, 'RECOGNITION_WORKERS', 0)
+    monkeypatch.setattr(Config, 'UPLOAD_MAX_WORKERS', 1)
+    monkeypatch.setattr(ClothesService, '_recognize_images',
+                        lambda self, image_urls, image_hashes=None: [{"success": False, "message": "离线"}
+                                                                     for _ in image_urls])
+    service = ClothesService()
+
+    result = service.upload_clothes_images(ACCOUNT_ID, [
+        FileStorage(stream=io.BytesIO(b'raw image bytes'), filename='shirt.png')
+    ])
+    assert result['success']
+    item, = result['items']['items']
+    object_key = service.oss_helper.get_object_key(item['image_url'])
+    assert memory_storage.get_object(object_key) == b'raw image bytes'
+    assert Clothes.get_by_id(ACCOUNT_ID, item['clothes_id']).image_url == item['image_url']
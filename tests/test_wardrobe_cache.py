@@ -0,0 +1,61 @@
+"""
+衣橱快照缓存测试
+memory后端的快照与数据库中的衣橱版本号比较，其他进程写入并使快照失效后本进程立即重新加载；
+穿搭列表中快照没有的衣物从数据库补充，不会被丢弃
+"""
+from app import db
+from app.models import Clothes, Outfit, WardrobeVersion
+from app.schemas.outfit import OutfitResponseSchema
+from app.services.outfit_service import OutfitService
+from app.services.wardrobe_cache import WardrobeCache, MemoryBackend, wardrobe_cache
+from tests.conftest import ACCOUNT_ID
+from tests.test_query_plans import capture_queries
+
+
+def test_invalidation_in_other_process_is_visible(app, seed):
+    """两个进程各自使用进程内缓存，一个进程写入并失效后另一个进程读取到新数据"""
+    this_process = WardrobeCache(MemoryBackend())
+    other_process = WardrobeCache(MemoryBackend())
+    clothes_id = seed['clothes_id']
+
+    with app.app_context():
+        assert this_process.get_snapshot(ACCOUNT_ID).get(clothes_id)['name'] != '其他进程改名'
+
+    # 缓存命中时只按主键查询版本号
+    with app.app_context():
+        with capture_queries() as queries:
+            this_process.get_snapshot(ACCOUNT_ID)
+        assert len(queries) == 1 and 'wardrobe_versions' in queries[0][0]
+
+    version = WardrobeVersion.get_version(ACCOUNT_ID)
+    Clothes.get_by_id(ACCOUNT_ID, clothes_id).name = '其他进程改名'
+    db.session.commit()
+    other_process.invalidate(ACCOUNT_ID)
+    assert WardrobeVersion.get_version(ACCOUNT_ID) == version + 1
+
+    with app.app_context():
+        assert this_process.get_snapshot(ACCOUNT_ID).get(clothes_id)['name'] == '其他进程改名'
+    wardrobe_cache.invalidate(ACCOUNT_ID)
+
+
+def test_outfit_list_includes_clothes_missing_from_snapshot(app, seed):
+    """快照加载之后新增的衣物（其他进程写入，快照尚未失效）仍出现在穿搭列表中"""
+    with app.app_context():
+        wardrobe_cache.get_snapshot(ACCOUNT_ID)
+
+        added = Clothes(ACCOUNT_ID, name='快照之后上传', category='上衣')
+        db.session.add(added)
+        db.session.commit()
+        outfit = Outfit(ACCOUNT_ID, name='新穿搭', clothes_items=[seed['clothes_id'], added.id])
+        db.session.add(outfit)
+        db.session.commit()
+        assert wardrobe_cache.get_snapshot(ACCOUNT_ID).get(added.id) is None
+
+        outfits = OutfitService.get_outfit_list(ACCOUNT_ID)
+        clothes_map = OutfitService.get_clothes_map(ACCOUNT_ID, outfits)
+        result = OutfitResponseSchema(many=True, context={'clothes_map': clothes_map}).dump(outfits)
+
+    item = next(item for item in result if item['id'] == outfit.id)
+    assert [clothes['id'] for clothes in item['clothes_details']] == [seed['clothes_id'], added.id]
+    assert item['clothes_details'][1]['name'] == '快照之后上传'
+    wardrobe_cache.invalidate(ACCOUNT_ID)